@@ -0,0 +1,216 @@
+# bench_bot.py
+# Пропускная способность бота (bot.py) в режимах polling и webhook на одних и тех же обновлениях.
+# Telegram заменён локальной заглушкой, запросы к Django API — настоящие
+# (сервер должен быть запущен, как для manage.py load_votes).
+# Запуск: python bench_bot.py --users 500 --modes polling,webhook
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+
+import aiohttp
+from aiohttp import web
+
+MODES = ("polling", "webhook")
+SECRET = "bench-secret"
+WEBHOOK_PATH = "/telegram/webhook"
+
+
+class FakeTelegram:
+    """
+    Bot API на localhost: getUpdates отдаёт заранее загруженные обновления (по 100, как Telegram),
+    остальные методы отвечают успехом. latency — имитация сети до api.telegram.org.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.updates = []
+        self.calls = Counter()
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        params = await request.post()
+        self.calls[method] += 1
+        await asyncio.sleep(self.latency)
+        if method == "getUpdates":
+            offset = int(params.get("offset") or 0)
+            batch = [u for u in self.updates if u["update_id"] >= offset][:100]
+            if not batch:
+                # Long polling: пустой ответ не сразу
+                await asyncio.sleep(0.1)
+            result = batch
+        elif method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        elif method == "sendMessage":
+            result = {"message_id": 1, "date": 0, "chat": {"id": int(params["chat_id"]), "type": "private"}}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+def synthesize_updates(round_info: dict, users: int, user_id_start: int) -> list:
+    """Каждый пользователь открывает раунд (/vote) и нажимает кнопку участника"""
+    participants = round_info["participants"]
+    individual = round_info.get("round_type") == "individual"
+    updates = []
+    for i in range(users):
+        user_id = user_id_start + i
+        user = {"id": user_id, "is_bot": False, "first_name": f"Bench {i}"}
+        chat = {"id": user_id, "type": "private"}
+        participant = participants[i % len(participants)]
+        data = f"vote_{round_info['round_id']}_{participant['id']}" + ("_yes" if individual else "")
+        updates.append({"update_id": 0, "message": {
+            "message_id": 1, "date": 0, "chat": chat, "from": user, "text": "/vote",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 5}],
+        }})
+        updates.append({"update_id": 0, "callback_query": {
+            "id": str(user_id), "from": user, "chat_instance": str(user_id), "data": data,
+            "message": {"message_id": 2, "date": 0, "chat": chat, "text": "..."},
+        }})
+    return updates
+
+
+async def run(modes, options):
+    import bot
+    from aiogram.client.telegram import TelegramAPIServer
+    from bot_outbound import TokenBucket
+    from bot_webhook import WebhookServer, serve
+
+    fake = FakeTelegram(options.telegram_latency / 1000)
+    fake_app = web.Application()
+    fake_app.router.add_post("/bot{token}/{method}", fake.handle)
+    fake_runner = await serve(fake_app, "127.0.0.1", 0)
+    bot.bot.session.api = TelegramAPIServer.from_base(f"http://127.0.0.1:{fake_runner.addresses[0][1]}")
+    if options.telegram_rate:
+        # С лимитом Telegram (30/с) оба режима упираются в него, а не в приём обновлений
+        rate = options.telegram_rate
+        bot.outbound.global_bucket = TokenBucket(rate, rate)
+
+    processed = Counter()
+    done = asyncio.Event()
+
+    async def count_updates(handler, event, data):
+        try:
+            return await handler(event, data)
+        finally:
+            processed["n"] += 1
+            if processed["n"] >= processed["target"]:
+                done.set()
+
+    bot.dp.update.outer_middleware(count_updates)
+
+    round_info = None
+    if not options.updates:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(options.base_url.rstrip("/") + "/api/active-round/") as resp:
+                round_info = await resp.json()
+        if not round_info.get("round_id") or not round_info.get("participants"):
+            raise SystemExit("На сервере нет текущего раунда с участниками")
+
+    try:
+        for index, mode in enumerate(modes):
+            if options.updates:
+                with open(options.updates, encoding="utf-8") as f:
+                    updates = [json.loads(line) for line in f if line.strip()]
+            else:
+                # У каждого режима свои пользователи: иначе второй прогон упрётся в повторные голоса
+                updates = synthesize_updates(
+                    round_info, options.users, options.user_id_start + index * options.users
+                )
+            for update_id, update in enumerate(updates, start=1):
+                update["update_id"] = update_id
+            processed.clear()
+            processed["target"] = len(updates)
+            done.clear()
+            fake.calls.clear()
+            bot.stats.sections["handlers"].clear()
+
+            if mode == "polling":
+                elapsed = await run_polling(bot, fake, updates, done)
+            else:
+                server = WebhookServer(
+                    bot.dp, bot.bot, secret=SECRET, workers=options.workers, queue_size=len(updates)
+                )
+                elapsed = await run_webhook(server, serve, updates, done, options.concurrency)
+            report(mode, len(updates), elapsed, fake.calls, bot.stats)
+    finally:
+        await fake_runner.cleanup()
+        await bot.bot.session.close()
+
+
+async def run_polling(bot, fake, updates, done) -> float:
+    fake.updates = updates
+    started = time.perf_counter()
+    polling = asyncio.create_task(bot.dp.start_polling(
+        bot.bot, handle_signals=False, close_bot_session=False, polling_timeout=1
+    ))
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    await bot.dp.stop_polling()
+    await polling
+    fake.updates = []
+    return elapsed
+
+
+async def run_webhook(server, serve, updates, done, concurrency) -> float:
+    runner = await serve(server.make_app(WEBHOOK_PATH), "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}{WEBHOOK_PATH}"
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = Counter()
+
+    async def post(session, update):
+        async with semaphore:
+            async with session.post(url, json=update, headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}) as resp:
+                statuses[resp.status] += 1
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(post(session, update) for update in updates))
+        await done.wait()
+    elapsed = time.perf_counter() - started
+    await runner.cleanup()
+    if set(statuses) != {200}:
+        print(f"  ответы webhook: {dict(statuses)}")
+    return elapsed
+
+
+def report(mode, count, elapsed, calls, stats):
+    errors = sum(t.errors for t in stats.sections["handlers"].values())
+    print(
+        f"{mode:<8} {count} обновлений за {elapsed:.2f} c: {count / elapsed:.0f} обновлений/с, "
+        f"ошибок обработчиков {errors}; вызовы Bot API: {dict(sorted(calls.items()))}"
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Пропускная способность бота в режимах polling и webhook")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=500, help="Синтетика: по /vote и нажатию на пользователя")
+    parser.add_argument(
+        "--updates", help="JSONL с записанными обновлениями (WEBHOOK_RECORD_PATH) вместо синтетики"
+    )
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--workers", type=int, default=16, help="Воркеры webhook (WEBHOOK_WORKERS)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных POST в webhook")
+    parser.add_argument("--telegram-latency", type=float, default=30, help="Задержка заглушки Bot API, мс")
+    parser.add_argument(
+        "--telegram-rate", type=float, default=0,
+        help="Лимит исходящих вызовов в секунду вместо OUTBOUND_GLOBAL_RATE (0 — как в боте)",
+    )
+    parser.add_argument("--user-id-start", type=int, default=8 * 10 ** 9)
+    options = parser.parse_args()
+    modes = options.modes.split(",")
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Неизвестные режимы: {', '.join(sorted(unknown))}")
+    return modes, options
+
+
+if __name__ == "__main__":
+    modes, options = parse_args()
+    # bot.py читает настройки при импорте
+    os.environ.setdefault("TELEGRAM_TOKEN", "123456:bench")
+    os.environ.setdefault("DJANGO_API_TOKEN", "bench")
+    asyncio.run(run(modes, options))
@@ -3,6 +3,7 @@ import logging
 import requests
 import time
 from typing import List, Dict
+from urllib.parse import urlsplit
 from aiogram import Bot, Dispatcher, types
 from aiogram.filters import Command
 from aiogram.types import (
@@ -16,6 +17,11 @@ from decouple import config
 
 import aiohttp
 
+from bot_broadcast import Broadcaster
+from bot_outbound import OutboundScheduler
+from bot_stats import BotStats, HandlerStatsMiddleware, TelegramStatsMiddleware, sample_loop_lag, write_snapshots
+from bot_webhook import WebhookServer, serve
+
 # ──────────────────────────────────────────────
 # НАСТРОЙКИ (из .env)
 # ──────────────────────────────────────────────
@@ -25,15 +31,44 @@ DJANGO_API_BASE = "http://127.0.0.1:8000"
 API_VOTE_URL = f"{DJANGO_API_BASE}/api/vote/"
 API_ACTIVE_PARTICIPANTS = f"{DJANGO_API_BASE}/api/active-participants"
 API_ACTIVE_ROUND_INFO = f"{DJANGO_API_BASE}/api/active-round-info"
+API_ACTIVE_ROUND = f"{DJANGO_API_BASE}/api/active-round/"
+API_USER_VOTES = f"{DJANGO_API_BASE}/api/user-votes/"
 API_ACTIVE_ROUNDS = f"{DJANGO_API_BASE}/api/active-rounds"
 API_START_ROUND = f"{DJANGO_API_BASE}/api/start-round/"
 API_END_ROUND = f"{DJANGO_API_BASE}/api/end-round/"
 API_ADD_PARTICIPANT = f"{DJANGO_API_BASE}/api/add-participant/"
+API_ADD_PARTICIPANTS = f"{DJANGO_API_BASE}/api/add-participants/"
 API_CREATE_CAMPAIGN = f"{DJANGO_API_BASE}/api/create-campaign/"
 API_ACTIVE_CAMPAIGNS = f"{DJANGO_API_BASE}/api/active-campaigns/"
 API_SET_CURRENT_ROUND = f"{DJANGO_API_BASE}/api/set-current-round/"
 API_GET_CURRENT_ROUND = f"{DJANGO_API_BASE}/api/get-current-round/"
 API_TRANSFER_WINNERS = f"{DJANGO_API_BASE}/api/transfer-winners/"
+API_BOT_USERS = f"{DJANGO_API_BASE}/api/bot-users/"
+API_BOT_USERS_BLOCKED = f"{DJANGO_API_BASE}/api/bot-users/blocked/"
+API_BROADCAST_RECIPIENTS = f"{DJANGO_API_BASE}/api/broadcast-recipients/"
+
+# Периодические снимки статистики (/stats) в JSON; пустой путь — не писать
+BOT_STATS_SNAPSHOT_PATH = config("BOT_STATS_SNAPSHOT_PATH", default="")
+BOT_STATS_SNAPSHOT_INTERVAL = config("BOT_STATS_SNAPSHOT_INTERVAL", default=60, cast=float)
+
+# Получение обновлений: polling (по умолчанию) или webhook (см. bot_webhook.py)
+BOT_MODE = config("BOT_MODE", default="polling")
+WEBHOOK_URL = config("WEBHOOK_URL", default="")  # публичный адрес, например https://bot.example.com
+WEBHOOK_PATH = config("WEBHOOK_PATH", default="/telegram/webhook")
+WEBHOOK_HOST = config("WEBHOOK_HOST", default="127.0.0.1")
+WEBHOOK_PORT = config("WEBHOOK_PORT", default=8081, cast=int)
+WEBHOOK_SECRET = config("WEBHOOK_SECRET", default="")
+WEBHOOK_WORKERS = config("WEBHOOK_WORKERS", default=16, cast=int)
+WEBHOOK_QUEUE = config("WEBHOOK_QUEUE", default=1000, cast=int)
+WEBHOOK_RECORD_PATH = config("WEBHOOK_RECORD_PATH", default="")  # писать входящие обновления в JSONL
+
+# Темп исходящих сообщений (см. bot_outbound.py): всего в секунду и в один чат
+OUTBOUND_GLOBAL_RATE = config("OUTBOUND_GLOBAL_RATE", default=30, cast=float)
+OUTBOUND_CHAT_RATE = config("OUTBOUND_CHAT_RATE", default=1, cast=float)
+OUTBOUND_CHAT_BURST = config("OUTBOUND_CHAT_BURST", default=2, cast=float)
+
+# Прогресс рассылки (/broadcast): после перезапуска бот продолжит с места остановки
+BROADCAST_STATE_PATH = config("BROADCAST_STATE_PATH", default="broadcast.json")
 
 ADMIN_IDS = [1251634923, ]
 #1401411234
@@ -47,7 +82,21 @@ logger = logging.getLogger(__name__)
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher(storage=MemoryStorage())
 
+# Статистика задержек и ошибок (см. bot_stats.py и команду /stats)
+stats = BotStats()
+# Планировщик первым: TelegramStatsMiddleware замеряет сами вызовы, без ожидания в очереди
+outbound = OutboundScheduler(
+    stats, global_rate=OUTBOUND_GLOBAL_RATE, chat_rate=OUTBOUND_CHAT_RATE, chat_burst=OUTBOUND_CHAT_BURST
+)
+bot.session.middleware(outbound)
+bot.session.middleware(TelegramStatsMiddleware(stats))
+dp.message.middleware(HandlerStatsMiddleware(stats))
+dp.callback_query.middleware(HandlerStatsMiddleware(stats))
+background_tasks: List[asyncio.Task] = []
+
 session: aiohttp.ClientSession = None
+# Общая часть раунда по версии (см. get_round_view)
+shared_round_cache: Dict[str, dict] = {}
 # ──────────────────────────────────────────────
 # Инициализация и закрытие сессии
 # ──────────────────────────────────────────────
@@ -56,9 +105,20 @@ async def on_startup():
     global session
     session = aiohttp.ClientSession()
     logger.info("aiohttp сессия создана")
+    background_tasks.append(asyncio.create_task(sample_loop_lag(stats)))
+    if BOT_STATS_SNAPSHOT_PATH:
+        background_tasks.append(asyncio.create_task(
+            write_snapshots(stats, BOT_STATS_SNAPSHOT_PATH, BOT_STATS_SNAPSHOT_INTERVAL)
+        ))
+    broadcaster.resume()
 
 async def on_shutdown():
     global session
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await broadcaster.stop()
+    await outbound.close()
     if session and not session.closed:
         await session.close()
     logger.info("aiohttp сессия закрыта")
@@ -71,28 +131,37 @@ dp.shutdown.register(on_shutdown)
 # Вспомогательные асинхронные функции для запросов
 # ──────────────────────────────────────────────
 
+def api_endpoint(method: str, url: str) -> str:
+    # Без query-параметров: user_id не должен плодить отдельные ключи статистики
+    return f"{method} {urlsplit(url).path}"
+
 async def api_get(url: str, headers: dict = PUBLIC_HEADERS, timeout: int = 8) -> dict:
-    async with session.get(url, headers=headers, timeout=timeout) as resp:
-        if resp.status >= 400:
-            text = await resp.text()
-            raise aiohttp.ClientResponseError(
-                resp.request_info, resp.history,
-                status=resp.status, message=text
-            )
-        return await resp.json()
+    with stats.timed("api", api_endpoint("GET", url)):
+        async with session.get(url, headers=headers, timeout=timeout) as resp:
+            if resp.status >= 400:
+                text = await resp.text()
+                raise aiohttp.ClientResponseError(
+                    resp.request_info, resp.history,
+                    status=resp.status, message=text
+                )
+            return await resp.json()
 
 async def api_post(url: str, json_data: dict, headers: dict = ADMIN_HEADERS, timeout: int = 10) -> dict:
-    async with session.post(url, json=json_data, headers=headers, timeout=timeout) as resp:
-        if resp.status >= 400:
-            try:
-                error_data = await resp.json()
-            except:
-                error_data = {"detail": await resp.text()}
-            raise aiohttp.ClientResponseError(
-                resp.request_info, resp.history,
-                status=resp.status, message=str(error_data)
-            )
-        return await resp.json()
+    with stats.timed("api", api_endpoint("POST", url)):
+        async with session.post(url, json=json_data, headers=headers, timeout=timeout) as resp:
+            if resp.status >= 400:
+                try:
+                    error_data = await resp.json()
+                except:
+                    error_data = {"detail": await resp.text()}
+                error = aiohttp.ClientResponseError(
+                    resp.request_info, resp.history,
+                    status=resp.status, message=str(error_data)
+                )
+                # Тело ответа с ошибкой (например, user_state при повторном голосе)
+                error.data = error_data
+                raise error
+            return await resp.json()
 # ──────────────────────────────────────────────
 # СОСТОЯНИЯ FSM
 # ──────────────────────────────────────────────
@@ -150,27 +219,123 @@ async def get_rounds_for_campaign(campaign_id: int, round_type: str = None) -> L
         filtered = [rd for rd in filtered if rd.get("type") == round_type]
     return filtered
 
+async def get_round_view(user_id: int, mine: dict = None) -> dict:
+    """
+    Данные для клавиатуры голосования: общий срез раунда (запрашивается
+    один раз на версию) + маленький ответ с голосами пользователя.
+    mine — уже известные голоса (user_state из ответа на голос), тогда user-votes/ не запрашиваем.
+    Формат совпадает с active-round-info.
+    """
+    if mine is None:
+        mine = await api_get(f"{API_USER_VOTES}?user_id={user_id}")
+    if not mine.get("round_id"):
+        return mine
+    shared = shared_round_cache.get(mine["version"])
+    if shared is None:
+        shared = await api_get(API_ACTIVE_ROUND)
+        shared_round_cache.clear()
+        shared_round_cache[shared["version"]] = shared
+    if shared.get("round_id") != mine["round_id"]:
+        # Голосовали не в текущем раунде — показываем текущий
+        mine = await api_get(f"{API_USER_VOTES}?user_id={user_id}")
+    return {**shared, "user_votes": mine.get("votes", [])}
+
+class RoundKeyboard:
+    """
+    Экран голосования одной версии раунда. Всё общее — текст и обе версии каждой
+    кнопки (без отметки и с ❤️/💔) — строится один раз; для пользователя render()
+    только выбирает готовые кнопки по его голосам.
+    """
+    INDIVIDUAL_HEADER = "Готовы ли вы пригласить на свое мероприятие такого ведущего, как\n"
+    STANDARD_HEADER = (
+        "Вы можете голосовать за нескольких (по 1 на каждого).\n"
+        "Выберите участников (можно нескольких):\n"
+    )
+    VOTED_TEXT = {
+        "yes": "\n\nВы уже проголосовали за данного ведущего\n\n",
+        "no": "\n\nВы уже проголосовали против данного ведущего\n\n",
+    }
+
+    def __init__(self, view: dict):
+        round_id = view["round_id"]
+        self.individual = view.get("round_type", "standard") == "individual"
+        self.participants = []
+        for p in view["participants"]:
+            if self.individual:
+                buttons = {
+                    (choice, marked): InlineKeyboardButton(
+                        text=label + (mark if marked else ""),
+                        callback_data=f"vote_{round_id}_{p['id']}_{choice}",
+                    )
+                    for choice, label, mark in (("yes", "Да", " ❤️"), ("no", "Нет", " 💔"))
+                    for marked in (False, True)
+                }
+                name_text = f"<b>{p.get('full_name', '???')}</b> ?"
+            else:
+                text = f"#{p['order_number']} {p.get('full_name', '?')}"
+                buttons = {
+                    marked: InlineKeyboardButton(
+                        text=text + (" ❤️" if marked else ""), callback_data=f"vote_{round_id}_{p['id']}"
+                    )
+                    for marked in (False, True)
+                }
+                name_text = ""
+            self.participants.append((p["id"], name_text, buttons))
+
+    def render(self, user_votes: list) -> tuple:
+        choices = {v["participant_id"]: v.get("choice") for v in user_votes}
+        rows = []
+        if not self.individual:
+            for participant_id, _, buttons in self.participants:
+                rows.append([buttons[participant_id in choices]])
+            return self.STANDARD_HEADER, InlineKeyboardMarkup(inline_keyboard=rows)
+
+        parts = [self.INDIVIDUAL_HEADER]
+        if not self.participants:
+            parts.append("Участников пока нет\n")
+        for participant_id, name_text, buttons in self.participants:
+            choice = choices.get(participant_id)
+            parts.append(name_text)
+            if choice in self.VOTED_TEXT:
+                parts.append(self.VOTED_TEXT[choice])
+            rows.append([buttons[("yes", choice == "yes")], buttons[("no", choice == "no")]])
+        return "".join(parts), InlineKeyboardMarkup(inline_keyboard=rows)
+
+# Версия раунда -> RoundKeyboard (храним только текущую, как shared_round_cache)
+keyboard_templates: Dict[str, RoundKeyboard] = {}
+
+def render_round_view(view: dict) -> tuple:
+    """Текст и клавиатура голосования для ответа get_round_view()"""
+    version = view.get("version")
+    template = keyboard_templates.get(version) if version else None
+    if template is None:
+        with stats.timed("render", "template"):
+            template = RoundKeyboard(view)
+        if version:
+            keyboard_templates.clear()
+            keyboard_templates[version] = template
+    with stats.timed("render", "user_keyboard"):
+        return template.render(view.get("user_votes", []))
+
 async def transfer_winners_to_round(winners: List[Dict], target_round_id: int) -> str:
     if not winners:
         return "Нет победителей для переноса."
-    success_count = 0
-    errors = []
+    participants = []
     for winner in winners:
         yes_voters_str = ", ".join(map(str, winner.get("yes_voters", [])))
-        payload = {
-            "round_id": target_round_id,
+        participants.append({
             "full_name": winner["full_name"],
             "description": f"Из индивидуального раунда (голосов: {winner['votes']}). Yes voters: {yes_voters_str}"
-        }
-        try:
-            await api_post(API_ADD_PARTICIPANT, payload)
-            success_count += 1
-        except Exception as e:
-            errors.append(f"{winner['full_name']}: {str(e)}")
-        await asyncio.sleep(0.07)  # Для масштаба, чтобы не перегружать
+        })
+    # Один запрос на всех победителей — сервер добавляет их одной транзакцией
+    try:
+        resp = await api_post(API_ADD_PARTICIPANTS, {"round_id": target_round_id, "participants": participants})
+    except Exception as e:
+        return f"Добавлено 0/{len(winners)}. Ошибка: {str(e)}"
+    errors = [f"{winners[r['row'] - 1]['full_name']}: {r['error']}" for r in resp["results"] if r["status"] != "ok"]
     if errors:
-        return f"Добавлено {success_count}/{len(winners)}. Ошибки: {', '.join(errors)}"
-    return f"Все {success_count} победителей добавлены успешно!"
+        return f"Добавлено {resp['created']}/{len(winners)}. Ошибки: {', '.join(errors)}"
+    return f"Все {resp['created']} победителей добавлены успешно!"
 
 # ──────────────────────────────────────────────
 # ОБЩИЕ КОМАНДЫ
@@ -188,6 +353,11 @@ async def cmd_start(message: Message):
         "Нажимай кнопку внизу и голосуй ⬇️\n",
         reply_markup=vote_keyboard
     )
+    # Нажавшие /start получают рассылки, даже если ещё не голосовали
+    try:
+        await api_post(API_BOT_USERS, {"telegram_id": message.from_user.id})
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить пользователя {message.from_user.id}: {e}")
 
 @dp.message(lambda message: message.text == "Проголосовать")
 async def cmd_vote_button(message: Message):
@@ -207,6 +377,8 @@ async def cmd_help(message: Message):
             [InlineKeyboardButton(text="Завершение раунда", callback_data="help_end_round")],
             [InlineKeyboardButton(text="Добавление участников", callback_data="help_add_participant")],
             [InlineKeyboardButton(text="Изменение текущего раунда", callback_data="help_set_current_round")],
+            [InlineKeyboardButton(text="Статистика бота", callback_data="help_stats")],
+            [InlineKeyboardButton(text="Рассылка о раунде", callback_data="help_broadcast")],
         ])
     await message.answer("📖 Помощь — выберите пункт:", reply_markup=kb)
     await message.answer("Используй клавиатуру внизу для быстрого доступа", reply_markup=vote_keyboard)
@@ -220,7 +392,10 @@ async def process_help_callback(callback: CallbackQuery):
         "end": "Админ-команда /end_round — выбираете раунд, завершаете, решаете куда перенести победителей.",
         "add": "Админ-команда /add_participant — выбираете кампанию → раунд → добавляете участников по одному.",
         "set": "Админ-команда /set_current_round — выбираете кампанию → раунд → добавляете участников по одному.",
-        "myid": "Напишите /myid — бот покажет ваш телеграмм ID"
+        "myid": "Напишите /myid — бот покажет ваш телеграмм ID",
+        "stats": "Админ-команда /stats — задержки запросов к серверу и Telegram, ошибки обработчиков, задержка бота.",
+        "broadcast": "Админ-команда /broadcast — сообщить о текущем раунде всем, кто голосовал или нажимал /start. "
+                     "Прогресс — /broadcast_status."
     }
     text = texts.get(topic, "Подробностей пока нет.")
     await callback.message.answer(text)
@@ -230,15 +405,70 @@ async def process_help_callback(callback: CallbackQuery):
 async def cmd_myid(message: Message):
     await message.answer(f"Ваш Telegram ID: **{message.from_user.id}**", reply_markup=vote_keyboard)
 
+@dp.message(Command("stats"))
+async def cmd_stats(message: Message):
+    if not is_admin(message.from_user.id):
+        await message.answer("Только для админов", reply_markup=vote_keyboard)
+        return
+    await message.answer(stats.format_summary())
+
+# ──────────────────────────────────────────────
+# РАССЫЛКА О РАУНДЕ
+# ──────────────────────────────────────────────
+async def report_blocked_users(telegram_ids: List[int]):
+    await api_post(API_BOT_USERS_BLOCKED, {"telegram_ids": telegram_ids})
+
+async def report_broadcast_finished(state: dict):
+    await bot.send_message(state["admin_chat_id"], broadcaster.format_progress())
+
+broadcaster = Broadcaster(
+    bot, BROADCAST_STATE_PATH, reply_markup=vote_keyboard,
+    report_blocked=report_blocked_users, on_finish=report_broadcast_finished,
+)
+
+@dp.message(Command("broadcast"))
+async def cmd_broadcast(message: Message):
+    if not is_admin(message.from_user.id):
+        await message.answer("Только для админов", reply_markup=vote_keyboard)
+        return
+    if broadcaster.running:
+        await message.answer(broadcaster.format_progress())
+        return
+    try:
+        round_info = await api_get(API_ACTIVE_ROUND)
+        if not round_info.get("round_id"):
+            await message.answer("Активного раунда нет — оповещать не о чем.", reply_markup=vote_keyboard)
+            return
+        data = await api_get(API_BROADCAST_RECIPIENTS, ADMIN_HEADERS, timeout=30)
+    except Exception as e:
+        await message.answer(f"Ошибка: {e}", reply_markup=vote_keyboard)
+        return
+    text = (
+        f"🔥 Начался новый раунд: {round_info['round_name']}!\n\n"
+        "Жми «Проголосовать» внизу ⬇️"
+    )
+    broadcaster.start(text, data["recipients"], round_id=round_info["round_id"], admin_chat_id=message.chat.id)
+    minutes = data["count"] / OUTBOUND_GLOBAL_RATE / 60
+    await message.answer(
+        f"📣 Рассылка запущена: {data['count']} получателей, около {minutes:.0f} мин.\n"
+        "Прогресс — /broadcast_status, по окончании пришлю отчёт."
+    )
+
+@dp.message(Command("broadcast_status"))
+async def cmd_broadcast_status(message: Message):
+    if not is_admin(message.from_user.id):
+        await message.answer("Только для админов", reply_markup=vote_keyboard)
+        return
+    await message.answer(broadcaster.format_progress())
+
 # ──────────────────────────────────────────────
 # ГОЛОСОВАНИЕ
 # ──────────────────────────────────────────────
 @dp.message(Command("vote", "list", "participants"))
 async def cmd_show_participants(message: Message):
     user_id = message.from_user.id
-    url = f"{API_ACTIVE_ROUND_INFO}?user_id={user_id}"
     try:
-        data = await api_get(url)
+        data = await get_round_view(user_id)
         if not data.get("round_id"):
             msg = data.get("message") or "Активного раунда сейчас нет."
             await message.answer(
@@ -246,72 +476,7 @@ async def cmd_show_participants(message: Message):
                 reply_markup=vote_keyboard
             )
             return
-        round_name = data["round_name"]
-        round_type = data.get("round_type", "standard")
-        participants = data["participants"]
-        user_votes = data.get("user_votes", [])  # Список всех голосов
-        print(round_name)
-        text = ""
-        #text = f"<b>{round_name}</b>\n\n"
-        kb = InlineKeyboardMarkup(inline_keyboard=[])
-        if round_type == "individual":
-            text += "Готовы ли вы пригласить на свое мероприятие такого ведущего, как\n"
-            if len(participants) == 0:
-                text += "Участников пока нет\n"
-            else:
-                for p in participants:
-                    full_name = p.get('full_name', '???')
-                    description = p.get('description', '').strip()
-                    # Основное сообщение — имя и описание крупно
-                    text += f"<b>{full_name}</b> ?"
-                    # if description:
-                    #     text += f"{description}\n"
-                    #text += f"Голосов «Да»: {p['votes']}\n\n"
-                    # Если пользователь уже голосовал — добавляем информацию
-                    user_vote = next((v for v in user_votes if v["participant_id"] == p["id"]), None)
-                    if user_vote:
-                        choice_upper = user_vote.get('choice', '').upper()
-                        # participant_name = user_vote.get('participant_name', '???')
-                        text += f"\n\nВы уже проголосовали "
-                        if choice_upper == 'YES':
-                            text += f"за данного ведущего\n\n"
-                        else:
-                            text += f"против данного ведущего\n\n"
-                # Кнопки — только Да / Нет, с отметкой если голосовал
-                for p in participants:
-                    row = []
-                    # Кнопка "Да"
-                    da_text = "Да"
-                    user_vote = next((v for v in user_votes if v["participant_id"] == p["id"]), None)
-                    if user_vote and user_vote.get("choice") == "yes":
-                        da_text += " ❤️"
-                    row.append(
-                        InlineKeyboardButton(
-                            text=da_text,
-                            callback_data=f"vote_{data['round_id']}_{p['id']}_yes"
-                        )
-                    )
-                    # Кнопка "Нет"
-                    net_text = "Нет"
-                    if user_vote and user_vote.get("choice") == "no":
-                        net_text += " 💔"
-                    row.append(
-                        InlineKeyboardButton(
-                            text=net_text,
-                            callback_data=f"vote_{data['round_id']}_{p['id']}_no"
-                        )
-                    )
-                    kb.inline_keyboard.append(row)
-        else:
-            # Standard: список кнопок для множественного выбора
-            voted_participant_ids = [vote["participant_id"] for vote in user_votes]
-            text += "Вы можете голосовать за нескольких (по 1 на каждого).\n"
-            text += "Выберите участников (можно нескольких):\n"
-            for p in participants:
-                btn_text = f"#{p['order_number']} {p.get('full_name', '?')}" #({p['votes']} голосов)
-                if p["id"] in voted_participant_ids:
-                    btn_text += " ❤️   "
-                kb.inline_keyboard.append([InlineKeyboardButton(text=btn_text, callback_data=f"vote_{data['round_id']}_{p['id']}")])
+        text, kb = render_round_view(data)
         await message.answer(text, reply_markup=kb, parse_mode="HTML")
     except Exception as e:
         logger.error(f"Ошибка загрузки раунда: {e}")
@@ -320,8 +485,21 @@ async def cmd_show_participants(message: Message):
             reply_markup=vote_keyboard
         )
 
-@dp.callback_query(lambda c: c.data.startswith("vote_"))
-async def process_vote_callback(callback: CallbackQuery):
+class VoteTaps:
+    """Нажатия одного пользователя в одном сообщении, пока его голос отправляется"""
+
+    def __init__(self, first: CallbackQuery):
+        self.sent = {first.data}            # кнопки, уже отправленные или ждущие отправки
+        self.queue: List[CallbackQuery] = []
+
+# (chat_id, message_id, user_id) -> нажатия в полёте
+vote_taps: Dict[tuple, VoteTaps] = {}
+
+async def submit_vote(callback: CallbackQuery) -> tuple:
+    """
+    Отправляет голос одной кнопки и отвечает на нажатие.
+    Возвращает (обновлять ли клавиатуру, user_state из ответа сервера).
+    """
     try:
         parts = callback.data.split("_")
         round_id = int(parts[1])
@@ -329,30 +507,35 @@ async def process_vote_callback(callback: CallbackQuery):
         choice = parts[3] if len(parts) > 3 else None
     except Exception:
         await callback.answer("Ошибка кнопки 😕", show_alert=True)
-        return
+        return False, None
 
     user_id = callback.from_user.id
     payload = {
         "round": round_id,
         "participant": participant_id,
-        "user_telegram_id": user_id
+        "user_telegram_id": user_id,
+        # Сервер вернёт голоса пользователя — клавиатуру строим без GET user-votes/
+        "return_state": True,
     }
     if choice:
         payload["choice"] = choice
 
     try:
         # Пытаемся отдать голос
-        await api_post(API_VOTE_URL, payload, PUBLIC_HEADERS, timeout=8)
+        resp = await api_post(API_VOTE_URL, payload, PUBLIC_HEADERS, timeout=8)
         await callback.answer("Голос учтён! Спасибо! ❤️", show_alert=True)
+        return True, resp.get("user_state")
 
     except aiohttp.ClientResponseError as e:
         msg = "Не удалось проголосовать 😔"
         is_already_voted = False
+        user_state = None
 
-        try:
-            error_data = await e.response.json()
+        error_data = getattr(e, "data", None)
+        if isinstance(error_data, dict):
             error_text = error_data.get("non_field_errors", [str(error_data)])[0]
-        except Exception:
+            user_state = error_data.get("user_state")
+        else:
             error_text = str(e)
 
         lower_text = error_text.lower()
@@ -361,22 +544,59 @@ async def process_vote_callback(callback: CallbackQuery):
             is_already_voted = True
 
         await callback.answer(msg, show_alert=True)
-
-        # Если это не дубль — выходим без обновления
-        if not is_already_voted:
-            return
+        # Если это не дубль — без обновления
+        return is_already_voted, user_state
 
     except Exception as e:
         logger.error(f"Неожиданная ошибка при голосовании: {e}")
         await callback.answer("Что-то пошло не так... Попробуй позже", show_alert=True)
+        return False, None
+
+@dp.callback_query(lambda c: c.data.startswith("vote_"))
+async def process_vote_callback(callback: CallbackQuery):
+    user_id = callback.from_user.id
+    key = (callback.message.chat.id, callback.message.message_id, user_id)
+    taps = vote_taps.get(key)
+    if taps is not None:
+        # Голос из этого сообщения уже отправляется: повтор той же кнопки отбрасываем,
+        # другую кнопку отправим следом, а клавиатуру обновим один раз в конце
+        if callback.data in taps.sent:
+            stats.count("taps_dropped")
+            stats.count("api_calls_saved")
+            stats.count("edits_saved")
+            await callback.answer("Голос уже отправляется…")
+        else:
+            taps.sent.add(callback.data)
+            taps.queue.append(callback)
+            stats.count("taps_queued")
+        return
+
+    taps = vote_taps[key] = VoteTaps(callback)
+    refresh, user_state = False, None
+    try:
+        current = callback
+        while True:
+            voted, state = await submit_vote(current)
+            if voted:
+                if refresh:
+                    # Предыдущий голос тоже требовал правки сообщения — делаем одну на всех
+                    stats.count("edits_saved")
+                refresh = True
+                user_state = state or user_state
+            # Между проверкой очереди и удалением ключа нет await — новое нажатие не потеряется
+            if not taps.queue:
+                break
+            current = taps.queue.pop(0)
+    finally:
+        vote_taps.pop(key, None)
+    if not refresh:
         return
 
     # ──────────────────────────────────────────────
     # Обновляем список участников (без лишней кнопки)
     # ──────────────────────────────────────────────
     try:
-        url = f"{API_ACTIVE_ROUND_INFO}?user_id={user_id}"
-        fresh_data = await api_get(url)
+        fresh_data = await get_round_view(user_id, user_state)
 
         if not fresh_data.get("round_id"):
             await callback.message.edit_text(
@@ -385,63 +605,7 @@ async def process_vote_callback(callback: CallbackQuery):
             )
             return
 
-        round_name = fresh_data["round_name"]
-        round_type = fresh_data.get("round_type", "standard")
-        participants = fresh_data["participants"]
-        user_votes = fresh_data.get("user_votes", [])
-
-        #text = f"<b>{round_name}</b>\n\n"
-        text = ""
-        kb = InlineKeyboardMarkup(inline_keyboard=[])
-
-        if round_type == "individual":
-            text += "Готовы ли вы пригласить на свое мероприятие такого ведущего, как\n"
-            if not participants:
-                text += "Участников пока нет\n"
-            else:
-                for p in participants:
-                    full_name = p.get('full_name', '???')
-                    description = p.get('description', '').strip()
-                    text += f"<b>{full_name}</b> ?"
-                    # if description:
-                    #     text += f"{description}\n"
-                    # text += f"Голосов «Да»: {p['votes']}\n\n"
-
-            for p in participants:
-                row = []
-                da_text = "Да"
-                user_vote = next((v for v in user_votes if v.get("participant_id") == p["id"]), None)
-                if user_vote and user_vote.get("choice") == "yes":
-                    text += "\n\nВы уже проголосовали за данного ведущего"
-                    da_text += " ❤️"
-                row.append(InlineKeyboardButton(
-                    text=da_text,
-                    callback_data=f"vote_{fresh_data['round_id']}_{p['id']}_yes"
-                ))
-
-                net_text = "Нет"
-                if user_vote and user_vote.get("choice") == "no":
-                    text += "\n\nВы уже проголосовали против данного ведущего"
-                    net_text += " 💔"
-                row.append(InlineKeyboardButton(
-                    text=net_text,
-                    callback_data=f"vote_{fresh_data['round_id']}_{p['id']}_no"
-                ))
-                kb.inline_keyboard.append(row)
-
-        else:
-            voted_participant_ids = [v["participant_id"] for v in user_votes]
-            text += "Вы можете голосовать за нескольких (по 1 на каждого).\n"
-            text += "Выберите участников (можно нескольких):\n"
-            for p in participants:
-                btn_text = f"#{p['order_number']} {p.get('full_name', '?')}" # ({p['votes']} голосов)
-                if p["id"] in voted_participant_ids:
-                    btn_text += " ❤️    "
-                kb.inline_keyboard.append([InlineKeyboardButton(
-                    text=btn_text,
-                    callback_data=f"vote_{fresh_data['round_id']}_{p['id']}"
-                )])
-
+        text, kb = render_round_view(fresh_data)
 
         # Редактируем сообщение
         await callback.message.edit_text(
@@ -529,8 +693,10 @@ async def process_addp_round(callback: CallbackQuery, state: FSMContext):
         return
     await state.update_data(round_id=round_id)
     await callback.message.edit_text(
-        "Отправляйте участников по одному:\nФИО [описание в скобках]\n\n"
-        "Пример: Иванов Иван (хороший спикер)\n\n"
+        "Отправляйте участников — по одному на строку, можно сразу списком:\nФИО [описание в скобках]\n\n"
+        "Пример: Иванов Иван (хороший спикер)\n"
+        "Подойдёт и вставка из таблицы: ФИО и описание через TAB, "
+        "или CSV с первой строкой-заголовком «ФИО,описание»\n\n"
         "Готово / отмена — завершить."
     )
     await state.set_state(AddParticipantStates.waiting_for_name)
@@ -538,33 +704,31 @@ async def process_addp_round(callback: CallbackQuery, state: FSMContext):
 
 @dp.message(AddParticipantStates.waiting_for_name)
 async def process_add_participant_name(message: Message, state: FSMContext):
-    txt = message.text.strip().lower()
-    if txt in ("готово", "всё", "стоп", "отмена"):
+    txt = message.text.strip()
+    if txt.lower() in ("готово", "всё", "стоп", "отмена"):
         await message.answer("Добавление завершено.", reply_markup=vote_keyboard)
         await state.clear()
         return
-    full_name = txt.title()
-    description = ""
-    if "(" in txt and ")" in txt:
-        parts = txt.split("(", 1)
-        full_name = parts[0].strip().title()
-        description = parts[1].rstrip(")").strip()
-    if not full_name:
+    if not txt:
         await message.answer("ФИО пустое. Попробуйте снова.", reply_markup=vote_keyboard)
         return
     data = await state.get_data()
     round_id = data.get("round_id")
+    # Строки разбирает сервер: «ФИО (описание)», TSV или CSV с заголовком — всё одним запросом
     payload = {
         "round_id": round_id,
-        "full_name": full_name,
-        "description": description
+        "text": txt
     }
     try:
-        await api_post(API_ADD_PARTICIPANT, payload)
-        text = (f"Добавлен: {full_name} 👍\n"
-                "Что дальше?\n "
-                "Напиши «стоп» или «готово», чтобы завершить\n "
-                "/vote — посмотреть, как выглядит раунд сейчас")
+        resp = await api_post(API_ADD_PARTICIPANTS, payload)
+        added = [r["full_name"] for r in resp["results"] if r["status"] == "ok"]
+        failed = [f"строка {r['row']}: {r['error']}" for r in resp["results"] if r["status"] != "ok"]
+        text = f"Добавлен{'ы' if len(added) > 1 else ''}: {', '.join(added)} 👍\n" if added else ""
+        if failed:
+            text += f"Не добавлено: {'; '.join(failed)}\n"
+        text += ("Что дальше?\n "
+                 "Напиши «стоп» или «готово», чтобы завершить\n "
+                 "/vote — посмотреть, как выглядит раунд сейчас")
 
         await message.answer(text, reply_markup=vote_keyboard)
     except Exception as e:
@@ -688,6 +852,7 @@ async def process_sr_winners_count(message: Message, state: FSMContext):
         msg += "\n\nЧто дальше?\n"
         msg += "• /add_participant — добавить участников в этот раунд\n"
         msg += "• /vote — посмотреть, как выглядит раунд для пользователей\n"
+        msg += "• /broadcast — когда раунд готов, оповестить всех голосовавших\n"
         msg += "• /end_round — когда захочешь завершить раунд\n"
         msg += "• /set_current_round — если нужно переключить текущий раунд"
 
@@ -1049,9 +1214,35 @@ async def process_setcr_round(callback: CallbackQuery, state: FSMContext):
 # ──────────────────────────────────────────────
 # ЗАПУСК
 # ──────────────────────────────────────────────
+def make_webhook_server() -> WebhookServer:
+    return WebhookServer(
+        dp, bot, secret=WEBHOOK_SECRET, workers=WEBHOOK_WORKERS,
+        queue_size=WEBHOOK_QUEUE, record_path=WEBHOOK_RECORD_PATH,
+    )
+
+async def run_webhook():
+    runner = await serve(make_webhook_server().make_app(WEBHOOK_PATH), WEBHOOK_HOST, WEBHOOK_PORT)
+    logger.info(f"Webhook слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    try:
+        if WEBHOOK_URL:
+            await bot.set_webhook(
+                WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
+
 async def main():
-    logger.info("Бот запущен")
-    await dp.start_polling(bot)
+    logger.info(f"Бот запущен ({BOT_MODE})")
+    if BOT_MODE == "webhook":
+        await run_webhook()
+    else:
+        # Пока установлен webhook, Telegram не отдаёт getUpdates
+        await bot.delete_webhook()
+        await dp.start_polling(bot)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
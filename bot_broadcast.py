@@ -0,0 +1,176 @@
+# bot_broadcast.py
+# Рассылка одного сообщения многим пользователям (например, «начался новый раунд», /broadcast в bot.py).
+# Темп задаёт планировщик bot_outbound.py: рассылка идёт с низшим приоритетом (bulk),
+# поэтому ответы на кнопки и голосование она не задерживает. 50 тыс. получателей
+# при 30 сообщениях в секунду — около 28 минут.
+# Прогресс сохраняется в JSON после каждой пачки: после перезапуска бота рассылка
+# продолжается с места остановки (повторно может уйти только последняя пачка).
+import asyncio
+import json
+import logging
+import os
+import time
+
+from aiogram.exceptions import TelegramForbiddenError
+
+from bot_outbound import bulk
+
+logger = logging.getLogger(__name__)
+
+# Отправок одновременно — примерно столько, сколько общий лимит пропускает за секунду
+CHUNK_SIZE = 30
+# Заблокировавших бота сообщаем серверу пачками
+BLOCKED_REPORT_SIZE = 500
+DELIVERED, BLOCKED, FAILED = "delivered", "blocked", "failed"
+
+
+class Broadcaster:
+    def __init__(self, bot, state_path: str, *, reply_markup=None, report_blocked=None, on_finish=None,
+                 chunk_size: int = CHUNK_SIZE):
+        self.bot = bot
+        self.state_path = state_path
+        # Список получателей пишется один раз, отдельно от часто сохраняемого состояния
+        self.recipients_path = f"{state_path}.ids"
+        self.reply_markup = reply_markup
+        self.report_blocked = report_blocked  # async (telegram_ids) — отметить на сервере
+        self.on_finish = on_finish  # async (state) — например, отчёт админу
+        self.chunk_size = chunk_size
+        self.state = None
+        self.recipients = []
+        self.task = None
+        self.run_started = 0.0
+        self.run_cursor = 0
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self, text: str, recipients: list, **meta):
+        if self.running:
+            raise RuntimeError("Рассылка уже идёт")
+        self.recipients = list(recipients)
+        self.state = {
+            **meta,
+            "text": text,
+            "total": len(self.recipients),
+            "cursor": 0,
+            DELIVERED: 0,
+            BLOCKED: 0,
+            FAILED: 0,
+            "blocked_pending": [],
+            "started_at": time.time(),
+            "finished_at": None,
+        }
+        tmp_path = f"{self.recipients_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{user_id}\n" for user_id in self.recipients)
+        os.replace(tmp_path, self.recipients_path)
+        self.save()
+        self.task = asyncio.create_task(self.run())
+
+    def resume(self) -> bool:
+        """Продолжает незавершённую рассылку из файла состояния; True — продолжили"""
+        if self.running or not os.path.exists(self.state_path):
+            return False
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state["finished_at"]:
+            return False
+        self.state = state
+        try:
+            with open(self.recipients_path, encoding="utf-8") as f:
+                self.recipients = [int(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            # Без списка получателей продолжать нечего — закрываем рассылку, чтобы бот стартовал
+            logger.error(f"Рассылка не продолжена: нет файла получателей {self.recipients_path}")
+            state["finished_at"] = time.time()
+            self.save()
+            return False
+        self.task = asyncio.create_task(self.run())
+        logger.info(f"Рассылка продолжена с {state['cursor']} из {state['total']}")
+        return True
+
+    async def stop(self):
+        """Останавливает рассылку; состояние остаётся, resume() продолжит"""
+        if self.running:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    def save(self):
+        # Через временный файл: при падении не останется недописанного JSON
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    async def run(self):
+        state = self.state
+        self.run_started, self.run_cursor = time.monotonic(), state["cursor"]
+        try:
+            with bulk():
+                while state["cursor"] < len(self.recipients):
+                    chunk = self.recipients[state["cursor"]:state["cursor"] + self.chunk_size]
+                    results = await asyncio.gather(*(self.send(user_id) for user_id in chunk))
+                    for user_id, result in zip(chunk, results):
+                        state[result] += 1
+                        if result == BLOCKED:
+                            state["blocked_pending"].append(user_id)
+                    state["cursor"] += len(chunk)
+                    if len(state["blocked_pending"]) >= BLOCKED_REPORT_SIZE:
+                        await self.flush_blocked()
+                    self.save()
+            await self.flush_blocked()
+            state["finished_at"] = time.time()
+            self.save()
+        except Exception:
+            logger.exception("Рассылка остановлена из-за ошибки")
+            return
+        logger.info(self.format_progress())
+        if self.on_finish:
+            await self.on_finish(state)
+
+    async def send(self, user_id: int) -> str:
+        try:
+            await self.bot.send_message(user_id, self.state["text"], reply_markup=self.reply_markup)
+            return DELIVERED
+        except TelegramForbiddenError:
+            # Заблокировал бота или удалил аккаунт
+            return BLOCKED
+        except Exception as e:
+            logger.warning(f"Рассылка: не доставлено {user_id}: {e}")
+            return FAILED
+
+    async def flush_blocked(self):
+        blocked = self.state["blocked_pending"]
+        if not blocked or not self.report_blocked:
+            return
+        try:
+            await self.report_blocked(blocked)
+            self.state["blocked_pending"] = []
+        except Exception as e:
+            # Не страшно: отправим вместе со следующей пачкой
+            logger.warning(f"Не удалось отметить заблокировавших бота: {e}")
+
+    def format_progress(self) -> str:
+        state = self.state
+        if state is None:
+            return "Рассылок ещё не было."
+        total, cursor = state["total"], state["cursor"]
+        percent = cursor * 100 // total if total else 100
+        lines = [
+            f"📣 Рассылка: {cursor} из {total} ({percent}%)",
+            f"• доставлено: {state[DELIVERED]}",
+            f"• заблокировали бота: {state[BLOCKED]}",
+            f"• ошибок: {state[FAILED]}",
+        ]
+        if state["finished_at"]:
+            minutes = (state["finished_at"] - state["started_at"]) / 60
+            lines.append(f"Завершена за {minutes:.0f} мин")
+        elif self.running:
+            elapsed = time.monotonic() - self.run_started
+            rate = (cursor - self.run_cursor) / elapsed if elapsed else 0
+            eta = f", осталось около {(total - cursor) / rate / 60:.0f} мин" if rate else ""
+            lines.append(f"Идёт{eta}")
+        else:
+            lines.append("Остановлена (продолжится после перезапуска бота)")
+        return "\n".join(lines)
@@ -0,0 +1,258 @@
+# bot_outbound.py
+# Планировщик исходящих вызовов Telegram Bot API (middleware сессии бота).
+# Лимиты Telegram: около 30 сообщений в секунду на бота и около 1 в секунду в один чат,
+# при превышении приходит 429 (TelegramRetryAfter). Поэтому отправки идут через общий
+# token bucket и token bucket каждого чата, в порядке приоритета: сообщения, затем правки
+# и в последнюю очередь рассылки (bulk()). Ответы на нажатия кнопок (answerCallbackQuery)
+# сообщениями не считаются и уходят сразу, мимо обоих лимитов и паузы после 429.
+# Ждущие правки одного сообщения склеиваются в последнюю.
+# На TelegramRetryAfter отправки встают на паузу на указанное время, вызов повторяется.
+# Служебные методы (getUpdates, getMe, setWebhook...) идут мимо очереди.
+import asyncio
+import contextvars
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: меньше — раньше
+ANSWER, SEND, EDIT, BULK = 0, 1, 2, 3
+PRIORITIES = {
+    "AnswerCallbackQuery": ANSWER,
+    "SendMessage": SEND,
+    "SendPhoto": SEND,
+    "SendDocument": SEND,
+    "CopyMessage": SEND,
+    "ForwardMessage": SEND,
+    "EditMessageText": EDIT,
+    "EditMessageReplyMarkup": EDIT,
+    "EditMessageCaption": EDIT,
+}
+# Сколько раз повторять вызов после TelegramRetryAfter
+MAX_RETRIES = 3
+# Выше этого числа чатов забываем тех, кто давно ничего не получал
+MAX_CHAT_BUCKETS = 10000
+
+_bulk = contextvars.ContextVar("outbound_bulk", default=False)
+
+
+@contextmanager
+def bulk():
+    """Отправки внутри блока (и в созданных в нём задачах) — с низшим приоритетом"""
+    token = _bulk.set(True)
+    try:
+        yield
+    finally:
+        _bulk.reset(token)
+
+
+class TokenBucket:
+    """rate отправок в секунду в среднем, не больше burst подряд"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def wait(self, now: float) -> float:
+        """Через сколько секунд будет доступна отправка (0 — сейчас)"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        return self.wait(now) == 0.0 and self.tokens >= self.burst
+
+
+class Pending:
+    """Вызов в очереди; у склеенных правок несколько ожидающих"""
+
+    def __init__(self, key, priority: int, make_request, bot, method):
+        self.key = key
+        self.priority = priority
+        self.make_request = make_request
+        self.bot = bot
+        self.method = method
+        self.chat_id = getattr(method, "chat_id", None)
+        self.futures = []
+        self.queued = time.perf_counter()
+        self.attempts = 0
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    def __init__(self, stats=None, *, global_rate: float = 30, chat_rate: float = 1, chat_burst: float = 2):
+        self.stats = stats
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets = {}
+        self.queues = {priority: OrderedDict() for priority in (ANSWER, SEND, EDIT, BULK)}
+        self.paused_until = 0.0
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.sending = set()
+        self._seq = itertools.count()
+
+    async def __call__(self, make_request, bot, method):
+        priority = PRIORITIES.get(type(method).__name__)
+        if priority is None:
+            return await make_request(bot, method)
+        if _bulk.get():
+            priority = BULK
+        future = asyncio.get_running_loop().create_future()
+        key = self.coalesce_key(method) if priority == EDIT else None
+        queue = self.queues[priority]
+        if key is not None and key in queue:
+            # Ещё не отправленная правка того же сообщения устарела: отправим только новую
+            pending = queue[key]
+            pending.method, pending.make_request = method, make_request
+            self.count("edits_coalesced")
+        else:
+            key = key if key is not None else next(self._seq)
+            pending = queue[key] = Pending(key, priority, make_request, bot, method)
+        pending.futures.append(future)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        self.wakeup.set()
+        return await future
+
+    @staticmethod
+    def coalesce_key(method):
+        if getattr(method, "inline_message_id", None):
+            return type(method).__name__, method.inline_message_id
+        if getattr(method, "message_id", None) is None:
+            return None
+        return type(method).__name__, method.chat_id, method.message_id
+
+    def count(self, name: str):
+        if self.stats:
+            self.stats.count(name)
+
+    def chat_bucket(self, chat_id):
+        if chat_id is None:
+            return None
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_CHAT_BUCKETS:
+                now = time.monotonic()
+                self.chat_buckets = {c: b for c, b in self.chat_buckets.items() if not b.idle(now)}
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def run(self):
+        while True:
+            delay = self.dispatch()
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def dispatch(self):
+        """Отправляет всё, что позволяют лимиты; возвращает, через сколько секунд проверить снова"""
+        # Ответы на кнопки — не сообщения: лимиты на сообщения и паузу после 429 не ждут,
+        # иначе у пользователя «крутятся часики» на кнопке
+        answers = self.queues[ANSWER]
+        while answers:
+            self.start(answers.popitem(last=False)[1])
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        delay = None
+        for queue in self.queues.values():
+            for key, pending in list(queue.items()):
+                global_wait = self.global_bucket.wait(now)
+                if global_wait:
+                    return global_wait
+                bucket = self.chat_bucket(pending.chat_id)
+                chat_wait = bucket.wait(now) if bucket else 0.0
+                if chat_wait:
+                    # Этот чат ещё ждёт — пропускаем дальше по очереди сообщения других чатов
+                    delay = chat_wait if delay is None else min(delay, chat_wait)
+                    continue
+                del queue[key]
+                self.global_bucket.take()
+                if bucket:
+                    bucket.take()
+                self.start(pending)
+        return delay
+
+    def start(self, pending: Pending):
+        task = asyncio.create_task(self.send(pending))
+        self.sending.add(task)
+        task.add_done_callback(self.sending.discard)
+
+    async def send(self, pending: Pending):
+        if self.stats:
+            self.stats.record("telegram", "queue_wait", (time.perf_counter() - pending.queued) * 1000)
+        try:
+            result = await pending.make_request(pending.bot, pending.method)
+        except TelegramRetryAfter as e:
+            # Telegram не говорит, какой лимит превышен, — ждём все
+            self.paused_until = max(self.paused_until, time.monotonic() + e.retry_after)
+            self.count("retry_after")
+            logger.warning(f"Telegram просит подождать {e.retry_after} с ({type(pending.method).__name__})")
+            if pending.attempts < MAX_RETRIES:
+                pending.attempts += 1
+                if pending.priority == ANSWER:
+                    # Ответы паузу не ждут (см. dispatch) — свой повтор выдерживаем сами
+                    await asyncio.sleep(e.retry_after)
+                self.requeue(pending)
+                return
+            self.finish(pending, error=e)
+        except asyncio.CancelledError:
+            for future in pending.futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            self.finish(pending, error=e)
+        else:
+            self.finish(pending, result=result)
+
+    def requeue(self, pending: Pending):
+        """Повтор — в начало очереди своего приоритета"""
+        queue = self.queues[pending.priority]
+        newer = queue.get(pending.key)
+        if newer is not None:
+            # Пока ждали, пришла новая правка того же сообщения — отправится она
+            newer.futures.extend(pending.futures)
+            return
+        queue[pending.key] = pending
+        queue.move_to_end(pending.key, last=False)
+        self.wakeup.set()
+
+    @staticmethod
+    def finish(pending: Pending, result=None, error=None):
+        for future in pending.futures:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def close(self, timeout: float = 5):
+        """Даёт очереди разойтись (не дольше timeout) и останавливает планировщик"""
+        deadline = time.monotonic() + timeout
+        while (self.sending or any(self.queues.values())) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        tasks = [*self.sending, *([self.task] if self.task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.task = None
+        for queue in self.queues.values():
+            for pending in queue.values():
+                for future in pending.futures:
+                    future.cancel()
+            queue.clear()
@@ -0,0 +1,171 @@
+# bot_stats.py
+# Статистика бота в памяти процесса: задержки запросов к Django API по эндпоинтам,
+# длительность и ошибки обработчиков, вызовы Telegram Bot API, отрисовка клавиатур
+# и задержка event loop.
+# Плюс простые счётчики событий (например, сэкономленные нажатиями запросы).
+# Сводка — админ-командой /stats, периодические снимки в JSON — см. BOT_STATS_* в bot.py.
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+logger = logging.getLogger(__name__)
+
+# Перцентили считаются по последним N замерам каждого ключа
+RECENT_SAMPLES = 1000
+SECTIONS = ("api", "handlers", "telegram", "render", "loop_lag")
+SECTION_TITLES = {
+    "api": "Django API",
+    "handlers": "Обработчики",
+    "telegram": "Telegram Bot API",
+    "render": "Отрисовка клавиатур",
+    "loop_lag": "Задержка event loop",
+}
+
+
+class Timings:
+    """Число вызовов, ошибок и задержки (мс) последних RECENT_SAMPLES вызовов"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def add(self, ms: float, error: bool = False):
+        self.count += 1
+        self.errors += error
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.recent.append(ms)
+
+    def summary(self) -> dict:
+        recent = sorted(self.recent)
+
+        def percentile(q):
+            return round(recent[min(len(recent) - 1, int(len(recent) * q))], 2) if recent else 0.0
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class BotStats:
+    def __init__(self):
+        self.started = time.time()
+        self.sections = {name: defaultdict(Timings) for name in SECTIONS}
+        self.counters = Counter()
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def record(self, section: str, name: str, ms: float, error: bool = False):
+        self.sections[section][name].add(ms, error)
+
+    @contextmanager
+    def timed(self, section: str, name: str):
+        """Замеряет блок; исключение считается ошибкой и пробрасывается дальше"""
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.record(section, name, (time.perf_counter() - started) * 1000, error)
+
+    def snapshot(self) -> dict:
+        return {
+            "time": time.time(),
+            "uptime_s": round(time.time() - self.started),
+            "counters": dict(sorted(self.counters.items())),
+            **{
+                section: {name: timings.summary() for name, timings in sorted(entries.items())}
+                for section, entries in self.sections.items()
+            },
+        }
+
+    def format_summary(self, limit: int = 10) -> str:
+        """Текст для /stats: по каждому разделу — самые частые ключи"""
+        snapshot = self.snapshot()
+        uptime = snapshot["uptime_s"]
+        lines = [f"📊 Статистика за {uptime // 3600} ч {uptime % 3600 // 60} мин"]
+        for section in SECTIONS:
+            entries = sorted(snapshot[section].items(), key=lambda item: -item[1]["count"])
+            if not entries:
+                continue
+            lines.append("")
+            lines.append(SECTION_TITLES[section])
+            for name, s in entries[:limit]:
+                errors = f", ошибок {s['errors']}" if s["errors"] else ""
+                lines.append(
+                    f"• {name}: {s['count']}{errors}; "
+                    f"p50 {s['p50_ms']} / p95 {s['p95_ms']} / p99 {s['p99_ms']} мс, max {s['max_ms']}"
+                )
+        if snapshot["counters"]:
+            lines.append("")
+            lines.append("Счётчики")
+            lines.extend(f"• {name}: {n}" for name, n in snapshot["counters"].items())
+        return "\n".join(lines)
+
+    def write_snapshot(self, path: str):
+        # Через временный файл: читатель не увидит недописанный JSON
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+class HandlerStatsMiddleware(BaseMiddleware):
+    """Длительность и ошибки обработчиков (dp.message / dp.callback_query)"""
+
+    def __init__(self, stats: BotStats):
+        self.stats = stats
+
+    async def __call__(self, handler, event, data):
+        name = data["handler"].callback.__name__
+        with self.stats.timed("handlers", name):
+            return await handler(event, data)
+
+
+class TelegramStatsMiddleware(BaseRequestMiddleware):
+    """Время каждого вызова Bot API: SendMessage, EditMessageText, AnswerCallbackQuery..."""
+
+    def __init__(self, stats: BotStats):
+        self.stats = stats
+
+    async def __call__(self, make_request, bot, method):
+        with self.stats.timed("telegram", type(method).__name__):
+            return await make_request(bot, method)
+
+
+async def sample_loop_lag(stats: BotStats, interval: float = 0.5):
+    """Насколько позже запланированного просыпается sleep(): показывает, что loop занят"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = time.perf_counter() - started - interval
+        stats.record("loop_lag", "event_loop", max(lag, 0.0) * 1000)
+
+
+async def write_snapshots(stats: BotStats, path: str, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            stats.write_snapshot(path)
+        except OSError as e:
+            logger.error(f"Не удалось записать снимок статистики: {e}")
@@ -0,0 +1,98 @@
+# bot_webhook.py
+# Режим webhook (BOT_MODE=webhook в bot.py): Telegram сам присылает обновления POST-запросами.
+# Запрос проверяется по секрету (заголовок X-Telegram-Bot-Api-Secret-Token), обновление
+# кладётся в очередь и сразу подтверждается, обрабатывают его WEBHOOK_WORKERS задач.
+# Очередь ограничена: при переполнении отвечаем 503, и Telegram повторит доставку.
+# Воркеры — задачи одного процесса: FSM (MemoryStorage), кэши и склейка нажатий в bot.py
+# живут в памяти, поэтому несколько процессов на один токен запускать нельзя.
+import asyncio
+import hmac
+import json
+import logging
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Сколько ждать обработки очереди при остановке
+DRAIN_TIMEOUT = 10
+
+
+class WebhookServer:
+    def __init__(self, dp, bot, *, secret: str, workers: int = 16, queue_size: int = 1000, record_path: str = ""):
+        if not secret:
+            # Без секрета любой может прислать «обновление» от имени админа
+            raise ValueError("Для webhook нужен секрет (WEBHOOK_SECRET)")
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self.workers = workers
+        self.queue_size = queue_size
+        self.record_path = record_path
+        self.queue = None
+        self.tasks = []
+        self.record_file = None
+
+    def make_app(self, path: str) -> web.Application:
+        app = web.Application()
+        app.router.add_post(path, self.handle)
+        app.on_startup.append(self.on_startup)
+        app.on_cleanup.append(self.on_cleanup)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret):
+            return web.Response(status=401)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        if self.record_file:
+            # Записанные обновления можно потом прислать обратно (python bench_bot.py --updates)
+            self.record_file.write(json.dumps(data, ensure_ascii=False) + "\n")
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            return web.Response(status=503)
+        return web.Response()
+
+    async def worker(self):
+        while True:
+            data = await self.queue.get()
+            try:
+                await self.dp.feed_raw_update(self.bot, data)
+            except Exception:
+                logger.exception(f"Ошибка обработки обновления {data.get('update_id')}")
+            finally:
+                self.queue.task_done()
+
+    async def on_startup(self, app):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.record_path:
+            self.record_file = open(self.record_path, "a", encoding="utf-8", buffering=1)
+        await self.dp.emit_startup(bot=self.bot)
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        logger.info(f"Webhook: {self.workers} воркеров, очередь {self.queue_size}")
+
+    async def on_cleanup(self, app):
+        try:
+            await asyncio.wait_for(self.queue.join(), DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook: не обработано {self.queue.qsize()} обновлений")
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        if self.record_file:
+            self.record_file.close()
+            self.record_file = None
+        await self.dp.emit_shutdown(bot=self.bot)
+
+
+async def serve(app: web.Application, host: str, port: int) -> web.AppRunner:
+    """Запускает приложение; остановка — await runner.cleanup()"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
+
+Live results (/api/results/stream/) are long-lived SSE connections, so run
+the site through this module, e.g. ``uvicorn core.asgi:application``:
+all clients of one worker then share a single results producer.
 """
 
 import os
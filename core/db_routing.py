@@ -0,0 +1,47 @@
+# core/db_routing.py
+# Маршрутизация чтения: представления, помеченные @read_only, читают через
+# отдельное соединение READ_ONLY_ALIAS (для SQLite в WAL — тот же файл с mode=ro,
+# позже — реплика). Все записи всегда идут в default.
+import contextvars
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+READ_ONLY_ALIAS = "readonly"
+
+_read_only = contextvars.ContextVar("read_only", default=False)
+
+
+def read_only(view):
+    """Все чтения ORM внутри view уходят на READ_ONLY_ALIAS (если он настроен)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _read_only.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+    return wrapper
+
+
+class ReadOnlyRouter:
+    def db_for_read(self, model, **hints):
+        if _read_only.get() and READ_ONLY_ALIAS in settings.DATABASES:
+            # Внутри транзакции записи читаем свои же незакоммиченные изменения (например,
+            # счётчик после UPDATE в voting/sequences.py) — только с default
+            if connections["default"].in_atomic_block:
+                return None
+            return READ_ONLY_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Явно default: иначе Django взял бы базу, из которой объект был прочитан
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Обе базы — одни и те же данные
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != READ_ONLY_ALIAS
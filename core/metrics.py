@@ -0,0 +1,359 @@
+# core/metrics.py
+# Метрики в текстовом формате Prometheus без внешних сервисов (GET /metrics).
+# Каждый поток каждого процесса пишет свои значения в отдельный mmap-файл в METRICS["DIR"]:
+# запись без блокировок, а /metrics суммирует файлы всех воркеров gunicorn/uvicorn.
+# Файлы содержат только счётчики (гистограммы — тоже счётчики), поэтому значения
+# завершившихся процессов продолжают учитываться: при выдаче /metrics их файлы
+# сворачиваются в один архив (ARCHIVE_NAME) и удаляются.
+import bisect
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+try:
+    import fcntl
+except ImportError:  # Windows: архив сворачивается без блокировки между процессами
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "DIR": None,               # обязателен, если ENABLED
+    "ALLOWED_IPS": [],         # кому отдавать /metrics без токена
+    "TOKEN": "",               # Authorization: Bearer <TOKEN>; пусто — только по адресу
+}
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+INITIAL_FILE_SIZE = 64 * 1024
+# Заголовок файла: сколько байт занято записями (8 — пустой файл)
+USED = struct.Struct("<i")
+HEADER_SIZE = 8
+KEY_LENGTH = struct.Struct("<i")
+VALUE = struct.Struct("<d")
+# Сумма значений завершившихся процессов и имена уже учтённых в ней файлов
+ARCHIVE_NAME = "archive.json"
+LOCK_NAME = "archive.lock"
+
+_families = {}
+_config = None
+_local = threading.local()
+
+
+def get_config() -> dict:
+    global _config
+    if _config is None:
+        _config = {**DEFAULTS, **getattr(settings, "METRICS", {})}
+    return _config
+
+
+@receiver(setting_changed)
+def reset_config(*, setting, **kwargs):
+    global _config
+    if setting == "METRICS":
+        _config = None
+
+
+def read_entries(data, used: int):
+    """(ключ, значение, позиция значения) для каждой записи файла"""
+    pos = HEADER_SIZE
+    while pos < used:
+        length = KEY_LENGTH.unpack_from(data, pos)[0]
+        pos += KEY_LENGTH.size
+        key = bytes(data[pos:pos + length]).decode()
+        pos += length + _padding(length)
+        yield key, VALUE.unpack_from(data, pos)[0], pos
+        pos += VALUE.size
+
+
+def _padding(key_length: int) -> int:
+    # Значение выравнивается на 8 байт
+    return (8 - (KEY_LENGTH.size + key_length) % 8) % 8
+
+
+class ValuesFile:
+    """Значения одного потока: ключ -> float64 в mmap-файле. Пишет только поток-владелец"""
+
+    def __init__(self, directory, path):
+        self.pid = os.getpid()
+        self.directory = directory
+        self._file = open(path, "a+b")
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(INITIAL_FILE_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        # Файл мог остаться от прошлого потока с тем же pid/ident — продолжаем его
+        self._used = USED.unpack_from(self._map, 0)[0] or HEADER_SIZE
+        self._positions = {key: pos for key, _, pos in read_entries(self._map, self._used)}
+
+    def add(self, key: str, amount: float):
+        pos = self._positions.get(key)
+        if pos is None:
+            pos = self._append(key)
+        VALUE.pack_into(self._map, pos, VALUE.unpack_from(self._map, pos)[0] + amount)
+
+    def _append(self, key: str) -> int:
+        encoded = key.encode()
+        padding = _padding(len(encoded))
+        entry = struct.pack(f"<i{len(encoded)}s{padding}xd", len(encoded), encoded, 0.0)
+        while self._used + len(entry) > len(self._map):
+            size = len(self._map) * 2
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+        self._map[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        # Заголовок — последним: читатель не увидит недописанную запись
+        USED.pack_into(self._map, 0, self._used)
+        pos = self._used - VALUE.size
+        self._positions[key] = pos
+        return pos
+
+
+def _values() -> ValuesFile:
+    values = getattr(_local, "values", None)
+    directory = get_config()["DIR"]
+    # После fork (gunicorn --preload) у воркера должен быть свой файл
+    if values is None or values.pid != os.getpid() or values.directory != directory:
+        os.makedirs(directory, exist_ok=True)
+        values = _local.values = ValuesFile(
+            directory, os.path.join(directory, f"{os.getpid()}-{threading.get_ident()}.db")
+        )
+    return values
+
+
+def _key(sample: str, labels: dict) -> str:
+    return json.dumps([sample, labels], sort_keys=True, ensure_ascii=False)
+
+
+# (имя, метки) -> ключ в файле: json.dumps на каждый inc() заметно дороже самой записи
+_keys = {}
+
+
+def _add(sample: str, labels: dict, amount: float):
+    if not get_config()["ENABLED"]:
+        return
+    cache_key = (sample, *labels.items())
+    key = _keys.get(cache_key)
+    if key is None:
+        key = _keys[cache_key] = _key(sample, labels)
+    _values().add(key, amount)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        _families[name] = self
+
+    def inc(self, amount: float = 1, **labels):
+        _add(self.name, labels, amount)
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(float(b) for b in buckets)
+        _families[name] = self
+
+    def observe(self, value: float, **labels):
+        # В файле — число попаданий в каждый интервал; накопленные le считаются при выдаче
+        index = bisect.bisect_left(self.buckets, value)
+        le = _format_float(self.buckets[index]) if index < len(self.buckets) else "+Inf"
+        _add(f"{self.name}_bucket", {**labels, "le": le}, 1)
+        _add(f"{self.name}_sum", labels, value)
+        _add(f"{self.name}_count", labels, 1)
+
+    @contextmanager
+    def time(self, **labels):
+        """Контекстный менеджер и декоратор: замеряет длительность блока в секундах"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+class GaugeFunction:
+    """Значение считается в момент выдачи /metrics (например, из БД), в файлы не пишется"""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, func):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+        _families[name] = self
+
+
+def _read_file(path: str, totals):
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER_SIZE:
+        return
+    for key, value, _ in read_entries(data, USED.unpack_from(data, 0)[0]):
+        totals[key] += value
+
+
+def _read_archive(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, ARCHIVE_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"values": {}, "merged": []}
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) в Windows завершает процесс — файлы не сворачиваем
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def _locked(directory: str, exclusive: bool):
+    """flock на файле в каталоге метрик; без fcntl — без блокировки"""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, LOCK_NAME), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def compact(directory: str):
+    """
+    Переносит значения из файлов завершившихся процессов в архив и удаляет файлы.
+    Имена перенесённых файлов остаются в архиве до следующего раза: если процесс
+    упал между записью архива и удалением, файл удалится без повторного учёта.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with _locked(directory, exclusive=True):
+        archive = _read_archive(directory)
+        for name in archive["merged"]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+        dead = []
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            pid = os.path.basename(path).split("-", 1)[0]
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                dead.append(path)
+        if not dead and not archive["merged"]:
+            return
+        totals = defaultdict(float, archive["values"])
+        for path in dead:
+            _read_file(path, totals)
+        archive = {"values": totals, "merged": [os.path.basename(path) for path in dead]}
+        tmp_path = os.path.join(directory, f"{ARCHIVE_NAME}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(archive, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(directory, ARCHIVE_NAME))
+        for path in dead:
+            os.remove(path)
+
+
+def collect() -> dict:
+    """Сумма значений по всем файлам всех процессов и архиву завершившихся: ключ -> значение"""
+    directory = get_config()["DIR"]
+    compact(directory)
+    # Архив и удаление файлов меняются под блокировкой — читаем согласованный срез
+    with _locked(directory, exclusive=False):
+        totals = defaultdict(float, _read_archive(directory)["values"])
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            _read_file(path, totals)
+    return totals
+
+
+def _family_name(sample: str):
+    if sample in _families:
+        return sample
+    for suffix in ("_bucket", "_sum", "_count"):
+        if sample.endswith(suffix) and sample[:-len(suffix)] in _families:
+            return sample[:-len(suffix)]
+    return None
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    # le — последним, как у prometheus_client
+    names = sorted(labels, key=lambda name: (name == "le", name))
+    return "{" + ",".join(f'{name}="{_escape(labels[name])}"' for name in names) + "}"
+
+
+def render() -> str:
+    samples = defaultdict(list)
+    if get_config()["ENABLED"]:
+        for key, value in collect().items():
+            sample, labels = json.loads(key)
+            family = _family_name(sample)
+            # Метрики, которых больше нет в коде (старые файлы), пропускаем
+            if family is not None:
+                samples[family].append((sample, labels, value))
+
+    lines = []
+    for name, family in sorted(_families.items()):
+        lines.append(f"# HELP {name} {family.documentation}")
+        lines.append(f"# TYPE {name} {family.type}")
+        if isinstance(family, GaugeFunction):
+            try:
+                lines.append(f"{name} {_format_float(family.func())}")
+            except Exception:
+                logger.exception("Не удалось посчитать метрику %s", name)
+        elif isinstance(family, Histogram):
+            lines.extend(_render_histogram(family, samples[name]))
+        else:
+            for sample, labels, value in sorted(samples[name], key=lambda s: _format_labels(s[1])):
+                lines.append(f"{sample}{_format_labels(labels)} {_format_float(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _render_histogram(family: Histogram, samples: list) -> list:
+    series = defaultdict(lambda: {"buckets": defaultdict(float), "sum": 0.0, "count": 0.0})
+    for sample, labels, value in samples:
+        if sample.endswith("_bucket"):
+            le = labels.pop("le")
+            series[_key("", labels)]["buckets"][le] += value
+        elif sample.endswith("_sum"):
+            series[_key("", labels)]["sum"] += value
+        else:
+            series[_key("", labels)]["count"] += value
+    lines = []
+    for key, data in sorted(series.items()):
+        labels = json.loads(key)[1]
+        cumulative = 0.0
+        for le in [*map(_format_float, family.buckets), "+Inf"]:
+            cumulative += data["buckets"][le]
+            lines.append(f"{family.name}_bucket{_format_labels({**labels, 'le': le})} {_format_float(cumulative)}")
+        lines.append(f"{family.name}_sum{_format_labels(labels)} {_format_float(data['sum'])}")
+        lines.append(f"{family.name}_count{_format_labels(labels)} {_format_float(data['count'])}")
+    return lines
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым: Server-Timing и строка лога core.timing на каждый запрос (core/timing.py)
+    'core.timing.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,11 +79,35 @@ WSGI_APPLICATION = 'core.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # sqlite3 + WAL, busy_timeout и прочие PRAGMA (core/sqlite_backend/base.py)
+        'ENGINE': 'core.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            # Блокировка на запись берётся в BEGIN: без взаимных «database is locked»
+            # при апгрейде чтения до записи внутри transaction.atomic()
+            'transaction_mode': 'IMMEDIATE',
+            # True — писатели всех воркеров ждут в общей очереди (flock), а не в busy-retry
+            'write_lane': False,
+        },
+        # Тестовая база — файл, а не :memory:, чтобы тесты с потоками
+        # работали через отдельные соединения, как в проде. Во временном каталоге:
+        # в WAL рядом с ней остаются -wal/-shm
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'voting_test_db.sqlite3')},
+    },
+    # Только чтение: страницы результатов и публичные эндпоинты бота (core/db_routing.py).
+    # В WAL читатели не мешают записи голосов; для реплики достаточно сменить NAME/ENGINE
+    'readonly': {
+        'ENGINE': 'core.sqlite_backend',
+        'NAME': (BASE_DIR / 'db.sqlite3').as_uri() + '?mode=ro',
+        'OPTIONS': {
+            'pragmas': {'query_only': 'ON'},
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['core.db_routing.ReadOnlyRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -132,6 +159,51 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Кэш ответов бота (voting/response_cache.py). Поколение данных хранится в БД,
+# так что LocMem безопасен и при нескольких воркерах gunicorn (у каждого свой кэш);
+# общий бэкенд (FileBasedCache, Redis) лишь уменьшит число промахов.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'voting',
+    }
+}
+
+# Поколение из БД процесс помнит GENERATION_TTL секунд: столько другие воркеры
+# могут отдавать прежние ответы после изменения; 0 — перечитывать при каждом обращении
+RESPONSE_CACHE = {
+    'GENERATION_TTL': 1.0,
+}
+
+# Буферизованный приём голосов (voting/ingest.py).
+# ENABLED=False — каждый голос пишется отдельным INSERT, как раньше.
+VOTE_INGEST = {
+    'ENABLED': False,
+    'FLUSH_SIZE': 200,
+    'FLUSH_INTERVAL_MS': 5,
+    'MAX_PENDING': 10000,
+    'RESULT_TIMEOUT': 5,
+}
+
+# Живые результаты (SSE, voting/live.py). Стрим держит соединение открытым,
+# поэтому в проде сервер запускается через ASGI: uvicorn core.asgi:application
+RESULTS_STREAM = {
+    'POLL_INTERVAL': 1.0,
+    'HEARTBEAT': 15,
+    'CLIENT_QUEUE': 100,
+}
+
+# Метрики Prometheus (GET /metrics, core/metrics.py). DIR — общий для всех воркеров
+# каталог mmap-файлов (по умолчанию во временном каталоге, не в проекте); файлы
+# завершившихся процессов сворачиваются в один при выдаче /metrics.
+# /metrics доступен адресам из ALLOWED_IPS или с заголовком Authorization: Bearer <TOKEN>.
+METRICS = {
+    'ENABLED': True,
+    'DIR': os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'voting-metrics')),
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -146,6 +218,17 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        # Проектные логгеры: строки запросов core.timing, предупреждения и ошибки представлений
+        'core': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'voting': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
         '': {  # root logger
             'handlers': ['console'],
             'level': 'ERROR',
@@ -0,0 +1,182 @@
+# core/sqlite_backend/base.py
+# SQLite-бэкенд проекта: настроенные PRAGMA на каждом соединении
+# и (по желанию) общая очередь писателей между процессами gunicorn.
+#
+#   DATABASES = {"default": {
+#       "ENGINE": "core.sqlite_backend",
+#       "OPTIONS": {
+#           "transaction_mode": "IMMEDIATE",   # блокировка на запись берётся сразу в BEGIN
+#           "pragmas": {"busy_timeout": 10000},  # переопределяет PRAGMAS ниже
+#           "write_lane": True,
+#       },
+#   }}
+import os
+import threading
+from contextlib import contextmanager
+
+from django.db.backends.sqlite3 import base as sqlite3_base
+
+try:
+    import fcntl
+except ImportError:  # Windows: очередь работает только внутри процесса
+    fcntl = None
+
+PRAGMAS = {
+    # Читатели не блокируют писателя и наоборот
+    "journal_mode": "WAL",
+    # Сколько ждать чужую блокировку вместо мгновенного «database is locked»
+    "busy_timeout": 5000,
+    # В WAL достаточно fsync на чекпоинте, а не на каждом коммите
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    # Отрицательное значение — в КиБ: ~64 МБ кэша страниц на соединение
+    "cache_size": -64000,
+    "temp_store": "MEMORY",
+}
+
+# Запросы, которые не пишут в базу и не требуют очереди
+READ_PREFIXES = ("SELECT", "PRAGMA", "EXPLAIN")
+
+
+class WriteLane:
+    """
+    Очередь писателей одной базы: блокировка потоков процесса + flock
+    на файле рядом с базой для всех процессов. Писатели ждут своей очереди
+    в ядре, а не крутят busy-retry SQLite и не получают «database is locked».
+    """
+
+    def __init__(self, path):
+        self.path = f"{path}-writelock"
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if fcntl is None:
+            return
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        if fcntl is not None and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+_lanes = {}
+_lanes_lock = threading.Lock()
+
+
+def get_lane(path) -> WriteLane:
+    """Одна очередь на файл базы в пределах процесса"""
+    path = os.path.abspath(str(path))
+    with _lanes_lock:
+        if path not in _lanes:
+            _lanes[path] = WriteLane(path)
+        return _lanes[path]
+
+
+class LaneCursorWrapper(sqlite3_base.SQLiteCursorWrapper):
+    """Пишущие запросы вне transaction.atomic() тоже проходят через очередь"""
+    db = None
+
+    def _needs_lane(self, query):
+        db = self.db
+        return (
+            db is not None and db.write_lane is not None
+            and not db.in_atomic_block and not db.lane_held
+            and not query.lstrip()[:7].upper().startswith(READ_PREFIXES)
+        )
+
+    def execute(self, query, params=None):
+        if not self._needs_lane(query):
+            return super().execute(query, params)
+        with self.db.write_lane_held():
+            return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        if not self._needs_lane(query):
+            return super().executemany(query, param_list)
+        with self.db.write_lane_held():
+            return super().executemany(query, param_list)
+
+
+class DatabaseWrapper(sqlite3_base.DatabaseWrapper):
+    write_lane = None
+    lane_held = False
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **kwargs.pop("pragmas", {})}
+        use_lane = kwargs.pop("write_lane", False)
+        if use_lane and not self.is_in_memory_db():
+            self.write_lane = get_lane(self.settings_dict["NAME"])
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            # Режим журнала пишется в файл базы — не для :memory: и не для mode=ro
+            if name == "journal_mode" and (self.is_in_memory_db() or self.is_read_only()):
+                continue
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def is_read_only(self):
+        return "mode=ro" in str(self.settings_dict["NAME"])
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=LaneCursorWrapper)
+        cursor.db = self
+        return cursor
+
+    # --- очередь писателей: держится от BEGIN до COMMIT/ROLLBACK ---
+
+    def acquire_write_lane(self):
+        if self.write_lane is not None and not self.lane_held:
+            self.write_lane.acquire()
+            self.lane_held = True
+
+    def release_write_lane(self):
+        if self.lane_held:
+            self.lane_held = False
+            self.write_lane.release()
+
+    @contextmanager
+    def write_lane_held(self):
+        self.acquire_write_lane()
+        try:
+            yield
+        finally:
+            self.release_write_lane()
+
+    def _start_transaction_under_autocommit(self):
+        self.acquire_write_lane()
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self.release_write_lane()
+            raise
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self.release_write_lane()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self.release_write_lane()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self.release_write_lane()
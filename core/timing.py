@@ -0,0 +1,137 @@
+# core/timing.py
+# Замеры каждого запроса: число SQL-запросов и время в БД (через execute_wrapper,
+# работает и с DEBUG=False), время представления, рендеринга ответа и общее.
+# Результат — заголовок Server-Timing (виден во вкладке Network браузера)
+# и одна строка лога core.timing в формате key=value; длительность — ещё и в /metrics.
+import contextvars
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+REQUEST_SECONDS = metrics.Histogram(
+    "voting_http_request_seconds",
+    "Время обработки запроса по представлению (имя из urls.py)",
+)
+
+# Замер текущего запроса. Contextvar, а не обёртка на время запроса: под ASGI синхронные
+# представления работают в другом потоке со своими соединениями, а контекст туда копируется
+_current = contextvars.ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.view_started = None
+        self.view_finished = None
+        self.render_started = None
+        self.render_finished = None
+
+    def durations(self) -> dict:
+        """Длительности в мс: db, view, render, total"""
+        finished = time.perf_counter()
+        view_end = self.view_finished or finished
+        render = 0.0
+        if self.render_started is not None:
+            render = (self.render_finished or finished) - self.render_started
+        return {
+            "db": self.db * 1000,
+            "view": (view_end - self.view_started) * 1000 if self.view_started else 0.0,
+            "render": render * 1000,
+            "total": (finished - self.started) * 1000,
+        }
+
+
+def track_queries(execute, sql, params, many, context):
+    """execute_wrapper, постоянно стоящий на каждом соединении; вне запроса ничего не делает"""
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.db += time.perf_counter() - started
+        timing.queries += 1
+
+
+def install(connection):
+    if track_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_queries)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    install(connection)
+
+
+connection_created.connect(_on_connection_created)
+
+
+class RequestTimingMiddleware:
+    """Ставится первым в MIDDLEWARE, чтобы total покрывал остальные middleware"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Соединения, открытые до импорта модуля (например, в тестах), сигнал не застал
+        for conn in connections.all(initialized_only=True):
+            install(conn)
+        timing = request.timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = request.timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF Response и TemplateResponse рендерятся после представления:
+        # отсюда до post-render callback — время сериализации в JSON/HTML
+        timing = request.timing
+        timing.view_finished = timing.render_started = time.perf_counter()
+        response.add_post_render_callback(lambda r: setattr(timing, "render_finished", time.perf_counter()))
+        return response
+
+    def finish(self, request, response, timing):
+        d = timing.durations()
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={d["db"]:.1f};desc="{timing.queries} queries"',
+            f'view;dur={d["view"]:.1f}',
+            f'render;dur={d["render"]:.1f}',
+            f'total;dur={d["total"]:.1f}',
+        ])
+        logger.info(
+            "method=%s path=%s status=%s queries=%d db_ms=%.1f view_ms=%.1f render_ms=%.1f total_ms=%.1f",
+            request.method, request.path, response.status_code, timing.queries,
+            d["db"], d["view"], d["render"], d["total"],
+        )
+        match = request.resolver_match
+        REQUEST_SECONDS.observe(d["total"] / 1000, view=match.view_name if match else "unmatched")
+        return response
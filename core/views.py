@@ -1,10 +1,19 @@
+import hmac
+
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
+from core import metrics
+from core.db_routing import read_only
 from voting.models import Campaign, Round
 
 
+@read_only
 def home(request):
     # Собираем данные для отображения на главной
-    active_campaigns = Campaign.objects.filter(is_active=True).order_by('-created_at')
+    active_campaigns = Campaign.objects.filter(is_active=True).annotate(
+        rounds_count=Count('rounds')
+    ).order_by('-created_at')
     recent_rounds = Round.objects.select_related('campaign').order_by('-started_at')[:5]
 
     context = {
@@ -13,4 +22,20 @@ def home(request):
         'total_campaigns': Campaign.objects.count(),
         'total_rounds': Round.objects.count(),
     }
-    return render(request, 'core/home.html', context)
\ No newline at end of file
+    return render(request, 'core/home.html', context)
+
+
+def metrics_allowed(request) -> bool:
+    config = metrics.get_config()
+    if request.META.get("REMOTE_ADDR") in config["ALLOWED_IPS"]:
+        return True
+    token = config["TOKEN"]
+    auth = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(auth.encode(), f"Bearer {token}".encode())
+
+
+def metrics_view(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden("Доступ к метрикам закрыт")
+    # Формат text/plain 0.0.4 — то, что ожидает Prometheus
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,5 +1,6 @@
-from django.contrib import admin
-from .models import Campaign, Round, Participant, Vote
+from django.contrib import admin, messages
+from .models import BotUser, Campaign, Round, Participant, Vote
+from . import current_round
 
 
 @admin.register(Campaign)
@@ -10,8 +11,25 @@ class CampaignAdmin(admin.ModelAdmin):
 
 @admin.register(Round)
 class RoundAdmin(admin.ModelAdmin):
-    list_display = ("campaign", "number", "status", "started_at", "ended_at")
+    list_display = ("campaign", "number", "status", "is_current_display", "started_at", "ended_at")
     list_filter = ("status", "campaign")
+    actions = ["make_current"]
+
+    @admin.display(boolean=True, description="Текущий")
+    def is_current_display(self, obj):
+        return obj.is_current
+
+    @admin.action(description="Сделать текущим раундом")
+    def make_current(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, "Выберите один раунд", messages.ERROR)
+            return
+        round_obj = queryset.get()
+        if round_obj.status != "active":
+            self.message_user(request, "Текущим можно сделать только активный раунд", messages.ERROR)
+            return
+        current_round.set_current(round_obj)
+        self.message_user(request, f"Раунд {round_obj} теперь текущий")
 
 
 @admin.register(Participant)
@@ -28,4 +46,10 @@ class ParticipantAdmin(admin.ModelAdmin):
 class VoteAdmin(admin.ModelAdmin):
     list_display = ("user_telegram_id", "participant", "round", "created_at")
     list_filter = ("round",)
-    search_fields = ("user_telegram_id",)
\ No newline at end of file
+    search_fields = ("user_telegram_id",)
+
+
+@admin.register(BotUser)
+class BotUserAdmin(admin.ModelAdmin):
+    list_display = ("telegram_id", "started_at", "blocked_at")
+    search_fields = ("telegram_id",)
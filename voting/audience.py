@@ -0,0 +1,35 @@
+# voting/audience.py
+# Кому бот может писать сам: всем, кто голосовал (Vote.user_telegram_id) или нажимал /start.
+# Заблокировавшие бота исключаются до следующего /start.
+from django.utils import timezone
+
+from .models import BotUser, Vote
+
+
+def register_user(telegram_id: int) -> bool:
+    """Отмечает /start; True — пользователь новый. Повторный /start снимает блокировку"""
+    user, created = BotUser.objects.get_or_create(telegram_id=telegram_id)
+    if not created and user.blocked_at:
+        BotUser.objects.filter(pk=telegram_id).update(blocked_at=None)
+    return created
+
+
+def mark_blocked(telegram_ids) -> int:
+    """
+    Отмечает заблокировавших бота, в том числе голосовавших без /start
+    (для них строка BotUser создаётся сразу заблокированной); возвращает, скольких отметили.
+    """
+    now = timezone.now()
+    marked = BotUser.objects.bulk_create(
+        [BotUser(telegram_id=telegram_id, blocked_at=now) for telegram_id in set(telegram_ids)],
+        update_conflicts=True, update_fields=["blocked_at"], unique_fields=["telegram_id"],
+    )
+    return len(marked)
+
+
+def broadcast_recipients() -> list:
+    """Telegram ID получателей рассылки по возрастанию"""
+    voters = set(Vote.objects.values_list("user_telegram_id", flat=True).distinct())
+    started = set(BotUser.objects.filter(blocked_at__isnull=True).values_list("telegram_id", flat=True))
+    blocked = set(BotUser.objects.filter(blocked_at__isnull=False).values_list("telegram_id", flat=True))
+    return sorted((voters | started) - blocked)
@@ -0,0 +1,68 @@
+# voting/current_round.py
+# Какой раунд сейчас «текущий» для голосования.
+# Выбор админа хранится в одной строке CurrentRound (pk=1): переключение —
+# это один UPDATE, а не снятие флага со всех раундов.
+# Результат кэшируется в процессе и живёт, пока не сменилось поколение данных
+# (voting/response_cache.py): в установившемся режиме запросов к БД нет, переключение
+# в другом воркере видно не позже RESPONSE_CACHE["GENERATION_TTL"].
+from typing import NamedTuple, Optional
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import CurrentRound, Round
+from . import response_cache
+
+POINTER_PK = response_cache.POINTER_PK
+
+
+class Resolved(NamedTuple):
+    generation: Optional[str]
+    round_id: Optional[int]    # куда голосуют: выбранный раунд или последний активный
+    pointer_id: Optional[int]  # выбранный админом раунд, если он ещё активен
+
+
+_resolved = Resolved(None, None, None)
+
+
+def _load() -> tuple:
+    # Выбранный раунд первым, иначе самый свежий активный — один запрос
+    row = Round.objects.filter(status="active").order_by(
+        F("current_pointer__id").desc(nulls_last=True), "-started_at"
+    ).values_list("id", "current_pointer__id").first()
+    if row is None:
+        return None, None
+    round_id, pointer = row
+    return round_id, round_id if pointer is not None else None
+
+
+def resolve() -> Resolved:
+    global _resolved
+    # Поколение читаем до запроса: если его сменят во время запроса,
+    # результат сохранится под старым поколением и будет перечитан
+    generation = response_cache.current_generation()
+    resolved = _resolved
+    if resolved.generation == generation:
+        return resolved
+    round_id, pointer_id = _load()
+    _resolved = Resolved(generation, round_id, pointer_id)
+    return _resolved
+
+
+def current_round_id() -> Optional[int]:
+    return resolve().round_id
+
+
+def invalidate():
+    global _resolved
+    _resolved = Resolved(None, None, None)
+
+
+def set_current(round_obj):
+    """Делает round_obj текущим раундом"""
+    with transaction.atomic():
+        if not CurrentRound.objects.filter(pk=POINTER_PK).update(round=round_obj):
+            CurrentRound.objects.create(pk=POINTER_PK, round=round_obj)
+        transaction.on_commit(invalidate)
+        # update() не шлёт сигналы — новое поколение для остальных процессов
+        response_cache.bump_on_commit()
@@ -0,0 +1,193 @@
+# voting/ingest.py
+# Буферизованный приём голосов (write-behind): запрос кладёт голос в очередь,
+# один поток-писатель сбрасывает её в БД пачками через bulk_create.
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError, close_old_connections, transaction
+from django.dispatch import receiver
+
+from .models import Vote
+from . import tallies
+
+DEFAULTS = {
+    "ENABLED": False,          # по умолчанию — старая построчная запись
+    "FLUSH_SIZE": 200,         # сбрасываем, как только набралось N голосов...
+    "FLUSH_INTERVAL_MS": 5,    # ...или прошло столько миллисекунд с первого голоса в пачке
+    "MAX_PENDING": 10000,      # максимальный размер очереди
+    "RESULT_TIMEOUT": 5,       # сколько секунд запрос ждёт ответа писателя
+}
+
+ACCEPTED = "accepted"
+DUPLICATE = "duplicate"
+
+
+class BufferFull(Exception):
+    """Очередь голосов переполнена"""
+
+
+class VotePending(Exception):
+    """Писатель уже пишет голос, но не успел подтвердить: исход неизвестен"""
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "VOTE_INGEST", {})}
+
+
+def is_enabled() -> bool:
+    return bool(get_config()["ENABLED"])
+
+
+def stored_keys(keys: list) -> set:
+    """Какие из (round_id, user_telegram_id, participant_id) уже есть в БД"""
+    return set(
+        Vote.objects.filter(
+            round_id__in={k[0] for k in keys},
+            user_telegram_id__in={k[1] for k in keys},
+        ).values_list("round_id", "user_telegram_id", "participant_id")
+    )
+
+
+def write_votes(items: list) -> list:
+    """
+    Записывает пачку проверенных голосов (validated_data сериализатора)
+    и возвращает статус для каждого: ACCEPTED или DUPLICATE.
+    """
+    keys = [(d["round"].pk, d["user_telegram_id"], d["participant"].pk) for d in items]
+    results = []
+    new_votes = {}  # позиция в пачке -> Vote
+    with transaction.atomic():
+        existing = stored_keys(keys)
+        for index, (key, data) in enumerate(zip(keys, items)):
+            # Дубль в БД или повторное нажатие внутри той же пачки
+            if key in existing:
+                results.append(DUPLICATE)
+                continue
+            existing.add(key)
+            new_votes[index] = Vote(
+                round=data["round"],
+                participant=data["participant"],
+                user_telegram_id=data["user_telegram_id"],
+                choice=data.get("choice"),
+            )
+            results.append(ACCEPTED)
+        try:
+            with transaction.atomic():
+                Vote.objects.bulk_create(list(new_votes.values()))
+        except IntegrityError:
+            # Гонка с другим процессом: пишем по одному, конфликтующие — дубли.
+            # В счётчики попадают только действительно записанные строки
+            for index, vote in list(new_votes.items()):
+                try:
+                    with transaction.atomic():
+                        Vote.objects.bulk_create([vote])
+                except IntegrityError:
+                    results[index] = DUPLICATE
+                    del new_votes[index]
+        tallies.record_votes(list(new_votes.values()))
+    return results
+
+
+class VoteIngestBuffer:
+    """Ограниченная очередь голосов с единственным потоком-писателем"""
+
+    def __init__(self, flush_size: int, flush_interval_ms: float, max_pending: int):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._writer = None
+
+    def submit(self, data: dict) -> Future:
+        self._ensure_writer()
+        future = Future()
+        try:
+            self._queue.put_nowait((data, future))
+        except queue.Full:
+            raise BufferFull("Очередь голосов переполнена")
+        return future
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="vote-ingest-writer", daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.flush_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self.flush(batch)
+
+    def flush(self, batch: list):
+        # Голоса, от которых запрос уже отказался по таймауту, не пишем
+        batch = [(data, future) for data, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        close_old_connections()
+        try:
+            results = write_votes([data for data, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer() -> VoteIngestBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = get_config()
+                _buffer = VoteIngestBuffer(
+                    flush_size=config["FLUSH_SIZE"],
+                    flush_interval_ms=config["FLUSH_INTERVAL_MS"],
+                    max_pending=config["MAX_PENDING"],
+                )
+    return _buffer
+
+
+def ingest(data: dict) -> str:
+    """
+    Ставит голос в очередь и ждёт, пока писатель его запишет.
+    Не дождались: если писатель голос ещё не взял — снимаем его с очереди (FutureTimeoutError,
+    голос не записан), если уже пишет — ждём ещё столько же, затем VotePending.
+    """
+    timeout = get_config()["RESULT_TIMEOUT"]
+    future = get_buffer().submit(data)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        if future.cancel():
+            raise
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise VotePending("Голос записывается, результат пока неизвестен")
+
+
+@receiver(setting_changed)
+def reset_buffer(*, setting, **kwargs):
+    global _buffer
+    if setting == "VOTE_INGEST":
+        _buffer = None
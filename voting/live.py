@@ -0,0 +1,158 @@
+# voting/live.py
+# Живые результаты для страницы /api/results/: один общий опрос счётчиков
+# на раунд в процессе, изменения раздаются всем подключённым клиентам (SSE).
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import Participant, Round
+from . import tallies
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "POLL_INTERVAL": 1.0,   # как часто общий продюсер перечитывает счётчики, сек
+    "HEARTBEAT": 15,        # пустой комментарий, чтобы прокси не рвали соединение
+    "CLIENT_QUEUE": 100,    # сколько событий копим для медленного клиента
+}
+# После этих событий клиент перезагружает страницу
+RELOAD_EVENTS = ("ended", "switched")
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "RESULTS_STREAM", {})}
+
+
+def load_standings(round_id: int):
+    """Текущая расстановка: тот же порядок, что и на странице результатов"""
+    rows = Participant.objects.filter(round_id=round_id) \
+        .annotate(votes=tallies.votes_annotation()) \
+        .order_by("-votes", "order_number", "full_name") \
+        .values("id", "full_name", "votes")
+    standings = {
+        row["id"]: {"id": row["id"], "name": row["full_name"], "votes": row["votes"], "position": i + 1}
+        for i, row in enumerate(rows)
+    }
+    return tallies.round_total_votes(round_id), standings
+
+
+def load_open_rounds() -> tuple:
+    """Незавершённые раунды в порядке кнопок на странице результатов"""
+    rounds = Round.objects.filter(status__in=["pending", "active"]).order_by("started_at")
+    return tuple(rounds.values_list("id", flat=True))
+
+
+class RoundFeed:
+    """Состояние одного раунда и его подписчики"""
+
+    def __init__(self, round_id: int):
+        self.round_id = round_id
+        self.subscribers = set()
+        self.standings = None
+        self.total_votes = None
+        self.open_rounds = None
+        self.task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "total_votes": self.total_votes,
+            "standings": sorted(self.standings.values(), key=lambda row: row["position"]),
+        }
+
+
+class ResultsBroadcaster:
+    """
+    Один продюсер на раунд (и на event loop): сколько бы ни было открыто
+    проекторов и телефонов, БД опрашивается один раз за интервал.
+    """
+
+    def __init__(self):
+        self.feeds = {}
+
+    async def subscribe(self, round_id: int) -> asyncio.Queue:
+        key = (id(asyncio.get_running_loop()), round_id)
+        feed = self.feeds.get(key)
+        if feed is None:
+            feed = self.feeds[key] = RoundFeed(round_id)
+        queue = asyncio.Queue(maxsize=get_config()["CLIENT_QUEUE"])
+        feed.subscribers.add(queue)
+        if feed.standings is not None:
+            queue.put_nowait(("snapshot", feed.snapshot()))
+        if feed.task is None or feed.task.done():
+            feed.task = asyncio.create_task(self._produce(feed))
+        return queue
+
+    def unsubscribe(self, round_id: int, queue: asyncio.Queue):
+        key = (id(asyncio.get_running_loop()), round_id)
+        feed = self.feeds.get(key)
+        if feed is None:
+            return
+        feed.subscribers.discard(queue)
+        if not feed.subscribers:
+            if feed.task is not None:
+                feed.task.cancel()
+            del self.feeds[key]
+
+    async def _produce(self, feed: RoundFeed):
+        interval = get_config()["POLL_INTERVAL"]
+        while feed.subscribers:
+            try:
+                open_rounds = await sync_to_async(load_open_rounds)()
+                if feed.round_id not in open_rounds:
+                    # Раунд завершён или удалён: клиенты перезагружают страницу, поток закрывается
+                    self._publish(feed, "ended", {"round_id": feed.round_id})
+                    return
+                total_votes, standings = await sync_to_async(load_standings)(feed.round_id)
+            except Exception:
+                logger.exception("Не удалось прочитать результаты раунда %s", feed.round_id)
+                await asyncio.sleep(interval)
+                continue
+            if feed.open_rounds is not None and open_rounds != feed.open_rounds:
+                # Начался новый раунд или закончился другой — на странице меняются кнопки и раунд по умолчанию
+                self._publish(feed, "switched", {"open_rounds": list(open_rounds)})
+            feed.open_rounds = open_rounds
+            if feed.standings is None:
+                feed.standings, feed.total_votes = standings, total_votes
+                self._publish(feed, "snapshot", feed.snapshot())
+            else:
+                update = self._diff(feed, total_votes, standings)
+                if update:
+                    self._publish(feed, "update", update)
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    def _diff(feed: RoundFeed, total_votes: int, standings: dict) -> dict:
+        changed = []
+        for participant_id, row in standings.items():
+            old = feed.standings.get(participant_id)
+            if old is None:
+                changed.append(row)  # новый участник — с именем
+            elif old["votes"] != row["votes"] or old["position"] != row["position"]:
+                changed.append({"id": participant_id, "votes": row["votes"], "position": row["position"]})
+        removed = [participant_id for participant_id in feed.standings if participant_id not in standings]
+        update = {}
+        if changed:
+            update["changed"] = changed
+        if removed:
+            update["removed"] = removed
+        if total_votes != feed.total_votes:
+            update["total_votes"] = total_votes
+        feed.standings, feed.total_votes = standings, total_votes
+        return update
+
+    @staticmethod
+    def _publish(feed: RoundFeed, event: str, data: dict):
+        for queue in list(feed.subscribers):
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # Клиент не успевает — выбрасываем накопленное и шлём полный срез
+                # (или само событие, если после него страница всё равно перезагрузится)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((event, data) if event in RELOAD_EVENTS else ("snapshot", feed.snapshot()))
+
+
+broadcaster = ResultsBroadcaster()
@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections, transaction
+
+ALIAS = "bench_sqlite"
+
+# «До» — стандартный бэкенд Django, «после» — core.sqlite_backend без очереди и с ней
+PROFILES = {
+    "stock": {"ENGINE": "django.db.backends.sqlite3", "OPTIONS": {}},
+    "tuned": {"ENGINE": "core.sqlite_backend", "OPTIONS": {"transaction_mode": "IMMEDIATE"}},
+    "tuned+lane": {
+        "ENGINE": "core.sqlite_backend",
+        "OPTIONS": {"transaction_mode": "IMMEDIATE", "write_lane": True},
+    },
+}
+
+SCHEMA = [
+    "CREATE TABLE bench_vote (id INTEGER PRIMARY KEY, user_id INTEGER, participant_id INTEGER)",
+    "CREATE TABLE bench_tally (participant_id INTEGER PRIMARY KEY, votes INTEGER NOT NULL)",
+]
+
+
+def use_database(db_settings):
+    """Регистрирует отдельное соединение ALIAS на файл из db_settings"""
+    configured = connections.configure_settings({"default": {}, ALIAS: db_settings})
+    connections.settings[ALIAS] = configured[ALIAS]
+    if hasattr(connections._connections, ALIAS):
+        delattr(connections._connections, ALIAS)
+
+
+def worker(db_settings, worker_id, ops, participants, results):
+    # Как голос в AddVoteAPIView: прочитать, вставить голос, обновить счётчик — одной транзакцией
+    if not apps.ready:
+        django.setup()
+    use_database(db_settings)
+    rnd = random.Random(worker_id)
+    latencies, errors = [], 0
+    for i in range(ops):
+        participant_id = rnd.randrange(participants)
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(using=ALIAS):
+                with connections[ALIAS].cursor() as cursor:
+                    cursor.execute("SELECT votes FROM bench_tally WHERE participant_id = %s", [participant_id])
+                    cursor.fetchone()
+                    cursor.execute(
+                        "INSERT INTO bench_vote (user_id, participant_id) VALUES (%s, %s)",
+                        [worker_id * ops + i, participant_id],
+                    )
+                    cursor.execute(
+                        "UPDATE bench_tally SET votes = votes + 1 WHERE participant_id = %s", [participant_id]
+                    )
+        except DatabaseError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    connections[ALIAS].close()
+    results.put((latencies, errors))
+
+
+class Command(BaseCommand):
+    help = "Нагрузочный тест записи в SQLite из нескольких процессов: стандартный бэкенд против core.sqlite_backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=8, help="Сколько процессов пишут одновременно")
+        parser.add_argument("--ops", type=int, default=300, help="Транзакций на процесс")
+        parser.add_argument("--participants", type=int, default=20)
+        parser.add_argument("--timeout", type=float, default=5, help="Ожидание блокировки, c (busy_timeout)")
+        parser.add_argument("--profile", action="append", choices=list(PROFILES), help="По умолчанию — все")
+
+    def handle(self, *args, **options):
+        connections.close_all()
+        context = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in options["profile"] or PROFILES:
+                db_settings = self.make_settings(name, os.path.join(tmp, f"{name}.sqlite3"), options["timeout"])
+                self.create_schema(db_settings, options["participants"])
+                results = context.Queue()
+                processes = [
+                    context.Process(
+                        target=worker,
+                        args=(db_settings, worker_id, options["ops"], options["participants"], results),
+                    ) for worker_id in range(options["processes"])
+                ]
+                started = time.perf_counter()
+                for process in processes:
+                    process.start()
+                collected = [results.get() for _ in processes]
+                for process in processes:
+                    process.join()
+                elapsed = time.perf_counter() - started
+                self.report(name, collected, elapsed, self.count_votes(db_settings))
+
+    def make_settings(self, name, path, timeout):
+        profile = PROFILES[name]
+        options = dict(profile["OPTIONS"])
+        if profile["ENGINE"] == "core.sqlite_backend":
+            options["pragmas"] = {"busy_timeout": int(timeout * 1000)}
+        else:
+            options["timeout"] = timeout
+        return {"ENGINE": profile["ENGINE"], "NAME": path, "OPTIONS": options}
+
+    def create_schema(self, db_settings, participants):
+        use_database(db_settings)
+        with connections[ALIAS].cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+            for participant_id in range(participants):
+                cursor.execute("INSERT INTO bench_tally VALUES (%s, 0)", [participant_id])
+        connections[ALIAS].close()
+
+    def count_votes(self, db_settings):
+        use_database(db_settings)
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM bench_vote")
+            count = cursor.fetchone()[0]
+        connections[ALIAS].close()
+        return count
+
+    def report(self, name, collected, elapsed, stored):
+        latencies = sorted(lat for chunk, _ in collected for lat in chunk)
+        errors = sum(err for _, err in collected)
+        total = len(latencies)
+        p99 = latencies[min(total - 1, int(total * 0.99))]
+        self.stdout.write(
+            f"{name:>10}: {total} транзакций за {elapsed:.2f} c ({(total - errors) / elapsed:.0f} успешных/с), "
+            f"ошибок={errors} ({errors / total:.1%}), "
+            f"p50={statistics.median(latencies) * 1000:.1f} мс, p99={p99 * 1000:.1f} мс, "
+            f"записано={stored}"
+        )
@@ -0,0 +1,99 @@
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from voting.models import Campaign, Round, Participant, Vote
+from voting.views import AddVoteAPIView
+
+
+class Command(BaseCommand):
+    help = "Сравнивает построчную запись голосов с буферизованной (VOTE_INGEST)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--votes", type=int, default=2000, help="Сколько голосов отправить в каждом режиме")
+        parser.add_argument("--concurrency", type=int, default=32, help="Число параллельных потоков")
+        parser.add_argument("--participants", type=int, default=10)
+        parser.add_argument("--duplicates", type=float, default=0.1, help="Доля повторных нажатий")
+        parser.add_argument("--flush-size", type=int, default=200)
+        parser.add_argument("--flush-interval-ms", type=float, default=5)
+
+    def handle(self, *args, **options):
+        campaign = Campaign.objects.create(name="bench_vote_ingest", admin_telegram_id=0)
+        try:
+            for number, mode in enumerate(("per-row", "buffered"), start=1):
+                round_obj = Round.objects.create(campaign=campaign, number=number, status="active")
+                participants = [
+                    Participant.objects.create(round=round_obj, full_name=f"Участник {i}")
+                    for i in range(options["participants"])
+                ]
+                payloads = self.make_payloads(round_obj, participants, options)
+                config = {
+                    "ENABLED": mode == "buffered",
+                    "FLUSH_SIZE": options["flush_size"],
+                    "FLUSH_INTERVAL_MS": options["flush_interval_ms"],
+                    "MAX_PENDING": len(payloads),
+                    "RESULT_TIMEOUT": 30,
+                }
+                with override_settings(VOTE_INGEST=config):
+                    stats = self.run_mode(payloads, options["concurrency"])
+                stored = Vote.objects.filter(round=round_obj).count()
+                self.report(mode, stats, stored)
+        finally:
+            campaign.delete()
+
+    def make_payloads(self, round_obj, participants, options):
+        payloads = []
+        for i in range(options["votes"]):
+            payloads.append({
+                "round": round_obj.id,
+                "participant": participants[i % len(participants)].id,
+                "user_telegram_id": 10 ** 9 + i,
+            })
+        # Повторные нажатия тех же кнопок
+        dup_count = int(len(payloads) * options["duplicates"])
+        payloads.extend(payloads[:dup_count])
+        return payloads
+
+    def run_mode(self, payloads, concurrency):
+        factory = APIRequestFactory()
+        view = AddVoteAPIView.as_view()
+
+        def send(payload):
+            request = factory.post("/api/vote/", payload, format="json")
+            started = time.perf_counter()
+            try:
+                response = view(request)
+                code = response.status_code
+            except Exception as e:
+                code = type(e).__name__
+            finally:
+                connection.close()
+            return code, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(send, payloads))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(lat for _, lat in results)
+        return {
+            "elapsed": elapsed,
+            "codes": Counter(code for code, _ in results),
+            "latencies": latencies,
+        }
+
+    def report(self, mode, stats, stored):
+        latencies = stats["latencies"]
+        total = len(latencies)
+        p99 = latencies[min(total - 1, int(total * 0.99))]
+        self.stdout.write(
+            f"{mode:>9}: {total} запросов за {stats['elapsed']:.2f} c "
+            f"({total / stats['elapsed']:.0f} rps), "
+            f"p50={statistics.median(latencies) * 1000:.1f} мс, p99={p99 * 1000:.1f} мс, "
+            f"коды={dict(stats['codes'])}, записано голосов={stored}"
+        )
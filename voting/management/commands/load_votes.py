@@ -0,0 +1,192 @@
+import asyncio
+import math
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+
+import aiohttp
+from django.core.management.base import BaseCommand, CommandError
+
+# Как бот обновляет экран раунда (см. bot.py)
+PATTERNS = ("info", "split")
+CURVES = ("steady", "ramp", "spike")
+
+
+def arrival_offsets(curve: str, users: int, duration: float) -> list:
+    """Момент прихода каждого пользователя (c от старта) для кривой нагрузки"""
+    if users == 1 or duration <= 0:
+        return [0.0] * users
+    fractions = [i / (users - 1) for i in range(users)]
+    if curve == "steady":
+        # Равномерный поток
+        return [duration * f for f in fractions]
+    if curve == "ramp":
+        # Интенсивность растёт линейно: доля пришедших ~ t²
+        return [duration * math.sqrt(f) for f in fractions]
+    # spike: объявление «голосуем!» — 80% пользователей в первые 10% времени, остальные хвостом
+    head = int(users * 0.8)
+    offsets = [duration * 0.1 * i / max(head - 1, 1) for i in range(head)]
+    tail = users - head
+    offsets += [duration * (0.1 + 0.9 * (i + 1) / tail) for i in range(tail)]
+    return offsets
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+
+    def add(self, endpoint: str, started: float, outcome):
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        self.statuses[endpoint][outcome] += 1
+        # 4xx видны в кодах (повторное нажатие — ожидаемый 400), ошибки — это 5xx и сбои соединения
+        if not (isinstance(outcome, int) and outcome < 500):
+            self.errors[f"{endpoint}: {outcome}"] += 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный сценарий голосования против запущенного сервера: "
+        "N пользователей бота смотрят раунд, голосуют и обновляют экран"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=100, help="Максимум пользователей одновременно")
+        parser.add_argument("--curve", choices=CURVES, default="spike")
+        parser.add_argument("--duration", type=float, default=10, help="За сколько секунд приходят все пользователи")
+        parser.add_argument(
+            "--pattern", choices=PATTERNS, default="split",
+            help="info — GET active-round-info?user_id=; split — user-votes/ + active-round/ по версии (как bot.py сейчас)",
+        )
+        parser.add_argument("--retap", type=float, default=0.1, help="Доля пользователей, нажимающих кнопку повторно")
+        parser.add_argument("--timeout", type=float, default=10)
+        parser.add_argument("--user-id-start", type=int, default=9 * 10 ** 9)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        api = options["base_url"].rstrip("/") + "/api"
+        rnd = random.Random(options["seed"])
+        timeout = aiohttp.ClientTimeout(total=options["timeout"])
+        connector = aiohttp.TCPConnector(limit=options["concurrency"])
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            async with session.get(f"{api}/active-round/") as resp:
+                shared = await resp.json()
+            round_id = shared.get("round_id")
+            if not round_id or not shared.get("participants"):
+                raise CommandError("На сервере нет текущего раунда с участниками")
+            before = await self.fetch_votes(session, api, round_id)
+
+            self.recorder = Recorder()
+            self.shared_cache = {shared["version"]: shared}
+            self.accepted = Counter()
+            semaphore = asyncio.Semaphore(options["concurrency"])
+            offsets = arrival_offsets(options["curve"], options["users"], options["duration"])
+            started = time.perf_counter()
+
+            async def arrive(i, offset):
+                await asyncio.sleep(max(0.0, offset - (time.perf_counter() - started)))
+                async with semaphore:
+                    await self.user_flow(session, api, options, options["user_id_start"] + i, random.Random(rnd.random()))
+
+            await asyncio.gather(*(arrive(i, offset) for i, offset in enumerate(offsets)))
+            elapsed = time.perf_counter() - started
+            after = await self.fetch_votes(session, api, round_id)
+
+        self.report(options, elapsed)
+        self.check_tallies(before, after)
+
+    async def request(self, session, endpoint, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            async with session.request(method, url, **kwargs) as resp:
+                body = await resp.json(content_type=None) if resp.status != 304 else None
+                self.recorder.add(endpoint, started, resp.status)
+                return resp.status, body
+        except Exception as e:
+            self.recorder.add(endpoint, started, type(e).__name__)
+            return None, None
+
+    async def refresh(self, session, api, options, user_id):
+        """Экран раунда для пользователя — так же, как его строит бот"""
+        if options["pattern"] == "info":
+            _, body = await self.request(
+                session, "GET active-round-info", "GET", f"{api}/active-round-info/", params={"user_id": user_id}
+            )
+            return body
+        _, mine = await self.request(session, "GET user-votes", "GET", f"{api}/user-votes/", params={"user_id": user_id})
+        if not mine or not mine.get("round_id"):
+            return mine
+        shared = self.shared_cache.get(mine["version"])
+        if shared is None:
+            _, shared = await self.request(session, "GET active-round", "GET", f"{api}/active-round/")
+            if not shared:
+                return None
+            self.shared_cache = {shared["version"]: shared}
+        return {**shared, "user_votes": mine["votes"]}
+
+    async def user_flow(self, session, api, options, user_id, rnd):
+        view = await self.refresh(session, api, options, user_id)
+        if not view or not view.get("participants"):
+            return
+        participants = view["participants"]
+        # Популярность по Ципфу: первые в списке получают заметно больше голосов
+        weights = [1 / (rank + 1) for rank in range(len(participants))]
+        participant = rnd.choices(participants, weights)[0]
+        payload = {"round": view["round_id"], "participant": participant["id"], "user_telegram_id": user_id}
+        if view.get("round_type") == "individual":
+            payload["choice"] = "yes" if rnd.random() < 0.7 else "no"
+
+        taps = 2 if rnd.random() < options["retap"] else 1
+        for _ in range(taps):
+            status_code, _ = await self.request(session, "POST vote", "POST", f"{api}/vote/", json=payload)
+            if status_code == 201 and payload.get("choice", "yes") == "yes":
+                self.accepted[participant["id"]] += 1
+        await self.refresh(session, api, options, user_id)
+
+    async def fetch_votes(self, session, api, round_id) -> dict:
+        async with session.get(f"{api}/results/{round_id}/") as resp:
+            data = await resp.json()
+        return {
+            row["participant_id"]: row["votes"]
+            for row in data["left_column"] + data["right_column"]
+        }
+
+    def report(self, options, elapsed):
+        recorder = self.recorder
+        total = sum(len(v) for v in recorder.latencies.values())
+        self.stdout.write(
+            f"{options['users']} пользователей ({options['curve']}, {options['pattern']}) за {elapsed:.2f} c: "
+            f"{total} запросов, {total / elapsed:.0f} rps, {options['users'] / elapsed:.1f} пользователей/с"
+        )
+        for endpoint, latencies in sorted(recorder.latencies.items()):
+            latencies = sorted(latencies)
+            n = len(latencies)
+            p95 = latencies[min(n - 1, int(n * 0.95))]
+            p99 = latencies[min(n - 1, int(n * 0.99))]
+            self.stdout.write(
+                f"  {endpoint:<22} n={n:<6} p50={statistics.median(latencies) * 1000:.1f} мс "
+                f"p95={p95 * 1000:.1f} мс p99={p99 * 1000:.1f} мс коды={dict(recorder.statuses[endpoint])}"
+            )
+        if recorder.errors:
+            self.stdout.write("Ошибки:")
+            for error, count in recorder.errors.most_common():
+                self.stdout.write(f"  {error}: {count}")
+
+    def check_tallies(self, before, after):
+        # Голоса, принятые сервером (201), должны ровно совпасть с приростом в результатах
+        mismatches = []
+        for participant_id in set(before) | set(after) | set(self.accepted):
+            expected = before.get(participant_id, 0) + self.accepted[participant_id]
+            if after.get(participant_id, 0) != expected:
+                mismatches.append(f"участник {participant_id}: {after.get(participant_id, 0)}, ожидалось {expected}")
+        if mismatches:
+            self.stdout.write(self.style.ERROR("Итоги не сходятся:\n  " + "\n  ".join(mismatches)))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Итоги сходятся: +{sum(self.accepted.values())} голосов"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from voting import tallies
+
+
+class Command(BaseCommand):
+    help = "Пересобирает ParticipantTally / RoundTally из сырых голосов и проверяет расхождения"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--round", type=int, action="append", dest="round_ids",
+                            help="ID раунда (можно указать несколько раз); по умолчанию — все раунды")
+        parser.add_argument("--check", action="store_true",
+                            help="Только проверить расхождения, ничего не меняя")
+
+    def handle(self, *args, **options):
+        round_ids = options["round_ids"]
+        drift = tallies.find_drift(round_ids)
+        for line in drift:
+            self.stdout.write(f"Расхождение: {line}")
+        if options["check"]:
+            if drift:
+                raise CommandError(f"Найдено расхождений: {len(drift)}")
+            self.stdout.write(self.style.SUCCESS("Счётчики совпадают с голосами"))
+            return
+        participants_count, rounds_count = tallies.rebuild(round_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"Счётчики пересобраны: участников {participants_count}, раундов {rounds_count}, "
+            f"исправлено расхождений {len(drift)}"
+        ))
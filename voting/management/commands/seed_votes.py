@@ -0,0 +1,70 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting import seeding
+
+
+class Command(BaseCommand):
+    help = "Синтетические кампании, раунды, участники и голоса для бенчмарков (детерминированно по --seed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--votes", type=int, default=100_000, help="Всего голосов")
+        parser.add_argument("--campaigns", type=int, default=1)
+        parser.add_argument(
+            "--rounds", default="individual,standard",
+            help="Типы раундов каждой кампании по порядку, через запятую",
+        )
+        parser.add_argument("--participants", type=int, default=40, help="Участников в раунде")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--zipf", type=float, default=1.1, help="Показатель Ципфа для популярности участников")
+        parser.add_argument("--yes-share", type=float, default=0.7, help="Доля «Да» в индивидуальных раундах")
+        parser.add_argument("--user-id-start", type=int, default=10 ** 9)
+        parser.add_argument("--start", default=seeding.DEFAULT_START.strftime("%Y-%m-%d %H:%M"),
+                            help="Начало первого раунда (UTC), ГГГГ-ММ-ДД ЧЧ:ММ")
+        parser.add_argument("--round-minutes", type=int, default=60, help="Длительность раунда")
+        parser.add_argument("--no-current", action="store_true", help="Не делать последний раунд текущим")
+
+    def handle(self, *args, **options):
+        rounds = tuple(t.strip() for t in options["rounds"].split(",") if t.strip())
+        if not rounds or set(rounds) - {"standard", "individual"}:
+            raise CommandError("--rounds: только standard и individual")
+        if options["participants"] < 1:
+            raise CommandError("--participants должно быть >= 1")
+        try:
+            start = datetime.strptime(options["start"], "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
+        except ValueError:
+            raise CommandError("--start в формате ГГГГ-ММ-ДД ЧЧ:ММ")
+
+        started = time.perf_counter()
+        report_every = max(seeding.CHUNK_SIZE, options["votes"] // 20)
+        reported = [0]
+
+        def progress(written):
+            if written - reported[0] >= report_every:
+                reported[0] = written
+                rate = written / (time.perf_counter() - started)
+                self.stdout.write(f"  … {written:,} голосов ({rate:,.0f}/с)")
+
+        created = seeding.seed(
+            campaigns=options["campaigns"],
+            rounds=rounds,
+            participants=options["participants"],
+            votes=options["votes"],
+            seed=options["seed"],
+            zipf_s=options["zipf"],
+            yes_share=options["yes_share"],
+            user_id_start=options["user_id_start"],
+            start=start,
+            round_duration=timedelta(minutes=options["round_minutes"]),
+            make_current=not options["no_current"],
+            progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано раундов: {len(created)}, голосов: {options['votes']} за {elapsed:.1f} c "
+            f"({options['votes'] / max(elapsed, 1e-9):,.0f} голосов/с)"
+        ))
+        for round_obj in created:
+            self.stdout.write(f"  {round_obj} — id {round_obj.id}, {round_obj.status}")
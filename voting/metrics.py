@@ -0,0 +1,38 @@
+# voting/metrics.py
+# Метрики голосования для /metrics (см. core/metrics.py).
+# Скорость приёма голосов — rate(voting_votes_total[1m]) в Prometheus.
+from core import metrics
+
+from .models import RoundTally
+from . import current_round
+
+ACCEPTED = "accepted"
+DUPLICATE = "duplicate"
+REJECTED = "rejected"
+
+VOTES = metrics.Counter(
+    "voting_votes_total",
+    "Голоса, пришедшие в /api/vote/, по результату: accepted, duplicate, rejected",
+)
+TALLY_SECONDS = metrics.Histogram(
+    "voting_tally_seconds",
+    "Время обновления (record, transfer) и пересчёта (rebuild) счётчиков голосов",
+)
+ROUND_END_SECONDS = metrics.Histogram(
+    "voting_round_end_seconds",
+    "Время завершения раунда с подсчётом победителей",
+)
+
+
+def current_round_voters() -> int:
+    round_id = current_round.current_round_id()
+    if round_id is None:
+        return 0
+    return RoundTally.objects.filter(round_id=round_id).values_list("voters_count", flat=True).first() or 0
+
+
+CURRENT_ROUND_VOTERS = metrics.GaugeFunction(
+    "voting_current_round_voters",
+    "Число проголосовавших в текущем раунде",
+    current_round_voters,
+)
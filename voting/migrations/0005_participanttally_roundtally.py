@@ -0,0 +1,69 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_tallies(apps, schema_editor):
+    # Заполняем счётчики по уже накопленным голосам
+    Participant = apps.get_model('voting', 'Participant')
+    Round = apps.get_model('voting', 'Round')
+    ParticipantTally = apps.get_model('voting', 'ParticipantTally')
+    RoundTally = apps.get_model('voting', 'RoundTally')
+    participants = Participant.objects.values('id', 'round_id').annotate(
+        yes_count=Count('vote', filter=Q(vote__choice='yes')),
+        no_count=Count('vote', filter=Q(vote__choice='no')),
+        standard_count=Count('vote', filter=Q(vote__choice__isnull=True)),
+    )
+    ParticipantTally.objects.bulk_create([
+        ParticipantTally(
+            participant_id=p['id'], round_id=p['round_id'],
+            yes_count=p['yes_count'], no_count=p['no_count'], standard_count=p['standard_count'],
+        ) for p in participants
+    ], batch_size=500)
+    rounds = Round.objects.values('id').annotate(
+        total_votes=Count('votes'),
+        voters_count=Count('votes__user_telegram_id', distinct=True),
+    )
+    RoundTally.objects.bulk_create([
+        RoundTally(round_id=r['id'], total_votes=r['total_votes'], voters_count=r['voters_count'])
+        for r in rounds
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0004_round_voting_roun_campaig_d14880_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoundTally',
+            fields=[
+                ('round', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='voting.round')),
+                ('total_votes', models.PositiveIntegerField(default=0, verbose_name='Всего голосов')),
+                ('voters_count', models.PositiveIntegerField(default=0, verbose_name='Уникальных проголосовавших')),
+            ],
+            options={
+                'verbose_name': 'Итоги раунда',
+                'verbose_name_plural': 'Итоги раундов',
+            },
+        ),
+        migrations.CreateModel(
+            name='ParticipantTally',
+            fields=[
+                ('participant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='voting.participant')),
+                ('yes_count', models.PositiveIntegerField(default=0, verbose_name='Голосов «Да»')),
+                ('no_count', models.PositiveIntegerField(default=0, verbose_name='Голосов «Нет»')),
+                ('standard_count', models.PositiveIntegerField(default=0, verbose_name='Голосов в стандартном раунде')),
+                ('round', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participant_tallies', to='voting.round')),
+            ],
+            options={
+                'verbose_name': 'Счётчик участника',
+                'verbose_name_plural': 'Счётчики участников',
+            },
+        ),
+        migrations.RunPython(fill_tallies, migrations.RunPython.noop),
+    ]
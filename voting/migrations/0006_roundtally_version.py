@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0005_participanttally_roundtally'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roundtally',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Версия результатов'),
+        ),
+    ]
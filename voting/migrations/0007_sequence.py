@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0006_roundtally_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Последовательность')),
+                ('value', models.PositiveBigIntegerField(default=0, verbose_name='Последний выданный номер')),
+            ],
+            options={
+                'verbose_name': 'Счётчик номеров',
+                'verbose_name_plural': 'Счётчики номеров',
+            },
+        ),
+    ]
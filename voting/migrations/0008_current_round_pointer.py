@@ -0,0 +1,57 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_current_flag(apps, schema_editor):
+    Round = apps.get_model("voting", "Round")
+    CurrentRound = apps.get_model("voting", "CurrentRound")
+    current = Round.objects.filter(is_current=True).order_by("-started_at").first()
+    CurrentRound.objects.create(pk=1, round=current)
+
+
+def restore_current_flag(apps, schema_editor):
+    Round = apps.get_model("voting", "Round")
+    CurrentRound = apps.get_model("voting", "CurrentRound")
+    pointer = CurrentRound.objects.filter(pk=1).first()
+    if pointer and pointer.round_id:
+        Round.objects.filter(pk=pointer.round_id).update(is_current=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0007_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrentRound',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'verbose_name': 'Текущий раунд',
+                'verbose_name_plural': 'Текущий раунд',
+            },
+        ),
+        migrations.AddField(
+            model_name='currentround',
+            name='round',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='current_pointer', to='voting.round'),
+        ),
+        migrations.RunPython(copy_current_flag, restore_current_flag),
+        migrations.RemoveIndex(
+            model_name='round',
+            name='voting_roun_campaig_d14880_idx',
+        ),
+        migrations.RemoveField(
+            model_name='round',
+            name='is_current',
+        ),
+        migrations.AddIndex(
+            model_name='round',
+            index=models.Index(fields=['campaign', 'status'], name='voting_roun_campaig_8ec547_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0008_current_round_pointer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotUser',
+            fields=[
+                ('telegram_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='Telegram ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Первый /start')),
+                ('blocked_at', models.DateTimeField(blank=True, null=True, verbose_name='Заблокировал бота')),
+            ],
+            options={
+                'verbose_name': 'Пользователь бота',
+                'verbose_name_plural': 'Пользователи бота',
+            },
+        ),
+    ]
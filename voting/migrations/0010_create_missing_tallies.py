@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:10
+
+from django.db import migrations
+
+
+def create_missing_tallies(apps, schema_editor):
+    # Раньше строку счётчика участника создавал первый голос — теперь она нужна сразу
+    Participant = apps.get_model('voting', 'Participant')
+    Round = apps.get_model('voting', 'Round')
+    ParticipantTally = apps.get_model('voting', 'ParticipantTally')
+    RoundTally = apps.get_model('voting', 'RoundTally')
+    ParticipantTally.objects.bulk_create([
+        ParticipantTally(participant_id=p['id'], round_id=p['round_id'])
+        for p in Participant.objects.filter(tally__isnull=True).values('id', 'round_id')
+    ], batch_size=500)
+    RoundTally.objects.bulk_create([
+        RoundTally(round_id=round_id)
+        for round_id in Round.objects.filter(tally__isnull=True).values_list('id', flat=True)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0009_botuser'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_tallies, migrations.RunPython.noop),
+    ]
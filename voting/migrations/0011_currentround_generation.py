@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0010_create_missing_tallies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='currentround',
+            name='generation',
+            field=models.CharField(blank=True, default='', max_length=32, verbose_name='Поколение данных'),
+        ),
+    ]
@@ -1,6 +1,5 @@
 # voting/models.py (обновлённый)
 from django.db import models
-from django.db.models import Max
 from django.db import transaction
 
 class Campaign(models.Model):
@@ -21,8 +20,8 @@ class Campaign(models.Model):
     def save(self, *args, **kwargs):
         with transaction.atomic():
             if not self.order_number:
-                max_num = Campaign.objects.aggregate(max_num=Max('order_number'))['max_num'] or 0
-                self.order_number = max_num + 1
+                from .sequences import next_campaign_number
+                self.order_number = next_campaign_number()
             super().save(*args, **kwargs)
 
     def __str__(self):
@@ -45,23 +44,25 @@ class Round(models.Model):
         default="pending"
     )
     winners_count = models.PositiveSmallIntegerField(default=3, verbose_name="Сколько призовых мест")
-    is_current = models.BooleanField(default=False, verbose_name="Текущий раунд для голосования")
 
     class Meta:
         verbose_name = "Раунд"
         verbose_name_plural = "Раунды"
         unique_together = ["campaign", "number"]
         ordering = ['-started_at']
-        indexes = [models.Index(fields=['campaign', 'status', 'is_current'])]
+        indexes = [models.Index(fields=['campaign', 'status'])]
 
     def __str__(self):
         return f"{self.campaign} — раунд {self.number} ({self.get_type_display()})"
 
-    def save(self, *args, **kwargs):
-        with transaction.atomic():
-            if self.is_current:
-                Round.objects.filter(is_current=True).exclude(pk=self.pk).update(is_current=False)
-            super().save(*args, **kwargs)
+    @property
+    def is_current(self):
+        """
+        Текущий раунд для голосования (указатель CurrentRound, см. voting/current_round.py).
+        Только для чтения: выбрать раунд — current_round.set_current() или действие в админке.
+        """
+        from .current_round import resolve
+        return resolve().pointer_id == self.pk
 
 class Participant(models.Model):
     """Участник раунда"""
@@ -80,10 +81,8 @@ class Participant(models.Model):
     def save(self, *args, **kwargs):
         with transaction.atomic():
             if not self.order_number:
-                max_num = Participant.objects.filter(round=self.round).aggregate(
-                    max_num=Max('order_number')
-                )['max_num'] or 0
-                self.order_number = max_num + 1
+                from .sequences import reserve_participant_numbers
+                self.order_number = reserve_participant_numbers(self.round_id)
             super().save(*args, **kwargs)
 
     def __str__(self):
@@ -108,4 +107,87 @@ class Vote(models.Model):
         indexes = [models.Index(fields=['round', 'user_telegram_id'])]
 
     def __str__(self):
-        return f"{self.user_telegram_id} → {self.participant.full_name} ({self.choice or 'standard'})"
\ No newline at end of file
+        return f"{self.user_telegram_id} → {self.participant.full_name} ({self.choice or 'standard'})"
+
+
+class ParticipantTally(models.Model):
+    """Счётчики голосов участника (обновляются вместе с записью голоса, см. voting/tallies.py)"""
+    participant = models.OneToOneField(
+        Participant, on_delete=models.CASCADE, primary_key=True, related_name="tally"
+    )
+    round = models.ForeignKey(Round, on_delete=models.CASCADE, related_name="participant_tallies")
+    yes_count = models.PositiveIntegerField(default=0, verbose_name="Голосов «Да»")
+    no_count = models.PositiveIntegerField(default=0, verbose_name="Голосов «Нет»")
+    standard_count = models.PositiveIntegerField(default=0, verbose_name="Голосов в стандартном раунде")
+
+    class Meta:
+        verbose_name = "Счётчик участника"
+        verbose_name_plural = "Счётчики участников"
+
+    @property
+    def votes(self):
+        # То же, что Count("vote", filter=Q(choice__isnull=True) | Q(choice="yes"))
+        return self.standard_count + self.yes_count
+
+    def __str__(self):
+        return f"{self.participant_id}: {self.votes}"
+
+
+class RoundTally(models.Model):
+    """Итоги раунда: всего голосов и уникальных проголосовавших"""
+    round = models.OneToOneField(Round, on_delete=models.CASCADE, primary_key=True, related_name="tally")
+    total_votes = models.PositiveIntegerField(default=0, verbose_name="Всего голосов")
+    voters_count = models.PositiveIntegerField(default=0, verbose_name="Уникальных проголосовавших")
+    # Растёт при любом изменении результатов раунда — из него строится ETag /api/results/<id>/
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Версия результатов")
+
+    class Meta:
+        verbose_name = "Итоги раунда"
+        verbose_name_plural = "Итоги раундов"
+
+    def __str__(self):
+        return f"{self.round_id}: {self.total_votes} голосов / {self.voters_count} чел."
+
+
+class Sequence(models.Model):
+    """Счётчик порядковых номеров (кампании, участники раунда), см. voting/sequences.py"""
+    name = models.CharField(max_length=64, primary_key=True, verbose_name="Последовательность")
+    value = models.PositiveBigIntegerField(default=0, verbose_name="Последний выданный номер")
+
+    class Meta:
+        verbose_name = "Счётчик номеров"
+        verbose_name_plural = "Счётчики номеров"
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class CurrentRound(models.Model):
+    """Указатель на текущий раунд — единственная строка с pk=1; там же поколение кэша ответов"""
+    round = models.OneToOneField(
+        Round, on_delete=models.SET_NULL, null=True, blank=True, related_name="current_pointer"
+    )
+    # voting/response_cache.py: в БД, чтобы смену поколения видели все воркеры
+    generation = models.CharField(max_length=32, blank=True, default="", verbose_name="Поколение данных")
+
+    class Meta:
+        verbose_name = "Текущий раунд"
+        verbose_name_plural = "Текущий раунд"
+
+    def __str__(self):
+        return f"Текущий раунд: {self.round_id or '—'}"
+
+
+class BotUser(models.Model):
+    """Пользователь, нажавший /start в боте; получатели рассылок — см. voting/audience.py"""
+    telegram_id = models.BigIntegerField(primary_key=True, verbose_name="Telegram ID")
+    started_at = models.DateTimeField(auto_now_add=True, verbose_name="Первый /start")
+    # Заблокировал бота (Telegram ответил 403) — в рассылки не попадает до нового /start
+    blocked_at = models.DateTimeField(null=True, blank=True, verbose_name="Заблокировал бота")
+
+    class Meta:
+        verbose_name = "Пользователь бота"
+        verbose_name_plural = "Пользователи бота"
+
+    def __str__(self):
+        return str(self.telegram_id)
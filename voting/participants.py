@@ -0,0 +1,91 @@
+# voting/participants.py
+# Массовое добавление участников: номера резервируются блоком (voting/sequences.py),
+# запись — одним bulk_create в транзакции.
+import csv
+
+from django.db import transaction
+
+from .models import Participant, ParticipantTally
+from . import response_cache, sequences, tallies
+
+FULL_NAME_MAX_LENGTH = Participant._meta.get_field("full_name").max_length
+
+
+# Первая ячейка строки-заголовка CSV: такой текст разбирается как CSV
+CSV_HEADERS = {"фио", "full_name", "имя", "участник"}
+FORMATS = ("auto", "csv")
+
+
+def parse_participants_text(text: str, text_format: str = "auto") -> list:
+    """
+    Разбирает вставленный текст, по участнику на строку:
+      ФИО<TAB>описание        (TSV, например из таблицы)
+      ФИО,описание            (CSV — только с заголовком «ФИО,...» или при text_format="csv")
+      ФИО (описание)          (формат бота)
+      ФИО                     (вся строка, в том числе с запятыми, как раньше в боте)
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    is_csv = text_format == "csv"
+    if lines and "\t" not in lines[0]:
+        header = next(csv.reader([lines[0]], skipinitialspace=True))
+        if len(header) > 1 and header[0].strip().lower() in CSV_HEADERS:
+            is_csv = True
+            lines = lines[1:]
+    rows = []
+    for line in lines:
+        if "\t" in line:
+            full_name, _, description = line.partition("\t")
+        elif is_csv:
+            cells = next(csv.reader([line], skipinitialspace=True))
+            full_name, description = cells[0], ", ".join(cells[1:])
+        elif "(" in line and line.endswith(")"):
+            full_name, _, description = line.partition("(")
+            description = description[:-1]
+        else:
+            full_name, description = line, ""
+        rows.append({"full_name": full_name.strip(), "description": description.strip()})
+    return rows
+
+
+def create_participants(round_obj, new_participants: list) -> list:
+    """Выдаёт участникам подряд идущие order_number и сохраняет одним запросом"""
+    with transaction.atomic():
+        first = sequences.reserve_participant_numbers(round_obj.id, len(new_participants))
+        for i, participant in enumerate(new_participants):
+            participant.round = round_obj
+            participant.order_number = first + i
+        created = Participant.objects.bulk_create(new_participants)
+        # bulk_create не шлёт сигналы — строки счётчиков и версии делаем сами
+        ParticipantTally.objects.bulk_create([
+            ParticipantTally(participant=participant, round=round_obj) for participant in created
+        ])
+        tallies.bump_round_version(round_obj.id)
+        response_cache.bump_on_commit()
+    return created
+
+
+def add_participants(round_obj, rows: list) -> list:
+    """
+    Добавляет участников из списка {"full_name", "description"}.
+    Некорректные строки пропускаются; результат — по строке на каждую входную.
+    """
+    results = []
+    pending = []
+    for i, row in enumerate(rows, start=1):
+        full_name = (row.get("full_name") or "").strip().title()
+        description = (row.get("description") or "").strip()
+        if not full_name:
+            results.append({"row": i, "status": "error", "error": "ФИО пустое"})
+            continue
+        if len(full_name) > FULL_NAME_MAX_LENGTH:
+            results.append({"row": i, "status": "error", "error": f"ФИО длиннее {FULL_NAME_MAX_LENGTH} символов"})
+            continue
+        result = {"row": i, "status": "ok", "full_name": full_name}
+        results.append(result)
+        pending.append((result, Participant(full_name=full_name, description=description)))
+    if pending:
+        create_participants(round_obj, [participant for _, participant in pending])
+        for result, participant in pending:
+            result["participant_id"] = participant.id
+            result["participant_order"] = participant.order_number
+    return results
@@ -0,0 +1,48 @@
+# voting/ranking.py
+# Выбор победителей раунда (общий для EndRoundAPIView и TransferWinnersAPIView).
+from collections import defaultdict
+
+from django.db.models import F, Window
+from django.db.models.functions import DenseRank
+
+from .models import Participant, Vote
+from . import tallies
+
+
+def select_winners(round_obj, with_yes_voters: bool = False) -> list:
+    """
+    Победители — все участники, чьё число голосов входит в топ-N различных
+    результатов (N = round_obj.winners_count), т.е. DENSE_RANK <= N.
+    При равенстве голосов проходят все участники с этим результатом.
+
+    Один запрос на рейтинг и, если нужно, один запрос на всех «Да»-голосовавших.
+    """
+    winners = list(
+        Participant.objects.filter(round=round_obj)
+        .annotate(
+            votes_count=tallies.votes_annotation(),
+            rank=Window(DenseRank(), order_by=F("votes_count").desc()),
+        )
+        .filter(rank__lte=round_obj.winners_count)
+        .order_by("rank", "order_number", "full_name")
+        .values("id", "order_number", "full_name", "votes_count", "rank")
+    )
+    result = [
+        {
+            "participant_id": w["id"],
+            "participant_order": w["order_number"],
+            "full_name": w["full_name"],
+            "votes": w["votes_count"],
+            "rank": w["rank"],
+        } for w in winners
+    ]
+    if with_yes_voters and result:
+        yes_voters = defaultdict(list)
+        rows = Vote.objects.filter(
+            participant_id__in=[w["participant_id"] for w in result], choice="yes"
+        ).order_by("participant_id", "id").values_list("participant_id", "user_telegram_id")
+        for participant_id, user_telegram_id in rows:
+            yes_voters[participant_id].append(user_telegram_id)
+        for w in result:
+            w["yes_voters"] = yes_voters[w["participant_id"]]
+    return result
@@ -0,0 +1,105 @@
+# voting/response_cache.py
+# Кэш ответов публичных эндпоинтов бота, привязанный к «поколению» данных.
+# Любое сохранение/удаление Campaign, Round или Participant (voting/signals.py)
+# после коммита выдаёт новое поколение — старые ключи просто перестают читаться.
+#
+# Поколение хранится в БД (CurrentRound.generation), общей для всех воркеров gunicorn.
+# Процесс помнит прочитанное значение GENERATION_TTL секунд, так что в установившемся
+# режиме запросов к БД нет: свою смену поколения воркер видит сразу, чужую — не позже TTL.
+# Сами ответы лежат в CACHES: с LocMem у каждого воркера свой кэш, ключ содержит поколение.
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from .models import CurrentRound
+
+# Строка CurrentRound, в которой хранится поколение (та же, что у указателя текущего раунда)
+POINTER_PK = 1
+RESPONSE_TIMEOUT = 300
+
+DEFAULTS = {
+    "GENERATION_TTL": 1.0,  # сколько секунд верить прочитанному поколению, не перечитывая БД
+}
+
+_stats_lock = threading.Lock()
+_hits = Counter()
+_misses = Counter()
+# (поколение, когда прочитано по time.monotonic())
+_memo = (None, 0.0)
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "RESPONSE_CACHE", {})}
+
+
+def _read_generation():
+    return CurrentRound.objects.filter(pk=POINTER_PK).values_list("generation", flat=True).first()
+
+
+def current_generation() -> str:
+    global _memo
+    generation, read_at = _memo
+    now = time.monotonic()
+    if generation is not None and now - read_at < get_config()["GENERATION_TTL"]:
+        return generation
+    generation = _read_generation()
+    if not generation:
+        bump_generation()
+        generation = _read_generation()
+    _memo = (generation, now)
+    return generation
+
+
+def bump_generation():
+    global _memo
+    # Случайное значение вместо счётчика: после пересоздания БД старые ключи кэша не оживут
+    generation = uuid.uuid4().hex
+    if not CurrentRound.objects.filter(pk=POINTER_PK).update(generation=generation):
+        CurrentRound.objects.get_or_create(pk=POINTER_PK, defaults={"generation": generation})
+    _memo = (None, 0.0)
+
+
+def bump_on_commit():
+    """Сбрасывает поколение после коммита, чтобы никто не закэшировал данные до изменения"""
+    transaction.on_commit(bump_generation)
+
+
+def get_or_build(name: str, build, *key_parts):
+    """
+    Возвращает закэшированное значение build() для текущего поколения.
+    key_parts — то, от чего ещё зависит ответ (id раунда, версия счётчиков).
+    """
+    key = ":".join(["voting", name, current_generation(), *map(str, key_parts)])
+    value = cache.get(key)
+    if value is not None:
+        with _stats_lock:
+            _hits[name] += 1
+        return value, True
+    value = build()
+    cache.set(key, value, RESPONSE_TIMEOUT)
+    with _stats_lock:
+        _misses[name] += 1
+    return value, False
+
+
+def cached_response(name: str, build, *key_parts) -> Response:
+    """build() возвращает (data, status_code)"""
+    (data, status_code), hit = get_or_build(name, build, *key_parts)
+    response = Response(data, status=status_code)
+    response["X-Cache"] = "HIT" if hit else "MISS"
+    return response
+
+
+def stats() -> dict:
+    with _stats_lock:
+        names = sorted(set(_hits) | set(_misses))
+        return {
+            name: {"hits": _hits[name], "misses": _misses[name]}
+            for name in names
+        }
@@ -0,0 +1,169 @@
+# voting/seeding.py
+# Синтетические данные для бенчмарков и нагрузочных тестов (manage.py seed_votes).
+# Голоса пишутся пачками через bulk_create, номера участников резервируются блоком,
+# счётчики (ParticipantTally/RoundTally) считаются по ходу генерации — без save() на строку.
+# Один и тот же seed даёт одни и те же данные.
+import random
+from bisect import bisect
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Campaign, Participant, ParticipantTally, Round, RoundTally, Vote
+from . import current_round, participants as participants_module
+
+DEFAULT_START = datetime(2026, 1, 1, 18, 0, tzinfo=dt_timezone.utc)
+# Сколько голосов держим в памяти между bulk_create
+CHUNK_SIZE = 50_000
+
+
+def zipf_weights(n: int, s: float = 1.1) -> list:
+    """Популярность по Ципфу: k-й участник получает ~1/k^s голосов"""
+    return [1 / (k + 1) ** s for k in range(n)]
+
+
+@contextmanager
+def explicit_created_at():
+    """auto_now_add иначе перезапишет заданное время голоса на «сейчас»"""
+    field = Vote._meta.get_field("created_at")
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class RoundVotes:
+    """Генератор голосов одного раунда и их итоги"""
+
+    def __init__(self, round_obj, people, count, rnd, *, zipf_s, yes_share, user_id_start, start, duration):
+        self.round = round_obj
+        self.people = people
+        self.count = count
+        self.rnd = rnd
+        self.cum_weights = list(accumulate(zipf_weights(len(people), zipf_s)))
+        self.yes_share = yes_share
+        self.user_id_start = user_id_start
+        self.start = start
+        self.duration = duration.total_seconds()
+        # Всплески: объявления в чате, после каждого — затухающий поток голосов
+        self.bursts = sorted(rnd.uniform(0, self.duration * 0.8) for _ in range(rnd.randint(2, 5)))
+        self.tallies = Counter()
+        self.voters = 0
+
+    def pick(self):
+        return bisect(self.cum_weights, self.rnd.random() * self.cum_weights[-1])
+
+    def timestamp(self):
+        offset = self.rnd.choice(self.bursts) + self.rnd.expovariate(1 / max(self.duration * 0.05, 1))
+        return self.start + timedelta(seconds=min(offset, self.duration))
+
+    def __iter__(self):
+        individual = self.round.type == "individual"
+        max_per_user = max(1, len(self.people) // 2)
+        made = 0
+        user_id = self.user_id_start
+        while made < self.count:
+            # Большинство голосует за одного-двух, немногие — за многих
+            wanted = min(max_per_user, 1 + int(self.rnd.expovariate(1.0)))
+            chosen = set()
+            while len(chosen) < wanted:
+                chosen.add(self.pick())
+            self.voters += 1
+            for index in sorted(chosen):
+                participant = self.people[index]
+                choice = None
+                if individual:
+                    choice = "yes" if self.rnd.random() < self.yes_share else "no"
+                self.tallies[(participant.id, f"{choice}_count" if choice else "standard_count")] += 1
+                # *_id вместо объектов: без дескрипторов связей на каждую строку
+                yield Vote(
+                    round_id=self.round.id, participant_id=participant.id, user_telegram_id=user_id,
+                    choice=choice, created_at=self.timestamp(),
+                )
+                made += 1
+                if made == self.count:
+                    return
+            user_id += 1
+
+
+def write_votes(votes, progress=None) -> int:
+    written = 0
+    chunk = []
+    with explicit_created_at():
+        for vote in votes:
+            chunk.append(vote)
+            if len(chunk) == CHUNK_SIZE:
+                Vote.objects.bulk_create(chunk)
+                written += len(chunk)
+                chunk = []
+                if progress:
+                    progress(written)
+        Vote.objects.bulk_create(chunk)
+        written += len(chunk)
+    return written
+
+
+def write_tallies(generated: RoundVotes):
+    ParticipantTally.objects.bulk_create([
+        ParticipantTally(
+            participant=p, round=generated.round,
+            yes_count=generated.tallies[(p.id, "yes_count")],
+            no_count=generated.tallies[(p.id, "no_count")],
+            standard_count=generated.tallies[(p.id, "standard_count")],
+        ) for p in generated.people
+    ], update_conflicts=True, unique_fields=["participant"],
+        # Пустые строки счётчиков уже созданы вместе с участниками
+        update_fields=["yes_count", "no_count", "standard_count"])
+    # Строку RoundTally создаёт сигнал при создании раунда
+    RoundTally.objects.filter(round=generated.round).update(
+        total_votes=generated.count, voters_count=generated.voters, version=F("version") + 1
+    )
+
+
+def seed(*, campaigns=1, rounds=("individual", "standard"), participants=40, votes=1000, seed=0,
+         zipf_s=1.1, yes_share=0.7, user_id_start=10 ** 9, start=DEFAULT_START,
+         round_duration=timedelta(hours=1), make_current=True, progress=None) -> list:
+    """
+    Создаёт campaigns кампаний с раундами типов rounds; votes делятся поровну между всеми раундами.
+    Последний раунд последней кампании остаётся активным (и текущим), остальные завершены.
+    progress(written) вызывается после каждой пачки. Возвращает созданные раунды по порядку.
+    """
+    rnd = random.Random(seed)
+    total_rounds = campaigns * len(rounds)
+    created = []
+    done = 0
+    for c in range(campaigns):
+        campaign = Campaign.objects.create(name=f"Синтетика {seed}/{c + 1}", admin_telegram_id=0)
+        for number, round_type in enumerate(rounds, start=1):
+            index = len(created)
+            last = index == total_rounds - 1
+            round_start = start + round_duration * index
+            with transaction.atomic():
+                round_obj = Round.objects.create(
+                    campaign=campaign, number=number, type=round_type,
+                    status="active" if last else "ended", winners_count=3,
+                )
+                Round.objects.filter(pk=round_obj.pk).update(
+                    started_at=round_start, ended_at=None if last else round_start + round_duration
+                )
+                people = participants_module.create_participants(round_obj, [
+                    Participant(full_name=f"Участник {c + 1}.{number}.{i + 1}") for i in range(participants)
+                ])
+            count = votes // total_rounds + (1 if index < votes % total_rounds else 0)
+            generated = RoundVotes(
+                round_obj, people, count, rnd, zipf_s=zipf_s, yes_share=yes_share,
+                user_id_start=user_id_start, start=round_start, duration=round_duration,
+            )
+            # progress() получает число голосов, записанных с начала seed()
+            write_votes(generated, progress and (lambda written, done=done: progress(done + written)))
+            write_tallies(generated)
+            done += count
+            created.append(round_obj)
+    if make_current and created:
+        current_round.set_current(created[-1])
+    return created
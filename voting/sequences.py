@@ -0,0 +1,49 @@
+# voting/sequences.py
+# Выдача порядковых номеров через таблицу-счётчик Sequence вместо Max(...) + 1.
+# Номер берётся одним UPDATE ... SET value = value + N, поэтому параллельные
+# сохранения не получают одинаковый номер, а bulk-вставки резервируют блок сразу.
+from django.db import transaction
+from django.db.models import F, Max
+
+from .models import Campaign, Participant, Sequence
+
+CAMPAIGN_SEQUENCE = "campaign"
+
+
+def participant_sequence(round_id: int) -> str:
+    return f"participant:{round_id}"
+
+
+def reserve(name: str, count: int = 1, seed=None) -> int:
+    """
+    Резервирует count номеров подряд и возвращает первый из них.
+    seed() — последний уже занятый номер; вызывается один раз, когда счётчика ещё нет.
+    """
+    if count < 1:
+        raise ValueError("count должен быть >= 1")
+    with transaction.atomic():
+        # UPDATE первым: строка (в SQLite — вся база) блокируется до конца транзакции
+        if not Sequence.objects.filter(name=name).update(value=F("value") + count):
+            start = seed() if seed else 0
+            Sequence.objects.bulk_create([Sequence(name=name, value=start)], ignore_conflicts=True)
+            Sequence.objects.filter(name=name).update(value=F("value") + count)
+        last = Sequence.objects.filter(name=name).values_list("value", flat=True).get()
+    return last - count + 1
+
+
+def next_campaign_number() -> int:
+    return reserve(
+        CAMPAIGN_SEQUENCE,
+        seed=lambda: Campaign.objects.aggregate(max_num=Max("order_number"))["max_num"] or 0,
+    )
+
+
+def reserve_participant_numbers(round_id: int, count: int = 1) -> int:
+    """Первый из count подряд идущих order_number участников раунда"""
+    return reserve(
+        participant_sequence(round_id),
+        count,
+        seed=lambda: Participant.objects.filter(round_id=round_id).aggregate(
+            max_num=Max("order_number")
+        )["max_num"] or 0,
+    )
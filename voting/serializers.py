@@ -1,6 +1,11 @@
 # voting/serializers.py (обновлённый)
+from django.db import transaction
 from rest_framework import serializers
 from .models import Vote, Participant, Round, Campaign
+from . import tallies
+from .participants import FORMATS, parse_participants_text
+
+DUPLICATE_VOTE_MESSAGE = "Вы уже проголосовали за этого участника в этом раунде. Один голос на участника!"
 
 class ParticipantSerializer(serializers.ModelSerializer):
     order_number = serializers.IntegerField(read_only=True)
@@ -15,17 +20,21 @@ class VoteCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vote
         fields = ["round", "participant", "user_telegram_id", "choice"]
+        # Уникальность проверяем сами в validate(): одним запросом и с понятным текстом,
+        # а в буферизованном режиме — в писателе (voting/ingest.py)
+        validators = []
 
     def validate(self, data):
         round_obj = data["round"]
         if round_obj.status != "active":
             raise serializers.ValidationError("Раунд не активен")
-        if Vote.objects.filter(
+        # В буферизованном режиме дубли отсекает писатель (voting/ingest.py)
+        if self.context.get("check_duplicates", True) and Vote.objects.filter(
             round=round_obj,
             user_telegram_id=data["user_telegram_id"],
             participant=data["participant"]
         ).exists():
-            raise serializers.ValidationError("Вы уже проголосовали за этого участника в этом раунде. Один голос на участника!")
+            raise serializers.ValidationError(DUPLICATE_VOTE_MESSAGE)
         if round_obj.type == "individual":
             if "choice" not in data or data["choice"] not in ["yes", "no"]:
                 raise serializers.ValidationError("Для индивидуального раунда требуется choice: 'yes' или 'no'")
@@ -34,6 +43,13 @@ class VoteCreateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Для стандартного раунда choice не требуется")
         return data
 
+    def create(self, validated_data):
+        # Счётчики обновляются в той же транзакции, что и INSERT голоса
+        with transaction.atomic():
+            vote = super().create(validated_data)
+            tallies.record_votes([vote])
+        return vote
+
 class CampaignSerializer(serializers.ModelSerializer):
     order_number = serializers.IntegerField(read_only=True)
 
@@ -61,4 +77,30 @@ class EndRoundSerializer(serializers.Serializer):
 
 class TransferWinnersSerializer(serializers.Serializer):
     round_id = serializers.IntegerField(required=True)
-    target_round_id = serializers.IntegerField(required=True)
\ No newline at end of file
+    target_round_id = serializers.IntegerField(required=True)
+
+class ParticipantRowSerializer(serializers.Serializer):
+    full_name = serializers.CharField(allow_blank=True, trim_whitespace=True)
+    description = serializers.CharField(required=False, allow_blank=True, default="")
+
+class AddParticipantsSerializer(serializers.Serializer):
+    round_id = serializers.IntegerField(required=True)
+    participants = ParticipantRowSerializer(many=True, required=False)
+    text = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False)
+    # auto: TSV, CSV с заголовком или по строке на участника; csv — каждая строка как CSV
+    format = serializers.ChoiceField(choices=FORMATS, default="auto")
+
+    def validate(self, data):
+        rows = list(data.get("participants") or [])
+        if data.get("text"):
+            rows += parse_participants_text(data["text"], data["format"])
+        if not rows:
+            raise serializers.ValidationError("Передайте список participants или текст text (CSV/TSV)")
+        data["rows"] = rows
+        return data
+
+class BotUserSerializer(serializers.Serializer):
+    telegram_id = serializers.IntegerField(required=True, min_value=1)
+
+class BlockedBotUsersSerializer(serializers.Serializer):
+    telegram_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
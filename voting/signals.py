@@ -0,0 +1,56 @@
+# voting/signals.py
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Campaign, Participant, ParticipantTally, Round, RoundTally, Vote
+from . import response_cache, tallies
+
+
+@receiver(post_save, sender=Round)
+def round_saved(sender, instance, created, **kwargs):
+    if created:
+        # Строка итогов есть у каждого раунда — на ней держится версия результатов
+        RoundTally.objects.get_or_create(round=instance)
+    else:
+        tallies.bump_round_version(instance.pk)
+
+
+@receiver(post_save, sender=Participant)
+def participant_saved(sender, instance, created, **kwargs):
+    if created:
+        # Строку счётчиков создаём сразу: запись голоса только делает UPDATE
+        ParticipantTally.objects.create(participant=instance, round_id=instance.round_id)
+    tallies.bump_round_version(instance.round_id)
+
+
+def deleted_directly(origin, model) -> bool:
+    """Удаляют именно объекты model, а не каскадом вместе с раундом/кампанией"""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is model
+
+
+@receiver(post_delete, sender=Participant)
+def participant_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_directly(origin, Participant):
+        # Вместе с участником ушли его голоса — итоги раунда считаем заново (и версия растёт)
+        tallies.rebuild([instance.round_id])
+
+
+@receiver(post_delete, sender=Vote)
+def vote_deleted(sender, instance, origin=None, **kwargs):
+    # При каскаде от участника итоги пересчитает participant_deleted,
+    # от раунда или кампании — счётчики удаляются вместе с ними
+    if deleted_directly(origin, Vote):
+        tallies.remove_vote(instance)
+
+
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+@receiver(post_save, sender=Round)
+@receiver(post_delete, sender=Round)
+@receiver(post_save, sender=Participant)
+@receiver(post_delete, sender=Participant)
+def structure_changed(sender, **kwargs):
+    # Новое поколение для кэша ответов бота (voting/response_cache.py)
+    response_cache.bump_on_commit()
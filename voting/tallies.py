@@ -0,0 +1,176 @@
+# voting/tallies.py
+# Материализованные счётчики голосов: ParticipantTally и RoundTally.
+# Обновляются в той же транзакции, что и запись голосов, поэтому
+# страницы результатов читают готовые числа вместо Count по всей таблице Vote.
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce
+
+from .models import Participant, ParticipantTally, Round, RoundTally, Vote
+from .metrics import TALLY_SECONDS
+
+# Ограничение на число параметров в одном IN (...) для SQLite
+USERS_CHUNK_SIZE = 500
+
+
+def votes_annotation():
+    """Голоса участника для annotate(): стандартные + «Да» (как раньше считал Count)"""
+    return Coalesce(F("tally__standard_count") + F("tally__yes_count"), Value(0))
+
+
+def round_total_votes(round_obj) -> int:
+    return RoundTally.objects.filter(round=round_obj).values_list("total_votes", flat=True).first() or 0
+
+
+@TALLY_SECONDS.time(op="record")
+def record_votes(votes: list):
+    """
+    Учитывает только что записанные голоса в счётчиках.
+    Вызывать внутри той же transaction.atomic(), что и INSERT голосов.
+    """
+    if not votes:
+        return
+    participant_deltas = defaultdict(Counter)
+    round_deltas = Counter()
+    batch_pairs = Counter()
+    for vote in votes:
+        field = f"{vote.choice}_count" if vote.choice else "standard_count"
+        participant_deltas[(vote.participant_id, vote.round_id)][field] += 1
+        round_deltas[vote.round_id] += 1
+        batch_pairs[(vote.round_id, vote.user_telegram_id)] += 1
+
+    # Новый проголосовавший — если все его голоса в раунде пришли в этой пачке
+    new_voters = Counter()
+    user_ids = sorted({user_id for _, user_id in batch_pairs})
+    for start in range(0, len(user_ids), USERS_CHUNK_SIZE):
+        stored = Vote.objects.filter(
+            round_id__in=round_deltas.keys(),
+            user_telegram_id__in=user_ids[start:start + USERS_CHUNK_SIZE],
+        ).values("round_id", "user_telegram_id").annotate(n=Count("id"))
+        for row in stored:
+            key = (row["round_id"], row["user_telegram_id"])
+            if key in batch_pairs and row["n"] == batch_pairs[key]:
+                new_voters[row["round_id"]] += 1
+
+    # Строки счётчиков создаются вместе с раундом и участником (voting/signals.py, participants.py)
+    for (participant_id, _), delta in participant_deltas.items():
+        ParticipantTally.objects.filter(participant_id=participant_id).update(
+            **{field: F(field) + n for field, n in delta.items()}
+        )
+    for round_id, n in round_deltas.items():
+        RoundTally.objects.filter(round_id=round_id).update(
+            total_votes=F("total_votes") + n,
+            voters_count=F("voters_count") + new_voters[round_id],
+            version=F("version") + 1,
+        )
+
+
+@TALLY_SECONDS.time(op="transfer")
+def record_transfer(round_id: int, standard_counts: dict):
+    """
+    Счётчики после переноса голосов в раунд (voting/transfer.py). Участники новые, поэтому
+    их числа известны заранее; итоги раунда — одним COUNT(DISTINCT) вместо поиска
+    новых проголосовавших пачками, как в record_votes().
+    """
+    ParticipantTally.objects.bulk_update([
+        ParticipantTally(participant_id=participant_id, round_id=round_id, standard_count=n)
+        for participant_id, n in standard_counts.items()
+    ], ["standard_count"], batch_size=500)
+    totals = Vote.objects.filter(round_id=round_id).aggregate(
+        total_votes=Count("id"), voters_count=Count("user_telegram_id", distinct=True)
+    )
+    RoundTally.objects.filter(round_id=round_id).update(**totals, version=F("version") + 1)
+
+
+def remove_vote(vote):
+    """Убирает удалённый голос из счётчиков (post_delete Vote, см. voting/signals.py)"""
+    field = f"{vote.choice}_count" if vote.choice else "standard_count"
+    ParticipantTally.objects.filter(participant_id=vote.participant_id).update(**{field: F(field) - 1})
+    last_vote = not Vote.objects.filter(round_id=vote.round_id, user_telegram_id=vote.user_telegram_id).exists()
+    RoundTally.objects.filter(round_id=vote.round_id).update(
+        total_votes=F("total_votes") - 1,
+        voters_count=F("voters_count") - int(last_vote),
+        version=F("version") + 1,
+    )
+
+
+def bump_round_version(round_id: int):
+    """Отмечает, что результаты раунда изменились не из-за голосов (участники, статус)"""
+    RoundTally.objects.filter(round_id=round_id).update(version=F("version") + 1)
+
+
+def compute_from_votes(round_ids=None):
+    """Считает счётчики заново по таблице Vote"""
+    participants = Participant.objects.all()
+    rounds = Round.objects.all()
+    if round_ids:
+        participants = participants.filter(round_id__in=round_ids)
+        rounds = rounds.filter(id__in=round_ids)
+    participant_rows = {
+        p["id"]: p for p in participants.values("id", "round_id").annotate(
+            yes_count=Count("vote", filter=Q(vote__choice="yes")),
+            no_count=Count("vote", filter=Q(vote__choice="no")),
+            standard_count=Count("vote", filter=Q(vote__choice__isnull=True)),
+        )
+    }
+    round_rows = {
+        r["id"]: r for r in rounds.values("id").annotate(
+            total_votes=Count("votes"),
+            voters_count=Count("votes__user_telegram_id", distinct=True),
+        )
+    }
+    return participant_rows, round_rows
+
+
+def find_drift(round_ids=None) -> list:
+    """Возвращает расхождения между счётчиками и сырыми голосами"""
+    participant_rows, round_rows = compute_from_votes(round_ids)
+    stored_participants = {
+        t.participant_id: t for t in ParticipantTally.objects.filter(participant_id__in=participant_rows)
+    }
+    stored_rounds = {t.round_id: t for t in RoundTally.objects.filter(round_id__in=round_rows)}
+    drift = []
+    for participant_id, row in participant_rows.items():
+        tally = stored_participants.get(participant_id)
+        for field in ("yes_count", "no_count", "standard_count"):
+            stored = getattr(tally, field) if tally else 0
+            if stored != row[field]:
+                drift.append(f"участник {participant_id}: {field} = {stored}, по голосам {row[field]}")
+    for round_id, row in round_rows.items():
+        tally = stored_rounds.get(round_id)
+        for field in ("total_votes", "voters_count"):
+            stored = getattr(tally, field) if tally else 0
+            if stored != row[field]:
+                drift.append(f"раунд {round_id}: {field} = {stored}, по голосам {row[field]}")
+    return drift
+
+
+@TALLY_SECONDS.time(op="rebuild")
+def rebuild(round_ids=None):
+    """Полностью пересобирает счётчики из таблицы Vote"""
+    with transaction.atomic():
+        participant_rows, round_rows = compute_from_votes(round_ids)
+        # Версию не сбрасываем, иначе старый ETag снова станет «актуальным»
+        versions = dict(RoundTally.objects.filter(round_id__in=round_rows).values_list("round_id", "version"))
+        ParticipantTally.objects.filter(participant_id__in=participant_rows).delete()
+        RoundTally.objects.filter(round_id__in=round_rows).delete()
+        ParticipantTally.objects.bulk_create([
+            ParticipantTally(
+                participant_id=participant_id,
+                round_id=row["round_id"],
+                yes_count=row["yes_count"],
+                no_count=row["no_count"],
+                standard_count=row["standard_count"],
+            ) for participant_id, row in participant_rows.items()
+        ], batch_size=500)
+        RoundTally.objects.bulk_create([
+            RoundTally(
+                round_id=round_id,
+                total_votes=row["total_votes"],
+                voters_count=row["voters_count"],
+                version=versions.get(round_id, 0) + 1,
+            ) for round_id, row in round_rows.items()
+        ], batch_size=500)
+    return len(participant_rows), len(round_rows)
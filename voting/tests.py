@@ -1,3 +1,963 @@
-from django.test import TestCase
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import Q
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from core.db_routing import read_only
+
+from .models import BotUser, Campaign, CurrentRound, Participant, ParticipantTally, Round, RoundTally, Sequence, Vote
+from . import audience, current_round, ingest, live, participants, ranking, response_cache, seeding, sequences, tallies, transfer
+from .metrics import ACCEPTED, VOTES
+
+# Строка лога на каждый запрос (core/timing.py) в выводе тестов не нужна
+logging.getLogger("core.timing").setLevel(logging.WARNING)
+
+_metrics_dir = None
+_test_settings = None
+
+
+def setUpModule():
+    global _metrics_dir, _test_settings
+    _metrics_dir = tempfile.TemporaryDirectory()
+    _test_settings = override_settings(
+        # Метрики запросов всех тестов — во временный каталог, а не в METRICS["DIR"] проекта
+        METRICS={**settings.METRICS, "DIR": _metrics_dir.name},
+        # База откатывается после каждого теста — поколение, запомненное процессом, устаревает
+        RESPONSE_CACHE={"GENERATION_TTL": 0},
+    )
+    _test_settings.enable()
+
+
+def tearDownModule():
+    _test_settings.disable()
+    _metrics_dir.cleanup()
+
+
+def _in_thread(func):
+    """Вызов в потоке пула: у каждого потока своё соединение, закрываем его сами"""
+    def wrapper(*args):
+        try:
+            return func(*args)
+        finally:
+            connection.close()
+    return wrapper
+
+
+class SequenceTests(TestCase):
+    def setUp(self):
+        self.campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        self.round = Round.objects.create(campaign=self.campaign, number=1, status="active")
+
+    def test_seeds_from_existing_numbers(self):
+        Participant.objects.create(round=self.round, full_name="А")
+        Participant.objects.create(round=self.round, full_name="Б")
+        Sequence.objects.all().delete()
+        self.assertEqual(sequences.reserve_participant_numbers(self.round.id), 3)
+
+    def test_block_reservation_is_contiguous(self):
+        first = sequences.reserve_participant_numbers(self.round.id, 5)
+        self.assertEqual(first, 1)
+        self.assertEqual(sequences.reserve_participant_numbers(self.round.id), 6)
+
+    def test_rounds_have_separate_counters(self):
+        other = Round.objects.create(campaign=self.campaign, number=2, status="active")
+        Participant.objects.create(round=self.round, full_name="А")
+        self.assertEqual(Participant.objects.create(round=other, full_name="Б").order_number, 1)
+
+
+class SequenceConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+    CALLS = 40
+
+    def setUp(self):
+        campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        self.round = Round.objects.create(campaign=campaign, number=1, status="active")
+
+    def test_parallel_reservations_do_not_overlap(self):
+        @_in_thread
+        def worker(i):
+            count = 1 + i % 3
+            numbers = []
+            for _ in range(self.CALLS):
+                first = sequences.reserve_participant_numbers(self.round.id, count)
+                numbers.extend(range(first, first + count))
+            return numbers
+
+        with ThreadPoolExecutor(self.THREADS) as pool:
+            numbers = [n for chunk in pool.map(worker, range(self.THREADS)) for n in chunk]
+        self.assertEqual(sorted(numbers), list(range(1, len(numbers) + 1)))
+
+    def test_parallel_campaigns_get_unique_numbers(self):
+        @_in_thread
+        def worker(i):
+            return [
+                Campaign.objects.create(name=f"К{i}-{j}", admin_telegram_id=i).order_number
+                for j in range(self.CALLS // 4)
+            ]
+
+        with ThreadPoolExecutor(self.THREADS) as pool:
+            numbers = [n for chunk in pool.map(worker, range(self.THREADS)) for n in chunk]
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(Campaign.objects.count(), len(numbers) + 1)
+
+
+class VoteStateTests(TestCase):
+    def setUp(self):
+        campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        self.round = Round.objects.create(campaign=campaign, number=1, status="active")
+        self.first, self.second = participants.create_participants(
+            self.round, [Participant(full_name="Иванов"), Participant(full_name="Петров")]
+        )
+
+    def vote(self, participant, **extra):
+        return self.client.post("/api/vote/", {
+            "round": self.round.id, "participant": participant.id, "user_telegram_id": 7, **extra,
+        }, content_type="application/json")
+
+    def test_vote_returns_user_state(self):
+        self.vote(self.first)
+        response = self.vote(self.second, return_state=True)
+        self.assertEqual(response.status_code, 201)
+        state = response.json()["user_state"]
+        self.assertEqual(state["round_id"], self.round.id)
+        self.assertEqual(
+            sorted(v["participant_id"] for v in state["votes"]), [self.first.id, self.second.id]
+        )
+        # Та же версия, что у user-votes/ — бот берёт общую часть из своего кэша
+        self.assertEqual(state["version"], self.client.get("/api/user-votes/", {"user_id": 7}).json()["version"])
+
+    def test_duplicate_vote_returns_user_state(self):
+        self.vote(self.first)
+        response = self.vote(self.first, return_state=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("non_field_errors", response.json())
+        self.assertEqual([v["participant_id"] for v in response.json()["user_state"]["votes"]], [self.first.id])
+
+    def test_state_only_on_request(self):
+        self.assertNotIn("user_state", self.vote(self.first).json())
+
+
+def _old_winner_ids(round_obj) -> set:
+    """Прежний отбор победителей (до ranking.py): N различных результатов сверху, затем votes >= N-го"""
+    counts = Counter()
+    for participant in Participant.objects.filter(round=round_obj):
+        counts[participant.id] = Vote.objects.filter(
+            Q(choice__isnull=True) | Q(choice="yes"), participant=participant
+        ).count()
+    top_n_scores = sorted(set(counts.values()), reverse=True)[:round_obj.winners_count]
+    min_votes = min(top_n_scores) if top_n_scores else 0
+    return {participant_id for participant_id, votes in counts.items() if votes >= min_votes}
+
+
+class RankingTests(TestCase):
+    def setUp(self):
+        self.campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        self.numbers = iter(range(1, 100))
+
+    def make_round(self, votes_per_participant, *, winners_count, round_type="standard", no_votes=()):
+        """votes_per_participant — голосов «за» у каждого участника; no_votes — голосов «Нет» (индивидуальный)"""
+        round_obj = Round.objects.create(
+            campaign=self.campaign, number=next(self.numbers), status="active",
+            type=round_type, winners_count=winners_count,
+        )
+        created = participants.create_participants(
+            round_obj, [Participant(full_name=f"Участник {i}") for i in range(len(votes_per_participant))]
+        )
+        choice = "yes" if round_type == "individual" else None
+        votes = []
+        for participant, n, n_no in zip(created, votes_per_participant, [*no_votes, *[0] * len(created)]):
+            votes += [Vote(round=round_obj, participant=participant, user_telegram_id=user, choice=choice)
+                      for user in range(1, n + 1)]
+            votes += [Vote(round=round_obj, participant=participant, user_telegram_id=1000 + user, choice="no")
+                      for user in range(n_no)]
+        tallies.record_votes(Vote.objects.bulk_create(votes))
+        return round_obj, created
+
+    def winner_ids(self, round_obj):
+        return {w["participant_id"] for w in ranking.select_winners(round_obj)}
+
+    def test_tie_at_cutoff_takes_everyone_with_that_result(self):
+        round_obj, created = self.make_round([5, 4, 3, 3, 1], winners_count=3)
+        self.assertEqual(self.winner_ids(round_obj), {p.id for p in created[:4]})
+        self.assertEqual(self.winner_ids(round_obj), _old_winner_ids(round_obj))
+
+    def test_ties_above_cutoff_use_distinct_results(self):
+        round_obj, created = self.make_round([5, 5, 4, 4, 3, 2], winners_count=2)
+        self.assertEqual(self.winner_ids(round_obj), {p.id for p in created[:4]})
+        self.assertEqual(self.winner_ids(round_obj), _old_winner_ids(round_obj))
+        ranks = [w["rank"] for w in ranking.select_winners(round_obj)]
+        self.assertEqual(ranks, [1, 1, 2, 2])
+
+    def test_fewer_distinct_results_than_winners_count(self):
+        round_obj, created = self.make_round([2, 2, 0], winners_count=3)
+        self.assertEqual(self.winner_ids(round_obj), {p.id for p in created})
+        self.assertEqual(self.winner_ids(round_obj), _old_winner_ids(round_obj))
+
+    def test_individual_round_counts_yes_and_groups_yes_voters(self):
+        # «Нет» в рейтинг не входят: у второго больше голосов всего, но меньше «Да»
+        round_obj, created = self.make_round([3, 2, 1], winners_count=2, round_type="individual", no_votes=[0, 5, 0])
+        winners = ranking.select_winners(round_obj, with_yes_voters=True)
+        self.assertEqual({w["participant_id"] for w in winners}, _old_winner_ids(round_obj))
+        self.assertEqual(
+            [(w["participant_id"], w["votes"], w["yes_voters"]) for w in winners],
+            [(created[0].id, 3, [1, 2, 3]), (created[1].id, 2, [1, 2])],
+        )
+
+
+class ParticipantsTextTests(TestCase):
+    def test_plain_line_with_comma_is_one_name(self):
+        self.assertEqual(participants.parse_participants_text("Иванов, Иван\nПетров"), [
+            {"full_name": "Иванов, Иван", "description": ""},
+            {"full_name": "Петров", "description": ""},
+        ])
+
+    def test_bot_format_with_description_in_brackets(self):
+        self.assertEqual(participants.parse_participants_text("Иванов Иван (хороший спикер)"), [
+            {"full_name": "Иванов Иван", "description": "хороший спикер"},
+        ])
+
+    def test_tsv(self):
+        self.assertEqual(participants.parse_participants_text("Иванов, Иван\tспикер, ведущий"), [
+            {"full_name": "Иванов, Иван", "description": "спикер, ведущий"},
+        ])
+
+    def test_csv_with_header_row(self):
+        text = "ФИО,Описание\n\"Иванов, Иван\",спикер\nПетров,ведущий (утро)"
+        self.assertEqual(participants.parse_participants_text(text), [
+            {"full_name": "Иванов, Иван", "description": "спикер"},
+            {"full_name": "Петров", "description": "ведущий (утро)"},
+        ])
+
+    def test_csv_requested_explicitly(self):
+        self.assertEqual(participants.parse_participants_text("Иванов,спикер", "csv"), [
+            {"full_name": "Иванов", "description": "спикер"},
+        ])
+
+    def test_per_row_errors(self):
+        campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        round_obj = Round.objects.create(campaign=campaign, number=1, status="active")
+        user = User.objects.create_user("admin")
+        response = self.client.post("/api/add-participants/", {
+            "round_id": round_obj.id,
+            "text": "ФИО,Описание\nиванов иван,спикер\n,без имени\n" + "Я" * 300 + ",длинное",
+        }, content_type="application/json", HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        data = response.json()
+        self.assertEqual((data["created"], data["failed"]), (1, 2))
+        self.assertEqual(data["results"][0]["full_name"], "Иванов Иван")
+        self.assertEqual(
+            [(row["row"], row["status"]) for row in data["results"]], [(1, "ok"), (2, "error"), (3, "error")]
+        )
+        self.assertEqual(data["results"][1]["error"], "ФИО пустое")
+        self.assertIn("длиннее", data["results"][2]["error"])
+        self.assertEqual(Participant.objects.filter(round=round_obj).count(), 1)
+
+
+class TallyTests(TestCase):
+    def setUp(self):
+        campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        self.round = Round.objects.create(campaign=campaign, number=1, status="active", type="individual")
+        self.first, self.second = participants.create_participants(
+            self.round, [Participant(full_name="Иванов"), Participant(full_name="Петров")]
+        )
+        self.votes = Vote.objects.bulk_create([
+            Vote(round=self.round, participant=self.first, user_telegram_id=1, choice="yes"),
+            Vote(round=self.round, participant=self.second, user_telegram_id=1, choice="no"),
+            Vote(round=self.round, participant=self.first, user_telegram_id=2, choice="yes"),
+        ])
+        tallies.record_votes(self.votes)
+
+    def tally(self):
+        return RoundTally.objects.get(round=self.round)
+
+    def test_record_votes(self):
+        self.assertEqual(tallies.find_drift(), [])
+        self.assertEqual((self.tally().total_votes, self.tally().voters_count), (3, 2))
+        self.first.tally.refresh_from_db()
+        self.assertEqual((self.first.tally.yes_count, self.first.tally.no_count), (2, 0))
+
+    def test_participant_tally_exists_before_votes(self):
+        participant = Participant.objects.create(round=self.round, full_name="Сидоров")
+        self.assertEqual(ParticipantTally.objects.get(participant=participant).yes_count, 0)
+
+    def test_drift_and_rebuild(self):
+        ParticipantTally.objects.filter(participant=self.first).update(yes_count=10)
+        RoundTally.objects.filter(round=self.round).update(voters_count=0)
+        self.assertEqual(len(tallies.find_drift([self.round.id])), 2)
+        version = self.tally().version
+        tallies.rebuild([self.round.id])
+        self.assertEqual(tallies.find_drift(), [])
+        # Новая версия — иначе старый ETag результатов останется «свежим»
+        self.assertGreater(self.tally().version, version)
+
+    def test_deleting_votes_updates_tallies_and_version(self):
+        version = self.tally().version
+        self.votes[2].delete()
+        self.assertEqual(tallies.find_drift(), [])
+        self.assertEqual((self.tally().total_votes, self.tally().voters_count), (2, 1))
+        Vote.objects.filter(user_telegram_id=1, choice="no").delete()
+        self.assertEqual(tallies.find_drift(), [])
+        self.assertEqual(self.tally().voters_count, 1)
+        self.assertEqual(self.tally().version, version + 2)
+
+    def test_deleting_participant_rebuilds_round(self):
+        self.first.delete()
+        self.assertEqual(tallies.find_drift(), [])
+        self.assertEqual((self.tally().total_votes, self.tally().voters_count), (1, 1))
+
+    def test_round_results_etag_changes_after_delete(self):
+        url = f"/api/results/{self.round.id}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.votes[0].delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deleting_round_cascades(self):
+        self.round.delete()
+        self.assertFalse(RoundTally.objects.exists())
+        self.assertFalse(ParticipantTally.objects.exists())
+
+
+@override_settings(VOTE_INGEST={"ENABLED": True, "RESULT_TIMEOUT": 2})
+class BufferedVoteTests(TransactionTestCase):
+    """Запись голосов через очередь и поток-писатель (voting/ingest.py)"""
+
+    def setUp(self):
+        campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        self.round = Round.objects.create(campaign=campaign, number=1, status="active")
+        self.first, self.second = participants.create_participants(
+            self.round, [Participant(full_name="Иванов"), Participant(full_name="Петров")]
+        )
+
+    def vote(self, participant, user_id=7):
+        return self.client.post("/api/vote/", {
+            "round": self.round.id, "participant": participant.id, "user_telegram_id": user_id,
+        }, content_type="application/json")
+
+    def item(self, participant, user_id=7):
+        return {"round": self.round, "participant": participant, "user_telegram_id": user_id}
+
+    def test_accepted_and_duplicate(self):
+        self.assertEqual(self.vote(self.first).status_code, 201)
+        self.assertEqual(self.vote(self.first).status_code, 400)
+        self.assertEqual(self.vote(self.second).status_code, 201)
+        self.assertEqual(Vote.objects.count(), 2)
+        self.assertEqual(tallies.find_drift([self.round.id]), [])
+
+    def test_timed_out_vote_is_not_written(self):
+        with override_settings(VOTE_INGEST={"ENABLED": True, "RESULT_TIMEOUT": 0.05}):
+            buffer = ingest.get_buffer()
+            # Писатель не запущен — голос так и лежит в очереди
+            with mock.patch.object(buffer, "_ensure_writer"):
+                with self.assertRaises(FutureTimeoutError):
+                    ingest.ingest(self.item(self.first))
+            buffer.flush([buffer._queue.get_nowait()])
+        self.assertFalse(Vote.objects.exists())
+
+    def test_race_counts_only_inserted_rows(self):
+        ingest.write_votes([self.item(self.first)])
+        # Другой процесс записал голос между проверкой и INSERT
+        with mock.patch.object(ingest, "stored_keys", return_value=set()):
+            results = ingest.write_votes([self.item(self.first), self.item(self.second)])
+        self.assertEqual(results, [ingest.DUPLICATE, ingest.ACCEPTED])
+        self.assertEqual(tallies.find_drift([self.round.id]), [])
+
+
+class ReadOnlyRoutingTests(TransactionTestCase):
+    """core/db_routing.py: чтения во view с @read_only — на readonly, записи — всегда на default"""
+    databases = {"default", "readonly"}
+
+    def setUp(self):
+        campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        self.round = Round.objects.create(campaign=campaign, number=1, status="active")
+        self.participant = participants.create_participants(self.round, [Participant(full_name="Иванов")])[0]
+        response_cache.bump_generation()
+        cache.clear()
+
+    def capture(self, func):
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["readonly"]) as replica:
+            result = func()
+        return result, len(primary), len(replica)
+
+    def test_decorated_view_reads_from_readonly(self):
+        response, primary, replica = self.capture(lambda: self.client.get("/api/active-rounds/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+
+    def test_write_view_uses_default(self):
+        response, primary, replica = self.capture(lambda: self.client.post("/api/vote/", {
+            "round": self.round.id, "participant": self.participant.id, "user_telegram_id": 1,
+        }, content_type="application/json"))
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_write_inside_read_only_goes_to_default(self):
+        @read_only
+        def view():
+            Campaign.objects.count()
+            return Campaign.objects.create(name="Новая", admin_telegram_id=2)
+
+        campaign, primary, replica = self.capture(view)
+        self.assertEqual(replica, 1)
+        self.assertGreater(primary, 0)
+        self.assertEqual(campaign._state.db, "default")
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    """core/sqlite_backend: PRAGMA, BEGIN IMMEDIATE и очередь писателей на отдельной временной базе"""
+    alias = "sqlite_backend_test"
+
+    def setUp(self):
+        from core.sqlite_backend.base import DatabaseWrapper
+
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.path = os.path.join(directory, "db.sqlite3")
+        settings_dict = {
+            **connections["default"].settings_dict,
+            "NAME": self.path,
+            "OPTIONS": {"transaction_mode": "IMMEDIATE", "write_lane": True, "pragmas": {"busy_timeout": 1234}},
+        }
+        self.db = DatabaseWrapper(settings_dict, alias=self.alias)
+        connections[self.alias] = self.db
+        self.addCleanup(self.db.close)
+        self.addCleanup(connections.__delitem__, self.alias)
+        with self.db.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY)")
+
+    def pragma(self, name):
+        with self.db.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def lane_locked(self) -> bool:
+        return self.db.write_lane._thread_lock.locked()
+
+    def test_pragmas_applied_on_connect(self):
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+        self.assertEqual(self.pragma("synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma("temp_store"), 2)  # MEMORY
+        # Значение из OPTIONS["pragmas"] перекрывает PRAGMAS по умолчанию
+        self.assertEqual(self.pragma("busy_timeout"), 1234)
+
+    def test_transactions_begin_immediate(self):
+        import sqlite3
+
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        with transaction.atomic(using=self.alias):
+            # Только чтение, но блокировка на запись уже взята в BEGIN
+            self.pragma("user_version")
+            with self.assertRaisesMessage(sqlite3.OperationalError, "locked"):
+                other.execute("BEGIN IMMEDIATE")
+        other.execute("BEGIN IMMEDIATE")
+        other.rollback()
+
+    def test_lane_held_until_commit(self):
+        with transaction.atomic(using=self.alias):
+            with self.db.cursor() as cursor:
+                cursor.execute("INSERT INTO item DEFAULT VALUES")
+            self.assertTrue(self.db.lane_held)
+            self.assertTrue(self.lane_locked())
+        self.assertFalse(self.db.lane_held)
+        self.assertFalse(self.lane_locked())
+
+    def test_lane_released_on_rollback(self):
+        with transaction.atomic(using=self.alias):
+            self.assertTrue(self.lane_locked())
+            transaction.set_rollback(True, using=self.alias)
+        self.assertFalse(self.lane_locked())
+        self.assertEqual(self.pragma("user_version"), 0)
+
+    def test_lane_released_on_exception(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic(using=self.alias):
+                self.assertTrue(self.lane_locked())
+                raise ValueError
+        self.assertFalse(self.lane_locked())
+        # Пишущий запрос вне atomic с ошибкой — очередь тоже отпущена
+        with self.assertRaises(DatabaseError):
+            with self.db.cursor() as cursor:
+                cursor.execute("INSERT INTO missing DEFAULT VALUES")
+        self.assertFalse(self.lane_locked())
+
+    def test_autocommit_write_goes_through_lane(self):
+        lane = self.db.write_lane
+        with mock.patch.object(lane, "acquire", wraps=lane.acquire) as acquire:
+            with self.db.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                self.assertEqual(acquire.call_count, 0)
+                cursor.execute("INSERT INTO item DEFAULT VALUES")
+        self.assertEqual(acquire.call_count, 1)
+        self.assertFalse(self.lane_locked())
+
+
+class OutboundSchedulerTests(SimpleTestCase):
+    """Планировщик исходящих вызовов бота (bot_outbound.py)"""
+
+    async def test_callback_answers_skip_message_limits(self):
+        from aiogram.methods import AnswerCallbackQuery, SendMessage
+        from bot_outbound import OutboundScheduler
+
+        scheduler = OutboundScheduler(global_rate=1, chat_rate=1, chat_burst=1)
+
+        async def make_request(bot, method):
+            return type(method).__name__
+
+        try:
+            # Единственный токен общего лимита потрачен: следующее сообщение ждёт ~1 с
+            await scheduler(make_request, None, SendMessage(chat_id=1, text="первое"))
+            waiting = asyncio.create_task(scheduler(make_request, None, SendMessage(chat_id=2, text="второе")))
+            answer = await asyncio.wait_for(
+                scheduler(make_request, None, AnswerCallbackQuery(callback_query_id="1")), timeout=0.5
+            )
+            self.assertEqual(answer, "AnswerCallbackQuery")
+            self.assertFalse(waiting.done())
+        finally:
+            await scheduler.close(timeout=0)
+            await asyncio.gather(waiting, return_exceptions=True)
+
+    async def test_callback_answers_skip_retry_after_pause(self):
+        from aiogram.methods import AnswerCallbackQuery
+        from bot_outbound import OutboundScheduler
+
+        scheduler = OutboundScheduler()
+        # Telegram ответил 429 на какое-то сообщение: остальные отправки стоят минуту
+        scheduler.paused_until = time.monotonic() + 60
+
+        async def make_request(bot, method):
+            return type(method).__name__
+
+        try:
+            answer = await asyncio.wait_for(
+                scheduler(make_request, None, AnswerCallbackQuery(callback_query_id="1")), timeout=0.5
+            )
+            self.assertEqual(answer, "AnswerCallbackQuery")
+        finally:
+            await scheduler.close(timeout=0)
+
+
+class CurrentRoundTests(TestCase):
+    def setUp(self):
+        campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        self.first = Round.objects.create(campaign=campaign, number=1, status="active")
+        self.second = Round.objects.create(campaign=campaign, number=2, status="active")
+
+    def test_pointer_changed_by_other_worker(self):
+        current_round.set_current(self.first)
+        response_cache.bump_generation()
+        self.assertEqual(current_round.current_round_id(), self.first.id)
+        # Другой воркер переключил раунд: память этого процесса не сбрасывали
+        CurrentRound.objects.filter(pk=1).update(round=self.second, generation="другой-воркер")
+        self.assertEqual(current_round.current_round_id(), self.second.id)
+        self.assertTrue(Round.objects.get(pk=self.second.pk).is_current)
+
+    @override_settings(RESPONSE_CACHE={"GENERATION_TTL": 1.0})
+    def test_steady_state_costs_no_queries(self):
+        current_round.set_current(self.first)
+        response_cache.bump_generation()
+        self.assertEqual(current_round.current_round_id(), self.first.id)
+        with CaptureQueriesContext(connections["default"]) as captured:
+            self.assertEqual(current_round.current_round_id(), self.first.id)
+        self.assertEqual(len(captured), 0)
+
+    def test_admin_make_current(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/admin/voting/round/", {
+                "action": "make_current", "_selected_action": [self.first.pk],
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(current_round.resolve().pointer_id, self.first.id)
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        self.source = Round.objects.create(campaign=campaign, number=1, status="active", type="individual", winners_count=1)
+        self.target = Round.objects.create(campaign=campaign, number=2, status="active")
+        winner, loser = participants.create_participants(
+            self.source, [Participant(full_name="Иванов"), Participant(full_name="Петров")]
+        )
+        # В целевом раунде уже голосовали: пользователь 2 не должен посчитаться дважды
+        existing, = participants.create_participants(self.target, [Participant(full_name="Сидоров")])
+        tallies.record_votes(Vote.objects.bulk_create([
+            Vote(round=self.source, participant=winner, user_telegram_id=1, choice="yes"),
+            Vote(round=self.source, participant=winner, user_telegram_id=2, choice="yes"),
+            Vote(round=self.source, participant=loser, user_telegram_id=3, choice="yes"),
+            Vote(round=self.target, participant=existing, user_telegram_id=2),
+        ]))
+
+    def test_transfer_updates_tallies(self):
+        result = transfer.transfer_winners(self.source, self.target)
+        self.assertEqual((result["transferred"], result["transferred_votes"]), (1, 2))
+        self.assertEqual(tallies.find_drift([self.target.id]), [])
+        tally = RoundTally.objects.get(round=self.target)
+        self.assertEqual((tally.total_votes, tally.voters_count), (3, 2))
+        moved = Participant.objects.get(round=self.target, full_name="Иванов")
+        self.assertEqual(moved.tally.standard_count, 2)
+
+
+class ResponseCacheTests(TransactionTestCase):
+    databases = {"default", "readonly"}
+
+    def setUp(self):
+        cache.clear()
+        response_cache.bump_generation()
+
+    def test_generation_from_other_worker_invalidates_cache(self):
+        self.assertEqual(self.client.get("/api/active-rounds/")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/api/active-rounds/")["X-Cache"], "HIT")
+        # Другой воркер сменил поколение: локальный кэш этого процесса не трогали
+        CurrentRound.objects.filter(pk=1).update(generation="другой-воркер")
+        self.assertEqual(self.client.get("/api/active-rounds/")["X-Cache"], "MISS")
+
+    @override_settings(RESPONSE_CACHE={"GENERATION_TTL": 1.0})
+    def test_generation_memo_expires_after_ttl(self):
+        first = response_cache.current_generation()
+        CurrentRound.objects.filter(pk=1).update(generation="другой-воркер")
+        with CaptureQueriesContext(connections["default"]) as captured:
+            self.assertEqual(response_cache.current_generation(), first)
+        self.assertEqual(len(captured), 0)
+        with mock.patch("voting.response_cache.time.monotonic", return_value=time.monotonic() + 2):
+            self.assertEqual(response_cache.current_generation(), "другой-воркер")
+
+
+@override_settings(RESULTS_STREAM={"POLL_INTERVAL": 0.01})
+class LiveResultsTests(TestCase):
+    def setUp(self):
+        self.campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        self.round = Round.objects.create(campaign=self.campaign, number=1, status="active")
+        participants.create_participants(self.round, [Participant(full_name="Иванов")])
+
+    async def next_event(self, queue):
+        return await asyncio.wait_for(queue.get(), timeout=2)
+
+    async def test_switched_when_new_round_starts(self):
+        queue = await live.broadcaster.subscribe(self.round.id)
+        try:
+            self.assertEqual((await self.next_event(queue))[0], "snapshot")
+            new_round = await Round.objects.acreate(campaign=self.campaign, number=2, status="active")
+            event, data = await self.next_event(queue)
+            self.assertEqual(event, "switched")
+            self.assertEqual(data["open_rounds"], [self.round.id, new_round.id])
+        finally:
+            live.broadcaster.unsubscribe(self.round.id, queue)
+
+    async def test_ended_when_round_finishes(self):
+        queue = await live.broadcaster.subscribe(self.round.id)
+        try:
+            self.assertEqual((await self.next_event(queue))[0], "snapshot")
+            await Round.objects.filter(id=self.round.id).aupdate(status="ended")
+            self.assertEqual(await self.next_event(queue), ("ended", {"round_id": self.round.id}))
+        finally:
+            live.broadcaster.unsubscribe(self.round.id, queue)
+
+
+class AudienceTests(TestCase):
+    def setUp(self):
+        campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        round_obj = Round.objects.create(campaign=campaign, number=1, status="active")
+        first, second = participants.create_participants(
+            round_obj, [Participant(full_name="Иванов"), Participant(full_name="Петров")]
+        )
+        Vote.objects.bulk_create([
+            Vote(round=round_obj, participant=first, user_telegram_id=1),
+            Vote(round=round_obj, participant=second, user_telegram_id=1),
+            Vote(round=round_obj, participant=first, user_telegram_id=2),
+        ])
+        user = User.objects.create_user("admin")
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=user).key}"}
+
+    def test_voters_and_started_users_without_blocked(self):
+        audience.register_user(3)
+        audience.register_user(1)
+        # 2 голосовал без /start: его строка появляется сразу заблокированной
+        self.assertEqual(audience.mark_blocked([2]), 1)
+        self.assertEqual(audience.broadcast_recipients(), [1, 3])
+        self.assertEqual(audience.mark_blocked([3]), 1)
+        self.assertEqual(audience.broadcast_recipients(), [1])
+        # Новый /start возвращает в рассылки
+        self.assertFalse(audience.register_user(3))
+        self.assertEqual(audience.broadcast_recipients(), [1, 3])
+        self.assertEqual(BotUser.objects.filter(blocked_at__isnull=False).count(), 1)
+
+    def test_api_requires_token(self):
+        self.assertEqual(self.client.get("/api/broadcast-recipients/").status_code, 401)
+        response = self.client.post("/api/bot-users/", {"telegram_id": 4}, content_type="application/json", **self.headers)
+        self.assertEqual(response.json(), {"status": "ok", "created": True})
+        response = self.client.post(
+            "/api/bot-users/blocked/", {"telegram_ids": [1]}, content_type="application/json", **self.headers
+        )
+        self.assertEqual(response.json()["marked"], 1)
+        self.assertEqual(
+            self.client.get("/api/broadcast-recipients/", **self.headers).json(), {"count": 2, "recipients": [2, 4]}
+        )
+
+
+class SeedingTests(TestCase):
+    def seeded_votes(self, seed) -> list:
+        rounds = seeding.seed(votes=300, seed=seed, participants=10, make_current=False)
+        # id раундов и участников у каждого прогона свои, сравниваем по номеру раунда и имени
+        return list(
+            Vote.objects.filter(round__in=rounds)
+            .order_by("round__number", "user_telegram_id", "participant__full_name")
+            .values_list("round__number", "participant__full_name", "user_telegram_id", "choice", "created_at")
+        )
+
+    def test_same_seed_same_votes(self):
+        first = self.seeded_votes(7)
+        self.assertEqual(len(first), 300)
+        self.assertEqual(self.seeded_votes(7), first)
+        self.assertNotEqual(self.seeded_votes(8), first)
+
+
+def _count_votes_in_child(n):
+    for _ in range(n):
+        VOTES.inc(result=ACCEPTED)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(METRICS={**settings.METRICS, "DIR": self.directory, "TOKEN": "secret"}))
+        campaign = Campaign.objects.create(name="Тест", admin_telegram_id=1)
+        self.round = Round.objects.create(campaign=campaign, number=1, status="active")
+        self.participant = participants.create_participants(self.round, [Participant(full_name="Иванов")])[0]
+
+    def vote(self, participant_id):
+        return self.client.post("/api/vote/", {
+            "round": self.round.id, "participant": participant_id, "user_telegram_id": 1,
+        }, content_type="application/json")
+
+    def test_votes_latency_and_voters_are_exported(self):
+        self.assertEqual(self.vote(self.participant.id).status_code, 201)
+        self.assertEqual(self.vote(self.participant.id).status_code, 400)
+        self.assertEqual(self.vote(10 ** 6).status_code, 400)
+
+        text = self.client.get("/metrics").content.decode()
+        self.assertIn('voting_votes_total{result="accepted"} 1.0', text)
+        self.assertIn('voting_votes_total{result="duplicate"} 1.0', text)
+        self.assertIn('voting_votes_total{result="rejected"} 1.0', text)
+        self.assertIn('voting_http_request_seconds_bucket{view="add-vote",le="+Inf"} 3.0', text)
+        self.assertIn('voting_http_request_seconds_count{view="add-vote"} 3.0', text)
+        self.assertIn('voting_tally_seconds_count{op="record"} 1.0', text)
+        self.assertIn("voting_current_round_voters 1.0", text)
+
+    def test_values_from_all_processes_are_summed(self):
+        VOTES.inc(result=ACCEPTED)
+        child = multiprocessing.get_context("fork").Process(target=_count_votes_in_child, args=(4,))
+        child.start()
+        child.join()
+        self.assertEqual(child.exitcode, 0)
+        self.assertIn('voting_votes_total{result="accepted"} 5.0', self.client.get("/metrics").content.decode())
+        # Файл завершившегося процесса свёрнут в архив, сумма не изменилась
+        self.assertFalse(os.path.exists(os.path.join(self.directory, f"{child.pid}-{threading.get_ident()}.db")))
+        self.assertEqual(len(os.listdir(self.directory)), 3)  # свой файл, архив, блокировка
+        self.assertIn('voting_votes_total{result="accepted"} 5.0', self.client.get("/metrics").content.decode())
+
+    def test_works_without_fcntl(self):
+        VOTES.inc(result=ACCEPTED)
+        with mock.patch("core.metrics.fcntl", None):
+            self.assertIn('voting_votes_total{result="accepted"} 1.0', self.client.get("/metrics").content.decode())
+
+    def test_access_by_address_or_token(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.0.0.1").status_code, 403)
+        self.assertEqual(self.client.get(
+            "/metrics", REMOTE_ADDR="10.0.0.1", HTTP_AUTHORIZATION="Bearer other").status_code, 403)
+        self.assertEqual(self.client.get(
+            "/metrics", REMOTE_ADDR="10.0.0.1", HTTP_AUTHORIZATION="Bearer secret").status_code, 200)
+
+
+# ──────────────────────────────────────────────
+# Бенчмарк эндпоинтов: время и число SQL-запросов на запрос
+# ──────────────────────────────────────────────
+#   python manage.py test voting.tests.EndpointBenchmarkTests
+#   VOTING_BENCH_SIZES=1000,100000,1000000 — размеры наборов голосов (по умолчанию 1000)
+#   VOTING_BENCH_UPDATE=1 — перезаписать базовую линию для прогнанных размеров
+#   VOTING_BENCH_LATENCY_FACTOR / VOTING_BENCH_LATENCY_SLACK_MS — допуск по времени
+BENCH_BASELINE = Path(__file__).with_name("benchmark_baseline.json")
+BENCH_REPEATS = 3
+TRANSACTION_CONTROL = ("COMMIT", "ROLLBACK")
+# Статус, отличный от «любой < 400»
+EXPECTED_STATUS = {"round-results-304": 304}
+
+
+def bench_sizes() -> list:
+    return [int(size) for size in os.environ.get("VOTING_BENCH_SIZES", "1000").split(",")]
+
+
+def seed_dataset(votes: int) -> dict:
+    """Завершённый индивидуальный раунд и текущий стандартный (manage.py seed_votes)"""
+    individual, standard = seeding.seed(votes=votes, seed=votes, rounds=("individual", "standard"))
+    return {
+        "campaign": standard.campaign,
+        "individual": individual,
+        "standard": standard,
+        "participant": Participant.objects.filter(round=standard).first(),
+        # Первый сгенерированный пользователь голосует в каждом раунде
+        "voter": 10 ** 9,
+    }
+
+
+# Поколение — как в проде: в установившемся режиме из памяти процесса
+@override_settings(RESPONSE_CACHE={"GENERATION_TTL": 1.0})
+class EndpointBenchmarkTests(TransactionTestCase):
+    """
+    Каждый эндпоинт voting/urls.py и главная страница на наборах из bench_sizes() голосов.
+    Запуск падает, если число запросов выросло относительно benchmark_baseline.json
+    или время вышло за допуск.
+    """
+    databases = {"default", "readonly"}
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user("bench")
+        self.admin_headers = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=user).key}"}
+        self.client = Client()
+        self.next_user = 5 * 10 ** 9
+
+    def fresh_user(self):
+        self.next_user += 1
+        return self.next_user
+
+    def fresh_round(self, ctx, **kwargs):
+        number = Round.objects.filter(campaign=ctx["campaign"]).count() + 1
+        return Round.objects.create(campaign=ctx["campaign"], number=number, status="active", **kwargs)
+
+    def cases(self, ctx):
+        """name -> prepare(); prepare() (без замера) возвращает (method, path, data, headers)"""
+        standard, individual = ctx["standard"], ctx["individual"]
+        admin = self.admin_headers
+
+        def individual_round_with_votes():
+            round_obj = self.fresh_round(ctx, type="individual")
+            people = participants.create_participants(round_obj, [Participant(full_name=f"П{i}") for i in range(5)])
+            Vote.objects.bulk_create([
+                Vote(round=round_obj, participant=p, user_telegram_id=u, choice="yes")
+                for p in people for u in range(20)
+            ])
+            tallies.rebuild([round_obj.id])
+            return round_obj
+
+        def results_304():
+            etag = self.client.get(f"/api/results/{standard.id}/")["ETag"]
+            return "get", f"/api/results/{standard.id}/", None, {"HTTP_IF_NONE_MATCH": etag}
+
+        return {
+            "home": lambda: ("get", "/", None, {}),
+            "results": lambda: ("get", "/api/results/", {"round_id": standard.id}, {}),
+            "round-results": lambda: ("get", f"/api/results/{standard.id}/", None, {}),
+            "round-results-304": results_304,
+            "vote": lambda: ("post", "/api/vote/", {
+                "round": standard.id, "participant": ctx["participant"].id, "user_telegram_id": self.fresh_user(),
+            }, {}),
+            "active-participants": lambda: ("get", "/api/active-participants/", None, {}),
+            "active-round-info": lambda: ("get", "/api/active-round-info/", {"user_id": ctx["voter"]}, {}),
+            "active-round": lambda: ("get", "/api/active-round/", None, {}),
+            "user-votes": lambda: ("get", "/api/user-votes/", {"user_id": ctx["voter"]}, {}),
+            "active-rounds": lambda: ("get", "/api/active-rounds/", None, {}),
+            "start-round": lambda: ("post", "/api/start-round/", {"campaign_id": ctx["campaign"].id}, admin),
+            "end-round": lambda: ("post", "/api/end-round/", {"round_id": individual_round_with_votes().id}, admin),
+            "add-participant": lambda: ("post", "/api/add-participant/", {
+                "round_id": standard.id, "full_name": "Новый участник"}, admin),
+            "add-participants": lambda: ("post", "/api/add-participants/", {
+                "round_id": self.fresh_round(ctx).id,
+                "participants": [{"full_name": f"Участник {i}"} for i in range(20)]}, admin),
+            "create-campaign": lambda: ("post", "/api/create-campaign/", {
+                "name": "Новая", "admin_telegram_id": 1}, admin),
+            "active-campaigns": lambda: ("get", "/api/active-campaigns/", None, {}),
+            "set-current-round": lambda: ("post", "/api/set-current-round/", {"round_id": standard.id}, admin),
+            "get-current-round": lambda: ("get", "/api/get-current-round/", None, {}),
+            "transfer-winners": lambda: ("post", "/api/transfer-winners/", {
+                "round_id": individual.id, "target_round_id": self.fresh_round(ctx).id}, admin),
+            "cache-stats": lambda: ("get", "/api/cache-stats/", None, admin),
+        }
+
+    def measure(self, prepare, expected_status=None):
+        timings, queries = [], 0
+        for _ in range(BENCH_REPEATS):
+            method, path, data, headers = prepare()
+            # Холодный кэш — считаем запросы худшего случая
+            cache.clear()
+            with CaptureQueriesContext(connections["default"]) as primary, \
+                    CaptureQueriesContext(connections["readonly"]) as replica:
+                started = time.perf_counter()
+                if method == "get":
+                    response = self.client.get(path, data, **headers)
+                else:
+                    response = self.client.post(path, data, content_type="application/json", **headers)
+                timings.append((time.perf_counter() - started) * 1000)
+            if expected_status is not None:
+                self.assertEqual(response.status_code, expected_status, path)
+            else:
+                self.assertLess(response.status_code, 400, f"{path}: {response.status_code}")
+            captured = primary.captured_queries + replica.captured_queries
+            # Middleware (core/timing.py) видит те же запросы, кроме COMMIT/ROLLBACK —
+            # их Django выполняет мимо execute_wrapper
+            statements = sum(not q["sql"].startswith(TRANSACTION_CONTROL) for q in captured)
+            self.assertIn(f'desc="{statements} queries"', response["Server-Timing"], path)
+            queries = max(queries, len(captured))
+        return {"queries": queries, "ms": round(statistics.median(timings), 2)}
+
+    def run_size(self, size):
+        measured = {}
+        ctx = seed_dataset(size)
+        for name, prepare in self.cases(ctx).items():
+            measured[name] = self.measure(prepare, EXPECTED_STATUS.get(name))
+        # SSE (results/stream/) бесконечен — замеряем его снимок, который шлётся при подключении
+        with CaptureQueriesContext(connections["default"]) as captured:
+            started = time.perf_counter()
+            live.load_standings(ctx["standard"].id)
+        measured["results-stream"] = {
+            "queries": len(captured), "ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+        baseline = json.loads(BENCH_BASELINE.read_text()) if BENCH_BASELINE.exists() else {}
+        if os.environ.get("VOTING_BENCH_UPDATE") == "1":
+            baseline[str(size)] = measured
+            BENCH_BASELINE.write_text(json.dumps(baseline, indent=2, ensure_ascii=False, sort_keys=True) + "\n")
+            return
+        expected = baseline.get(str(size))
+        if expected is None:
+            self.fail(f"Нет базовой линии для {size} голосов: запустите с VOTING_BENCH_UPDATE=1")
+        factor = float(os.environ.get("VOTING_BENCH_LATENCY_FACTOR", "3"))
+        slack_ms = float(os.environ.get("VOTING_BENCH_LATENCY_SLACK_MS", "25"))
+        regressions = []
+        for name, result in measured.items():
+            base = expected.get(name)
+            if base is None:
+                regressions.append(f"{name}: нет в базовой линии")
+                continue
+            if result["queries"] > base["queries"]:
+                regressions.append(f"{name}: запросов {result['queries']}, было {base['queries']}")
+            if result["ms"] > base["ms"] * factor + slack_ms:
+                regressions.append(f"{name}: {result['ms']} мс, было {base['ms']} мс")
+        self.assertEqual(regressions, [], f"{size} голосов:\n" + "\n".join(regressions))
+
+
+# Отдельный тест на каждый размер: база очищается между ними
+for _size in bench_sizes():
+    setattr(
+        EndpointBenchmarkTests, f"test_endpoints_{_size}_votes",
+        lambda self, size=_size: self.run_size(size),
+    )
@@ -0,0 +1,86 @@
+# voting/transfer.py
+# Перенос победителей индивидуального раунда в стандартный одной транзакцией:
+# номера участников выделяются разом (см. voting/participants.py), а голоса «Да»
+# копируются одним INSERT ... SELECT внутри БД, без выгрузки в Python.
+import time
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Participant, Vote
+from . import participants, ranking, tallies
+
+
+def copy_yes_votes(target_round, participant_map: dict) -> int:
+    """
+    Копирует голоса «Да» участников-источников в target_round как стандартные голоса
+    за их новых участников (participant_map: id источника -> id нового). Возвращает число строк.
+    """
+    vote_table = connection.ops.quote_name(Vote._meta.db_table)
+    column = {
+        name: connection.ops.quote_name(Vote._meta.get_field(name).column)
+        for name in ("round", "participant", "user_telegram_id", "choice", "created_at")
+    }
+    sources = list(participant_map)
+    cases = " ".join("WHEN %s THEN %s" for _ in sources)
+    created_at = Vote._meta.get_field("created_at").get_db_prep_value(timezone.now(), connection)
+    sql = (
+        f"INSERT INTO {vote_table} ({column['round']}, {column['participant']}, "
+        f"{column['user_telegram_id']}, {column['choice']}, {column['created_at']}) "
+        f"SELECT %s, CASE {column['participant']} {cases} END, {column['user_telegram_id']}, NULL, %s "
+        f"FROM {vote_table} WHERE {column['participant']} IN ({', '.join(['%s'] * len(sources))}) "
+        f"AND {column['choice']} = %s"
+    )
+    params = [
+        target_round.id,
+        *[value for source_id in sources for value in (source_id, participant_map[source_id])],
+        created_at,
+        *sources,
+        "yes",
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def transfer_winners(round_obj, target_round) -> dict:
+    """
+    Создаёт в target_round по участнику на каждого победителя round_obj
+    и переносит их голоса «Да» как стандартные голоса.
+    Возвращает сводку: сколько участников/голосов записано и за сколько мс.
+    """
+    started = time.perf_counter()
+    # В индивидуальном раунде голоса участника — это его «Да» (счётчики ParticipantTally)
+    winners = ranking.select_winners(round_obj)
+    if not winners:
+        return {
+            "transferred": 0,
+            "transferred_votes": 0,
+            "rows_written": 0,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    with transaction.atomic():
+        new_participants = participants.create_participants(target_round, [
+            Participant(
+                full_name=w["full_name"],
+                description=(
+                    f"Перенесён из индивидуального раунда №{round_obj.number} "
+                    f"(перенесено {w['votes']} голосов «Да»)"
+                ),
+            ) for w in winners
+        ])
+        # Участники только что созданы: конфликтов по (round, user, participant) у них быть не может
+        transferred_votes = copy_yes_votes(target_round, {
+            w["participant_id"]: participant.id for participant, w in zip(new_participants, winners)
+        })
+        tallies.record_transfer(target_round.id, {
+            participant.id: w["votes"] for participant, w in zip(new_participants, winners)
+        })
+
+    return {
+        "transferred": len(new_participants),
+        "transferred_votes": transferred_votes,
+        "rows_written": len(new_participants) + transferred_votes,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
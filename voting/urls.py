@@ -1,6 +1,8 @@
 from django.urls import path
 from .views import (
     CurrentRoundResults,
+    results_stream,
+    RoundResultsAPIView,
     AddVoteAPIView,
     ActiveRoundParticipants,
     ActiveRoundInfo,
@@ -8,12 +10,17 @@ from .views import (
     StartRoundAPIView,
     EndRoundAPIView,
     AddParticipantAPIView,
-    CreateCampaignAPIView, ActiveCampaignsList, SetCurrentRoundAPIView, GetCurrentRoundAPIView, TransferWinnersAPIView
+    AddParticipantsAPIView,
+    CreateCampaignAPIView, ActiveCampaignsList, SetCurrentRoundAPIView, GetCurrentRoundAPIView, TransferWinnersAPIView,
+    CacheStatsAPIView, ActiveRoundSharedAPIView, UserVotesAPIView,
+    BotUsersAPIView, BlockedBotUsersAPIView, BroadcastRecipientsAPIView
 )
 
 urlpatterns = [
     # Страница результатов (HTML)
     path('results/', CurrentRoundResults.as_view(), name='results'),
+    path('results/stream/', results_stream, name='results-stream'),
+    path('results/<int:round_id>/', RoundResultsAPIView.as_view(), name='round-results'),
 
     # API для голосования
     path('vote/', AddVoteAPIView.as_view(), name='add-vote'),
@@ -21,6 +28,8 @@ urlpatterns = [
     # API для бота
     path('active-participants/', ActiveRoundParticipants.as_view(), name='active-participants'),
     path('active-round-info/', ActiveRoundInfo.as_view(), name='active-round-info'),
+    path('active-round/', ActiveRoundSharedAPIView.as_view(), name='active-round'),
+    path('user-votes/', UserVotesAPIView.as_view(), name='user-votes'),
     path('active-rounds/', ActiveRoundsList.as_view(), name='active-rounds'),
     path('active-rounds', ActiveRoundsList.as_view(), name='active-rounds'),
 
@@ -28,9 +37,16 @@ urlpatterns = [
     path('start-round/', StartRoundAPIView.as_view(), name='start-round'),
     path('end-round/', EndRoundAPIView.as_view(), name='end-round'),
     path('add-participant/', AddParticipantAPIView.as_view(), name='add-participant'),
+    path('add-participants/', AddParticipantsAPIView.as_view(), name='add-participants'),
     path('create-campaign/', CreateCampaignAPIView.as_view(), name='create-campaign'),
     path('active-campaigns/', ActiveCampaignsList.as_view(), name='active-campaigns'),
     path('set-current-round/', SetCurrentRoundAPIView.as_view(), name='set-current-round'),
     path('get-current-round/', GetCurrentRoundAPIView.as_view(), name='get-current-round'),
     path('transfer-winners/', TransferWinnersAPIView.as_view(), name='transfer-winners'),
+    path('cache-stats/', CacheStatsAPIView.as_view(), name='cache-stats'),
+
+    # Рассылки бота
+    path('bot-users/', BotUsersAPIView.as_view(), name='bot-users'),
+    path('bot-users/blocked/', BlockedBotUsersAPIView.as_view(), name='bot-users-blocked'),
+    path('broadcast-recipients/', BroadcastRecipientsAPIView.as_view(), name='broadcast-recipients'),
 ]
\ No newline at end of file
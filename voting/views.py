@@ -1,20 +1,62 @@
 # voting/views.py (обновлённый)
+import asyncio
+import json
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render
-from django.db.models import Count, Max, Q
+from django.db.models import Max
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
-from .models import Round, Participant, Vote, Campaign
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from .models import Round, Participant, Vote, Campaign, RoundTally
 from .serializers import ParticipantSerializer, VoteCreateSerializer, CampaignSerializer, RoundSerializer, \
-    TransferWinnersSerializer, StartRoundSerializer, EndRoundSerializer
+    TransferWinnersSerializer, StartRoundSerializer, EndRoundSerializer, AddParticipantsSerializer, \
+    BotUserSerializer, BlockedBotUsersSerializer, DUPLICATE_VOTE_MESSAGE
+from . import audience, current_round, ingest, live, participants, ranking, response_cache, tallies, transfer
+from .metrics import ROUND_END_SECONDS, VOTES, ACCEPTED, DUPLICATE, REJECTED
 # Импорт для аутентификации
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from core.db_routing import read_only
+
+logger = logging.getLogger(__name__)
+
+def build_results(round_obj) -> dict:
+    """Колонки результатов с позициями и общее число голосов (страница и /api/results/<id>/)"""
+    participants_with_votes = Participant.objects.filter(round=round_obj) \
+        .annotate(votes=tallies.votes_annotation()) \
+        .order_by("-votes", "order_number", "full_name")
+    results = [
+        {
+            "participant_id": p.id,
+            "participant_order": p.order_number,
+            "participant_full_name": p.full_name,
+            "votes": p.votes,
+        } for p in participants_with_votes
+    ]
+    if round_obj.type == "individual":
+        # Для индивидуального — только один столбец
+        left_column = [{**item, "position": i + 1} for i, item in enumerate(results)]
+        right_column = []
+    else:
+        # Обычная логика для стандартного
+        mid = (len(results) + 1) // 2
+        left_column = [{**item, "position": i + 1} for i, item in enumerate(results[:mid])]
+        right_column = [{**item, "position": mid + 1 + i} for i, item in enumerate(results[mid:])]
+    return {
+        "left_column": left_column,
+        "right_column": right_column,
+        "total_votes": tallies.round_total_votes(round_obj),
+    }
 
 class CurrentRoundResults(APIView):
     permission_classes = [AllowAny]
 
+    @read_only
     def get(self, request):
         try:
             active_rounds = Round.objects.filter(status__in=["pending", "active"]).order_by("started_at")
@@ -37,107 +79,200 @@ class CurrentRoundResults(APIView):
                 "right_column": [],
             }
             if current_round:
-                participants_with_votes = Participant.objects.filter(round=current_round) \
-                    .annotate(votes=Count("vote", filter=Q(vote__choice__isnull=True) | Q(vote__choice="yes"))) \
-                    .order_by("-votes", "order_number", "full_name")
-                results = [
-                    {
-                        "participant_order": p.order_number,
-                        "participant_full_name": p.full_name,
-                        "votes": p.votes,
-                    } for p in participants_with_votes
-                ]
-                if current_round.type == "individual":
-                    # Для индивидуального — только один столбец, максимум 1 участник
-                    mid = len(results)  # всё в левую колонку
-                    context["left_column"] = [{**item, "position": i + 1} for i, item in enumerate(results)]
-                    context["right_column"] = []  # пустой правый столбец
-                else:
-                    # Обычная логика для стандартного
-                    mid = (len(results) + 1) // 2
-                    left = results[:mid]
-                    right = results[mid:]
-                    context["left_column"] = [{**item, "position": i + 1} for i, item in enumerate(left)]
-                    context["right_column"] = [{**item, "position": mid + 1 + i} for i, item in enumerate(right)]
-                context["total_votes"] = Vote.objects.filter(round=current_round).count()
+                context.update(build_results(current_round))
             return render(request, "voting/results.html", context)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+async def results_stream(request):
+    """
+    Server-Sent Events для страницы результатов: сначала полный срез,
+    дальше только изменившиеся позиции. Обслуживается через core/asgi.py.
+    """
+    try:
+        round_id = int(request.GET.get("round_id", ""))
+    except ValueError:
+        raise Http404("round_id обязателен")
+    if not await Round.objects.filter(id=round_id, status__in=["pending", "active"]).aexists():
+        raise Http404("Раунд не найден или не активен")
+    heartbeat = live.get_config()["HEARTBEAT"]
+
+    async def events():
+        queue = await live.broadcaster.subscribe(round_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                if event == "ended":
+                    break
+        finally:
+            live.broadcaster.unsubscribe(round_id, queue)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+class RoundResultsAPIView(APIView):
+    """
+    Результаты раунда в JSON для табло и оверлеев. ETag строится из версии
+    RoundTally, поэтому повторный опрос без изменений получает 304,
+    не трогая таблицы голосов.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, round_id):
+        try:
+            versions = list(Round.objects.filter(id=round_id).order_by().values_list("tally__version", flat=True))
+            if not versions:
+                return Response({"error": "Раунд не найден"}, status=404)
+            etag = quote_etag(f"{round_id}-{versions[0] or 0}")
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                not_modified["Cache-Control"] = "no-cache"
+                return not_modified
+            round_obj = Round.objects.get(id=round_id)
+            response = Response({
+                "round_id": round_obj.id,
+                "round_number": round_obj.number,
+                "round_type": round_obj.type,
+                "status": round_obj.status,
+                **build_results(round_obj),
+            })
+            response["ETag"] = etag
+            response["Cache-Control"] = "no-cache"
+            return response
+        except Round.DoesNotExist:
+            return Response({"error": "Раунд не найден"}, status=404)
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+
+def user_votes_payload(round_id: int, user_telegram_id: int) -> dict:
+    """Голоса пользователя в раунде + версия общей части (user-votes/ и ответ на голос)"""
+    version = response_cache.current_generation()
+    votes = Vote.objects.filter(round_id=round_id, user_telegram_id=user_telegram_id) \
+        .values("participant_id", "choice")
+    return {"round_id": round_id, "version": version, "votes": list(votes)}
+
+def rejection_result(errors) -> str:
+    """Повторный голос или иная ошибка проверки VoteCreateSerializer"""
+    if DUPLICATE_VOTE_MESSAGE in errors.get("non_field_errors", []):
+        return DUPLICATE
+    return REJECTED
+
 class AddVoteAPIView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
         try:
+            if ingest.is_enabled():
+                return self.post_buffered(request)
             serializer = VoteCreateSerializer(data=request.data)
             if serializer.is_valid():
                 serializer.save()
-                return Response({"status": "Голос учтён"}, status=status.HTTP_201_CREATED)
+                VOTES.inc(result=ACCEPTED)
+                return self.respond(request, {"status": "Голос учтён"}, status.HTTP_201_CREATED)
+            result = rejection_result(serializer.errors)
+            VOTES.inc(result=result)
+            if result == DUPLICATE:
+                return self.respond(request, serializer.errors, status.HTTP_400_BAD_REQUEST)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+    @staticmethod
+    def respond(request, data, status_code):
+        """
+        С "return_state": true к ответу (и при дубле) добавляется user_state — то же,
+        что вернул бы GET user-votes/ для этого раунда, — и боту не нужен лишний запрос.
+        """
+        if str(request.data.get("return_state", "")).lower() in ("1", "true"):
+            data = {**data, "user_state": user_votes_payload(
+                int(request.data["round"]), int(request.data["user_telegram_id"])
+            )}
+        return Response(data, status=status_code)
+
+    def post_buffered(self, request):
+        # Голос уходит в очередь, запись делает один писатель пачками (см. VOTE_INGEST)
+        serializer = VoteCreateSerializer(data=request.data, context={"check_duplicates": False})
+        if not serializer.is_valid():
+            VOTES.inc(result=REJECTED)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = ingest.ingest(serializer.validated_data)
+        except ingest.BufferFull:
+            VOTES.inc(result=REJECTED)
+            return Response({"error": "Слишком много голосов, попробуйте ещё раз"}, status=503)
+        except FutureTimeoutError:
+            # Голос снят с очереди и не записан — повтор безопасен
+            VOTES.inc(result=REJECTED)
+            return Response({"error": "Голос не подтверждён вовремя, попробуйте ещё раз"}, status=503)
+        except ingest.VotePending:
+            # Голос может быть уже записан: проверить — GET user-votes/
+            return Response({"status": "Голос принят, идёт запись"}, status=status.HTTP_202_ACCEPTED)
+        if result == ingest.DUPLICATE:
+            VOTES.inc(result=DUPLICATE)
+            return self.respond(request, {"non_field_errors": [DUPLICATE_VOTE_MESSAGE]}, status.HTTP_400_BAD_REQUEST)
+        VOTES.inc(result=ACCEPTED)
+        return self.respond(request, {"status": "Голос учтён"}, status.HTTP_201_CREATED)
+
 class ActiveRoundParticipants(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
         try:
-            round_obj = Round.objects.filter(status="active").order_by("-started_at").first()
-            if not round_obj:
-                return Response({
-                    "error_code": "no_active_round",
-                    "message": "Сейчас нет активного раунда. Голосование начнётся позже 🔥",
-                    "detail": "Следите за анонсами"
-                }, status=200)
-            participants = Participant.objects.filter(round=round_obj).order_by("order_number", "full_name")
-            serializer = ParticipantSerializer(participants, many=True)
-            return Response({
-                "round_id": round_obj.id,
-                "round_name": str(round_obj),
-                "round_type": round_obj.type,
-                "participants": serializer.data
-            })
+            return response_cache.cached_response("active_participants", self.build)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+    @staticmethod
+    def build():
+        round_obj = Round.objects.filter(status="active").order_by("-started_at").first()
+        if not round_obj:
+            return {
+                "error_code": "no_active_round",
+                "message": "Сейчас нет активного раунда. Голосование начнётся позже 🔥",
+                "detail": "Следите за анонсами"
+            }, 200
+        participants = Participant.objects.filter(round=round_obj).order_by("order_number", "full_name")
+        serializer = ParticipantSerializer(participants, many=True)
+        return {
+            "round_id": round_obj.id,
+            "round_name": str(round_obj),
+            "round_type": round_obj.type,
+            "participants": serializer.data
+        }, 200
+
 class ActiveRoundInfo(APIView):
     permission_classes = [AllowAny]
 
+    @read_only
     def get(self, request):
         try:
-            # Сначала ищем текущий раунд (is_current=True)
-            round_obj = Round.objects.filter(is_current=True, status="active").first()
-            # Если нет текущего — берём последний активный
-            if not round_obj:
-                round_obj = Round.objects.filter(status="active").order_by("-started_at").first()
-            if not round_obj:
+            round_id = current_round.current_round_id()
+            if round_id is None:
                 return Response({"error": "Активного раунда нет"}, status=404)
             user_id_str = request.GET.get("user_id")
             user_votes = None
             if user_id_str:
                 try:
                     user_telegram_id = int(user_id_str)
-                    user_votes = Vote.objects.filter(round=round_obj, user_telegram_id=user_telegram_id)
+                    user_votes = Vote.objects.filter(round_id=round_id, user_telegram_id=user_telegram_id) \
+                        .select_related("participant")
                 except ValueError:
                     pass
-            participants = Participant.objects.filter(round=round_obj).annotate(
-                votes_count=Count("vote", filter=Q(vote__choice__isnull=True) | Q(vote__choice="yes"))
-            ).order_by("-votes_count", "order_number", "full_name")
-            data = {
-                "round_id": round_obj.id,
-                "round_name": str(round_obj),
-                "round_type": round_obj.type,
-                "status": round_obj.status,
-                "participants": [
-                    {
-                        "id": p.id,
-                        "order_number": p.order_number,
-                        "full_name": p.full_name,
-                        "description": p.description,
-                        "votes": p.votes_count
-                    } for p in participants
-                ]
-            }
+            # Общая часть (раунд, участники, голоса) одинакова для всех пользователей:
+            # кэшируем её по версии счётчиков раунда
+            version = RoundTally.objects.filter(round_id=round_id).values_list("version", flat=True).first()
+            shared, hit = response_cache.get_or_build(
+                "active_round_info", lambda: self.build_shared(round_id), round_id, version
+            )
+            data = dict(shared)
             if user_votes:
                 data["user_votes"] = [
                     {
@@ -148,37 +283,133 @@ class ActiveRoundInfo(APIView):
                         "voted_at": vote.created_at.isoformat()
                     } for vote in user_votes
                 ]
-            return Response(data)
+            response = Response(data)
+            response["X-Cache"] = "HIT" if hit else "MISS"
+            return response
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+
+    @staticmethod
+    def build_shared(round_id):
+        round_obj = Round.objects.select_related("campaign").get(id=round_id)
+        participants = Participant.objects.filter(round=round_obj).annotate(
+            votes_count=tallies.votes_annotation()
+        ).order_by("-votes_count", "order_number", "full_name")
+        return {
+            "round_id": round_obj.id,
+            "round_name": str(round_obj),
+            "round_type": round_obj.type,
+            "status": round_obj.status,
+            "participants": [
+                {
+                    "id": p.id,
+                    "order_number": p.order_number,
+                    "full_name": p.full_name,
+                    "description": p.description,
+                    "votes": p.votes_count
+                } for p in participants
+            ]
+        }
+
+class ActiveRoundSharedAPIView(APIView):
+    """
+    Общая для всех пользователей часть текущего раунда (без голосов).
+    version меняется при любом изменении кампаний, раундов и участников —
+    бот хранит ответ по версии и перезапрашивает только при её смене.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            version = response_cache.current_generation()
+            etag = quote_etag(version)
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+            payload, hit = response_cache.get_or_build("active_round_shared", self.build)
+            response = Response({**payload, "version": version})
+            response["ETag"] = etag
+            response["X-Cache"] = "HIT" if hit else "MISS"
+            return response
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+
+    @staticmethod
+    def build():
+        round_id = current_round.current_round_id()
+        if round_id is None:
+            return {"round_id": None, "message": "Активного раунда сейчас нет."}
+        round_obj = Round.objects.select_related("campaign").get(id=round_id)
+        participants = Participant.objects.filter(round=round_obj).order_by("order_number", "full_name")
+        return {
+            "round_id": round_obj.id,
+            "round_name": str(round_obj),
+            "round_type": round_obj.type,
+            "status": round_obj.status,
+            "participants": [
+                {
+                    "id": p.id,
+                    "order_number": p.order_number,
+                    "full_name": p.full_name,
+                    "description": p.description,
+                } for p in participants
+            ]
+        }
+
+class UserVotesAPIView(APIView):
+    """Голоса одного пользователя в текущем раунде + версия общей части"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            try:
+                user_telegram_id = int(request.GET.get("user_id", ""))
+            except ValueError:
+                return Response({"error": "user_id обязателен"}, status=400)
+            round_id = current_round.current_round_id()
+            if round_id is None:
+                return Response({"round_id": None, "version": response_cache.current_generation(), "votes": []})
+            return Response(user_votes_payload(round_id, user_telegram_id))
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
 class ActiveRoundsList(APIView):
     permission_classes = [AllowAny]
 
+    @read_only
     def get(self, request):
         try:
-            rounds = Round.objects.filter(status="active").order_by("-started_at")
-            serializer = RoundSerializer(rounds, many=True)
-            if not serializer.data:
-                return Response({"error": "Активных раундов нет"}, status=404)
-            return Response({"rounds": serializer.data})
+            return response_cache.cached_response("active_rounds", self.build)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+    @staticmethod
+    def build():
+        rounds = Round.objects.filter(status="active").select_related("campaign").order_by("-started_at")
+        serializer = RoundSerializer(rounds, many=True)
+        if not serializer.data:
+            return {"error": "Активных раундов нет"}, 404
+        return {"rounds": serializer.data}, 200
+
 class ActiveCampaignsList(APIView):
     permission_classes = [AllowAny]
 
+    @read_only
     def get(self, request):
         try:
-            campaigns = Campaign.objects.filter(is_active=True).order_by('order_number')
-            serializer = CampaignSerializer(campaigns, many=True)
-            return Response({
-                "campaigns": serializer.data,
-                "total": campaigns.count()
-            })
+            return response_cache.cached_response("active_campaigns", self.build)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+    @staticmethod
+    def build():
+        campaigns = Campaign.objects.filter(is_active=True).order_by('order_number')
+        serializer = CampaignSerializer(campaigns, many=True)
+        return {
+            "campaigns": serializer.data,
+            "total": len(serializer.data)
+        }, 200
+
 class CreateCampaignAPIView(APIView):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
@@ -208,10 +439,9 @@ class StartRoundAPIView(APIView):
 
     def post(self, request):
         try:
-            print("Полученные данные в API:", request.data)
             serializer = StartRoundSerializer(data=request.data)
             if not serializer.is_valid():
-                print("Ошибки валидации:", serializer.errors)
+                logger.warning("start-round: ошибки валидации %s, данные %s", serializer.errors, request.data)
                 return Response(serializer.errors, status=400)
             data = serializer.validated_data
             campaign = Campaign.objects.get(id=data["campaign_id"])
@@ -238,7 +468,7 @@ class StartRoundAPIView(APIView):
         except Campaign.DoesNotExist:
             return Response({"error": "Кампания не найдена"}, status=404)
         except Exception as e:
-            print("Исключение в StartRoundAPIView:", str(e))
+            logger.exception("start-round: ошибка")
             return Response({"error": str(e)}, status=500)
 
 class EndRoundAPIView(APIView):
@@ -257,51 +487,15 @@ class EndRoundAPIView(APIView):
             if round_obj.status == "ended":
                 return Response({"error": "Раунд уже завершён"}, status=400)
 
-            round_obj.status = "ended"
-            round_obj.ended_at = timezone.now()
-            round_obj.save(update_fields=["status", "ended_at"])
-
-            # ── ТВОЯ ОРИГИНАЛЬНАЯ ЛОГИКА ПОДСЧЁТА ──
-            participants_with_votes = Participant.objects.filter(round=round_obj) \
-                .annotate(votes_count=Count("vote", filter=Q(vote__choice__isnull=True) | Q(vote__choice="yes"))) \
-                .order_by("-votes_count")
-
-            if not participants_with_votes:
-                return Response({
-                    "status": "ok",
-                    "message": f"Раунд #{round_obj.number} завершён",
-                    "winners_count": round_obj.winners_count,
-                    "winners": [],
-                    "round_type": round_obj.type,
-                    "ended_round_campaign_id": round_obj.campaign.id
-                })
-
-            unique_votes = participants_with_votes.values_list("votes_count", flat=True).distinct()
-            top_n_scores = list(unique_votes)[:round_obj.winners_count]
-
-            if not top_n_scores:
-                min_votes = 0
-            elif len(top_n_scores) < round_obj.winners_count:
-                min_votes = min(top_n_scores)
-            else:
-                min_votes = top_n_scores[-1]
+            with ROUND_END_SECONDS.time(type=round_obj.type):
+                round_obj.status = "ended"
+                round_obj.ended_at = timezone.now()
+                round_obj.save(update_fields=["status", "ended_at"])
 
-            winners = participants_with_votes.filter(votes_count__gte=min_votes)
-            winners_data = []
-
-            for p in winners:
-                winner_dict = {
-                    "participant_id": p.id,
-                    "participant_order": p.order_number,
-                    "full_name": p.full_name,
-                    "votes": p.votes_count,
-                }
-                if round_obj.type == "individual":
-                    yes_voters = Vote.objects.filter(
-                        participant=p, choice="yes"
-                    ).values_list("user_telegram_id", flat=True)
-                    winner_dict["yes_voters"] = list(yes_voters)
-                winners_data.append(winner_dict)
+                # Рейтинг и «Да»-голосовавшие — фиксированное число запросов (voting/ranking.py)
+                winners_data = ranking.select_winners(
+                    round_obj, with_yes_voters=round_obj.type == "individual"
+                )
 
             response_data = {
                 "status": "ok",
@@ -309,15 +503,14 @@ class EndRoundAPIView(APIView):
                 "winners_count": round_obj.winners_count,
                 "winners": winners_data,
                 "round_type": round_obj.type,
-                "ended_round_campaign_id": round_obj.campaign.id
+                "ended_round_campaign_id": round_obj.campaign_id
             }
             return Response(response_data)
 
         except Round.DoesNotExist:
             return Response({"error": "Раунд не найден"}, status=404)
         except Exception as e:
-            import traceback
-            traceback.print_exc()           # ← чтобы в консоли видеть точную причину
+            logger.exception("end-round: ошибка")
             return Response({"error": str(e)}, status=500)
 
 class AddParticipantAPIView(APIView):
@@ -351,6 +544,34 @@ class AddParticipantAPIView(APIView):
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+class AddParticipantsAPIView(APIView):
+    """Добавление многих участников за один запрос (список или вставленный CSV/TSV)"""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            serializer = AddParticipantsSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=400)
+            data = serializer.validated_data
+            round_obj = Round.objects.get(id=data["round_id"])
+            if round_obj.status != "active":
+                return Response({"error": "Раунд не активен"}, status=400)
+            results = participants.add_participants(round_obj, data["rows"])
+            created = sum(1 for row in results if row["status"] == "ok")
+            return Response({
+                "status": "ok",
+                "created": created,
+                "failed": len(results) - created,
+                "results": results,
+                "message": f"Добавлено участников: {created} из {len(results)}"
+            })
+        except Round.DoesNotExist:
+            return Response({"error": "Раунд не найден"}, status=404)
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+
 # Новый эндпоинт: установить текущий раунд
 class SetCurrentRoundAPIView(APIView):
     authentication_classes = [TokenAuthentication]
@@ -361,12 +582,9 @@ class SetCurrentRoundAPIView(APIView):
             round_id = request.data.get("round_id")
             if not round_id:
                 return Response({"error": "round_id обязателен"}, status=400)
-            # Снимаем флаг со всех
-            Round.objects.filter(is_current=True).update(is_current=False)
-            # Ставим на выбранный
             round_obj = Round.objects.get(id=round_id, status="active")
-            round_obj.is_current = True
-            round_obj.save()
+            # Один UPDATE строки-указателя вместо снятия флага со всех раундов
+            current_round.set_current(round_obj)
             return Response({"status": "ok", "message": f"Раунд {round_obj} теперь текущий"})
         except Round.DoesNotExist:
             return Response({"error": "Раунд не найден или не активен"}, status=404)
@@ -379,15 +597,21 @@ class GetCurrentRoundAPIView(APIView):
 
     def get(self, request):
         try:
-            round_obj = Round.objects.filter(is_current=True, status="active").first()
-            if not round_obj:
-                round_obj = Round.objects.filter(status="active").order_by("-started_at").first()
-            if not round_obj:
-                return Response({"current_round_id": None})
-            return Response({"current_round_id": round_obj.id})
+            return Response({"current_round_id": current_round.current_round_id()})
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+class CacheStatsAPIView(APIView):
+    """Попадания/промахи кэша ответов в этом процессе"""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({
+            "generation": response_cache.current_generation(),
+            "endpoints": response_cache.stats(),
+        })
+
 class TransferWinnersAPIView(APIView):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
@@ -415,70 +639,21 @@ class TransferWinnersAPIView(APIView):
                 type="standard"
             )
 
-            participants_with_votes = Participant.objects.filter(round=round_obj) \
-                .annotate(votes_count=Count("vote", filter=Q(vote__choice__isnull=True) | Q(vote__choice="yes"))) \
-                .order_by("-votes_count")
-
-            if not participants_with_votes.exists():
+            result = transfer.transfer_winners(round_obj, target_round)
+            if not result["transferred"]:
                 return Response({
                     "status": "ok",
                     "message": "В раунде нет участников с голосами — перенос не требуется",
-                    "transferred": 0,
-                    "transferred_votes": 0
+                    **result
                 })
 
-            unique_votes = participants_with_votes.values_list("votes_count", flat=True).distinct()
-            top_n_scores = list(unique_votes)[:round_obj.winners_count]
-
-            if not top_n_scores:
-                min_votes = 0
-            elif len(top_n_scores) < round_obj.winners_count:
-                min_votes = min(top_n_scores)
-            else:
-                min_votes = top_n_scores[-1]
-
-            winners = participants_with_votes.filter(votes_count__gte=min_votes)
-
-            transfer_count = 0
-            total_transferred_votes = 0
-
-            for p in winners:
-                yes_voters = Vote.objects.filter(
-                    participant=p, choice="yes"
-                ).values_list("user_telegram_id", flat=True)
-
-                votes_count = len(yes_voters)
-                total_transferred_votes += votes_count
-
-                new_participant = Participant.objects.create(
-                    round=target_round,
-                    full_name=p.full_name,
-                    description=(
-                        f"Перенесён из индивидуального раунда №{round_obj.number} "
-                        f"(перенесено {votes_count} голосов «Да»)"
-                    )
-                )
-
-                for user_tg_id in yes_voters:
-                    if not Vote.objects.filter(
-                        round=target_round,
-                        participant=new_participant,
-                        user_telegram_id=user_tg_id
-                    ).exists():
-                        Vote.objects.create(
-                            round=target_round,
-                            participant=new_participant,
-                            user_telegram_id=user_tg_id,
-                            choice=None
-                        )
-
-                transfer_count += 1
-
             return Response({
                 "status": "ok",
-                "message": f"Перенесено {transfer_count} участников с {total_transferred_votes} голосами в раунд №{target_round.number}",
-                "transferred": transfer_count,
-                "transferred_votes": total_transferred_votes,
+                "message": (
+                    f"Перенесено {result['transferred']} участников с {result['transferred_votes']} "
+                    f"голосами в раунд №{target_round.number}"
+                ),
+                **result,
                 "target_round_id": target_round.id,
                 "target_round_number": target_round.number
             })
@@ -486,6 +661,47 @@ class TransferWinnersAPIView(APIView):
         except Round.DoesNotExist:
             return Response({"error": "Исходный или целевой раунд не найден"}, status=404)
         except Exception as e:
-            import traceback
-            traceback.print_exc()           # ← для диагностики в консоли
-            return Response({"error": f"Ошибка при переносе: {str(e)}"}, status=500)
\ No newline at end of file
+            logger.exception("transfer-winners: ошибка")
+            return Response({"error": f"Ошибка при переносе: {str(e)}"}, status=500)
+
+# Получатели рассылок бота (см. voting/audience.py)
+class BotUsersAPIView(APIView):
+    """Бот сообщает о /start"""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            serializer = BotUserSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=400)
+            created = audience.register_user(serializer.validated_data["telegram_id"])
+            return Response({"status": "ok", "created": created})
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+
+class BlockedBotUsersAPIView(APIView):
+    """Бот сообщает, кто его заблокировал (403 при рассылке)"""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            serializer = BlockedBotUsersSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=400)
+            marked = audience.mark_blocked(serializer.validated_data["telegram_ids"])
+            return Response({"status": "ok", "marked": marked})
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+
+class BroadcastRecipientsAPIView(APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            recipients = audience.broadcast_recipients()
+            return Response({"count": len(recipients), "recipients": recipients})
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)